@@ -1,3 +1,6 @@
+import io
+import uuid
+from functools import partial
 import streamlit as st
 import electromagnetism as eml
 import numpy as np
@@ -7,6 +10,182 @@ import pandas as pd
 
 st.set_page_config(page_title="Coil Model", page_icon="     🧲", layout="wide")
 
+
+# Number of results kept in memory by each cached function below, shared by every session.
+CACHE_ENTRIES = 32
+
+# Number of blocks a field calculation is split into, each one updating the progress of its job.
+PROGRESS_STEPS = 20
+
+# Seconds between two checks of a running job.
+POLL_INTERVAL = 1.0
+
+# Number of times a cell of the cloud may be split in half by the adaptive refinement.
+REFINEMENT_DEPTH = 3
+
+# Largest relative deviation of the field from a mirror plane for the plane to be used.
+SYMMETRY_TOLERANCE = eml.mathematics.symmetry.SYMMETRY_TOLERANCE
+
+# Rows shown on each page of a table, the whole table is offered as a binary file instead.
+PREVIEW_ROWS = 1000
+
+FIELD_COLUMNS = ["x", "y", "z", "Bx (T)", "By (T)", "Bz (T)", "|B| (T)"]
+
+
+@st.cache_resource
+def fieldCache():
+    # Shared by every session, the entries stay on disk between restarts of the app.
+    return eml.cache.FieldCache()
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def readTable(content: bytes, type_of_file: str):
+    # Keyed by the content of the uploaded file, so reruns do not parse it again.
+    # Returns the points in the format (N, 3) and whether they had to be transposed.
+    if type_of_file == "xlsx":
+        df = pd.read_excel(io.BytesIO(content), header=None)
+        if not pd.to_numeric(df.iloc[0], errors="coerce").notna().all():
+            df = df.iloc[1:]   # a row of titles
+        table = df.to_numpy(dtype=float)
+    else:
+        table = eml.loader.parseTable(content)
+    return eml.loader.orientTable(table)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def buildCoil(coilPath: np.ndarray, invertRAxis: bool = True):
+    # Every rerun gets its own copy, so setting the area or the resistivity does not leak between sessions.
+    return eml.models.coil.Coil(coilPath, invertRAxis=invertRAxis)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def buildSolenoid(n_turns: int, Pa: float, Pb: float, radius: float, max_seg_len: float):
+    return eml.models.coil.Solenoid(n_turns, Pa, Pb, radius, max_seg_len=max_seg_len, invertRAxis=True)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def generatePath(generator: str, *args, **kwargs):
+    # Any path generator of the geometry module, keyed by its name and arguments.
+    return getattr(eml.mathematics.geometry, generator)(*args, **kwargs)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def pathFigure(coilPath: np.ndarray):
+    return eml.models.coil.Coil(coilPath, invertRAxis=True).plot(show=False)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner="Looking for mirror planes...")
+def mirrorPlanes(coilPath: np.ndarray, method: str):
+    # The probes cost a field calculation, so the planes are found once per path and method.
+    return eml.models.coil.Coil(coilPath, invertRAxis=True).detectSymmetry(tolerance=SYMMETRY_TOLERANCE, integration_method=method)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def cloudFigure(space: np.ndarray, b_t: np.ndarray, axes, plane_axis, plane_value, plane_thickness: float):
+    return eml.models.coil.Coil.cloudFigure(space, b_t, axes, plane_axis, plane_value, plane_thickness)
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner="Refining the cloud...")
+def adaptiveField(coilPath: np.ndarray, padding: float, n: int, method: str, refinement: float, symmetry: tuple = ()):
+    # Field of a unit current on the refined cloud, the current only rescales it.
+    coil = eml.models.coil.Coil(coilPath, invertRAxis=True, symmetry=symmetry)
+    _, b, space = coil.cloud(padding, n, 1.0, integration_method=method, refinement=refinement, max_depth=REFINEMENT_DEPTH,
+                               cache=fieldCache())
+    return space, b[3:6].T
+
+
+@st.cache_data(max_entries=CACHE_ENTRIES, show_spinner=False)
+def sliceFigure(b_t: np.ndarray, axes, plane_axis, plane_value: float, style: str):
+    return eml.models.coil.Coil.sliceFigure(b_t, axes, plane_axis, plane_value, style)
+
+
+@st.cache_resource
+def jobQueue():
+    # Shared by every session, the jobs keep running while the scripts rerun.
+    return eml.jobs.JobQueue()
+
+
+def sessionId():
+    # Owner of the jobs of this session, no other session can find, stop or forget them.
+    if "session" not in st.session_state:
+        st.session_state["session"] = uuid.uuid4().hex
+    return st.session_state["session"]
+
+
+def tablePreview(table: np.ndarray, columns, key: str):
+    # Only one page of the table is sent to the browser.
+    pages = max(1, -(-len(table) // PREVIEW_ROWS))
+    page = 1
+    if pages > 1:
+        page = st.number_input(f"Page of the table ({pages} pages, {len(table)} rows)", min_value=1, max_value=pages, value=1, key=f"page-{key}")
+    rows = slice((page - 1) * PREVIEW_ROWS, min(page * PREVIEW_ROWS, len(table)))
+    st.dataframe(pd.DataFrame(table[rows], columns=columns, index=np.arange(len(table))[rows]).style.format("{:.6e}"))
+
+
+# The text table of a path, written only when its button is clicked.
+def pathText(coilPath: np.ndarray):
+    return pd.DataFrame(coilPath).to_csv(index=False).encode('utf-8')
+
+
+def tableDownloads(table: np.ndarray, columns, info: dict, file_name: str, key: str):
+    # The files are only written when a button is clicked.
+    formats = ("npz", "parquet") if eml.export.PARQUET_AVAILABLE else ("npz",)
+    for column, file_format in zip(st.columns(len(formats)), formats):
+        with column:
+            st.download_button(label=f"Download as .{file_format}", data=partial(eml.export.tableBytes, table, columns, info, file_format),
+                               file_name=f"{file_name}.{file_format}", mime="application/octet-stream", key=f"{file_format}-{key}")
+
+
+def fieldResult(coil, points_array: np.ndarray, B: np.ndarray, method: str, current: float, key: str, **grid):
+    # Shows a preview of the field and offers the whole of it for download. Returns the table.
+    table = eml.export.fieldTable(points_array, B)
+    tablePreview(table, FIELD_COLUMNS, key)
+    tableDownloads(table, eml.export.FIELD_COLUMNS, eml.export.metadata(coil, units='m, T', current=current, method=method, **grid), "Magnetic_field", key)
+    return table
+
+
+@st.fragment(run_every=POLL_INTERVAL)
+def jobProgress(job_id: str, points_array: np.ndarray, current: float):
+    # Polls the job without rerunning the whole page, which is rerun once the job is finished.
+    job = jobQueue().get(job_id, sessionId())
+    if job is None or job.finished:
+        st.rerun()
+    st.progress(job.progress, text=f"Calculating... {job.progress:.0%} done (job {job_id[:8]})")
+    if job.partial is not None:
+        done = np.flatnonzero(~np.isnan(job.partial[:, 0]))[:PREVIEW_ROWS]
+        st.dataframe(pd.DataFrame(eml.export.fieldTable(points_array[done], job.partial[done] * current), columns=FIELD_COLUMNS, index=done))
+
+
+def backgroundField(coil, points_array: np.ndarray, method: str, current: float, **grid):
+    # The field is calculated by a background job, which survives reruns: changing a widget and coming
+    # back to the same inputs picks up the same job. Returns the table once the job is done.
+    # The job calculates the field of a unit current, so changing the current only rescales its result.
+    queue = jobQueue()
+    owner = sessionId()
+    request = eml.cache.contentKey(coil.coilPath, points_array, method, coil.symmetry)
+    job = queue.find(request, owner)
+
+    if job is not None and job.status in (eml.jobs.CANCELLED, eml.jobs.FAILED):
+        if job.status == eml.jobs.CANCELLED:
+            st.warning("The calculation was stopped.")
+        else:
+            st.error(f"The calculation failed: {job.error}")
+        if st.button("Calculate again", key=f"again-{request}"):
+            queue.forget(job.id, owner)
+            st.rerun()
+        return None
+
+    if job is None:
+        chunk = max(1, -(-len(points_array) // PROGRESS_STEPS))
+        job = queue.submitField(coil, points_array, method, 1.0, chunk=chunk, key=request, owner=owner, cache=fieldCache())
+
+    if not job.finished:
+        st.button("Stop the calculation", on_click=queue.cancel, args=(job.id, owner), key=f"stop-{job.id}")
+        jobProgress(job.id, points_array, current)
+        return None
+
+    return fieldResult(coil, points_array, job.result * current, method, current, request, **grid)
+
 st.title("Coil Model Page")
 
 Ratio = st.radio("Do you already have a Coil Path?", options=("Yes", "No"))
@@ -16,38 +195,31 @@ if Ratio == "Yes":
     " Do not include headers, titles, or text in any column. ", type=["txt", "csv", "xlsx"])
     if Path is not None: 
         type_of_file = Path.name.split(".")[-1]
-        if type_of_file == "xlsx":
-            df = pd.read_excel(Path)
-        
-        elif type_of_file in ("csv","txt"):
-            df =pd.read_csv(Path,sep=r"[,\s;]+", engine='python')
-        
-        df = df.astype(float)
-        df = np.array(df)
-        # st.write(df)
-        coilPath = np.array(df)
+        try:
+            coilPath, transposed = readTable(Path.getvalue(), type_of_file)
+        except ValueError as error:
+            st.error(f"The Coil Path could not be read: {error}")
+            st.stop()
         st.success("Coil loaded successfully!")
-        if coilPath.shape[0] == 3:
-            coil = eml.models.coil.Coil(coilPath)
+        coil = buildCoil(coilPath)
+        if transposed:
             st.warning("The Coil Path has been transposed to fit the required shape (N, 3). Please verify if the coordinates are correct.")
-        else:
-            coil = eml.models.coil.Coil(coilPath, invertRAxis=True)
         
         col1, col2 = st.columns([0.3, 0.7])   # ajuste as proporções se quiser
 
         with col1:
             st.subheader("Path")
-            st.dataframe(pd.DataFrame(df, columns=["X", "Y", "Z"]) , use_container_width=True, height=350, )
+            tablePreview(coil.coilPath, ["X", "Y", "Z"], "path")
 
         with col2:
             st.subheader("Visualization")
-            fig = coil.plot(show=False)    # sua função/objeto que gera o Plotly Figure
+            fig = pathFigure(coil.coilPath)    # sua função/objeto que gera o Plotly Figure
             st.plotly_chart(fig, use_container_width=True)
         
         st.write("Coil Length (m): ", coil.length)
         p1_3d = st.radio("Do you want to calculate the Magnetic Field at a single point or across a set of points in space?", options=("1 point", "Array of points", "cloud of points"))
         if p1_3d == "1 point":
-            method = st.selectbox("What integration method do you want to use to calculate the magnetic field using biot savart?", options=['Riemann', 'Simpson'])
+            method = st.selectbox("What integration method do you want to use to calculate the magnetic field using biot savart?", options=['Riemann', 'Simpson', 'Analytic'])
             point = st.text_input("Point to calculate the magnetic field (x,y,z) - Only the numeric values separated by commas:", value="")
             current = st.text_input("Current (A) - Only the numeric value:", value="")
             
@@ -62,42 +234,25 @@ if Ratio == "Yes":
                 )
                 st.dataframe(dfB.style.format("{:.6e}"))
         elif p1_3d == "Array of points":
-            method = st.selectbox("What integration method do you want to use to calculate the magnetic field using biot savart?", options=['Riemann', 'Simpson'])
+            method = st.selectbox("What integration method do you want to use to calculate the magnetic field using biot savart?", options=['Riemann', 'Simpson', 'Analytic'])
             current = st.text_input("Current (A) - Only the numeric value:", value="")
             points_file = st.file_uploader("Upload your Points file. The file must contain only numeric coordinates and separators.", type=["txt", "csv", "xlsx"])
             points = st.text_input("Input the points directly as list of coordinates. Each point should be in the format [x,y,z] and separated by semicolon .\
                                     Example: [0,0,0]; [1,0,0]; [0,1,0]", value="")
             if points_file is not None and current != "" and points == "":#or points != "" and current != "":
-                st.info("Calculating... This may take a few moments depending on the number of points and the coil complexity.")
                 type_of_file = points_file.name.split(".")[-1]
-                if type_of_file == "xlsx":
-                    df_points = pd.read_excel(points_file)
-                
-                elif type_of_file in ("csv","txt"):
-                    df_points =pd.read_csv(points_file,sep=r"[,\s;]+", engine='python')
-                
-                df_points = df_points.astype(float)
-                points_array = np.array(df_points)
+                try:
+                    points_array, _ = readTable(points_file.getvalue(), type_of_file)
+                except ValueError as error:
+                    st.error(f"The points could not be read: {error}")
+                    st.stop()
                 # else:else:
                 #fzr o caso de points inseridos manualmente e conferir se estçao no formato certo ou se precisa usar o invertAxis
                 
                 current = float(current)
-                arr = coil.biotSavart3d(points_array, integration_method=method,  I=current, invertPAxis=False)
-                # arr = np.asarray(B_array, dtype=float)
-                if arr.shape[1] == 6:
-                    pass                     # já está (N,6)
-                elif arr.shape[0] == 6:
-                    arr = arr.T              # era (6,N) → vira (N,6)
-                else:
-                    raise ValueError(f"Expected (N,6) or (6,N), got {arr.shape}")
-
-
-                dfB = pd.DataFrame(arr, columns=["x", "y", "z", "Bx (T)", "By (T)", "Bz (T)"])
-                dfB["|B| (T)"] = np.linalg.norm(dfB[["Bx (T)", "By (T)", "Bz (T)"]].to_numpy(), axis=1)
-                st.dataframe(dfB.style.format("{:.6e}"))
+                backgroundField(coil, points_array, method, current)
 
             if points != "" and current != "" and points_file is None:
-                st.info("Calculating... This may take a few moments depending on the number of points and the coil complexity.")
                 points_list = []
                 # Split by space or comma
                 points = points.split(';')
@@ -106,20 +261,7 @@ if Ratio == "Yes":
                     points_list.append(point)
                 points_array = np.array(points_list)
                 current = float(current)
-                B_array = coil.biotSavart3d(points_array, integration_method=method,  I=current, invertPAxis=False)
-                arr = np.asarray(B_array, dtype=float)
-                
-                if arr.shape[1] == 6:
-                    pass                     # já está (N,6)
-                elif arr.shape[0] == 6:
-                    arr = arr.T              # era (6,N) → vira (N,6)
-                else:
-                    raise ValueError(f"Expected (N,6) or (6,N), got {arr.shape}")
-
-
-                dfB = pd.DataFrame(arr, columns=["x", "y", "z", "Bx (T)", "By (T)", "Bz (T)"])
-                dfB["|B| (T)"] = np.linalg.norm(dfB[["Bx (T)", "By (T)", "Bz (T)"]].to_numpy(), axis=1)
-                st.dataframe(dfB.style.format("{:.6e}"))
+                backgroundField(coil, points_array, method, current)
                 
             if points_file is not None and points != "":
                 raise ValueError("Please provide either a points file or direct points input, not both.")
@@ -136,10 +278,16 @@ if Ratio == "Yes":
         elif p1_3d == "cloud of points":
             padding = st.text_input("How much do you want the cloud to surpasse the coil dimensions?", value="1.0")
             n = st.text_input("How many points do you want in the cloud in each direction? (If the value defined is 10, there'll be 1000 points)", value="10")
-            method = st.selectbox("What integration method do you want to use to calculate the magnetic field using biot savart?", options=['Riemann', 'Simpson'])
+            method = st.selectbox("What integration method do you want to use to calculate the magnetic field using biot savart?", options=['Riemann', 'Simpson', 'Analytic'])
             plane_axis_opt = st.selectbox("Do you want to highlight a specific plane?", options=["None", "x", "y", "z"], index=0)
             plane_value_str = st.text_input("Plane position (leave empty to use the middle of the domain)",value="")
             plane_thickness_str = st.text_input("Plane thickness (0 = one grid step)",value="0.0")
+            if plane_axis_opt != "None":
+                slice_n = st.text_input("How many points do you want along each direction of the plane? (the plane is calculated on its own, before the cloud)", value="100")
+                slice_style = st.selectbox("How do you want to draw the plane?", options=["heatmap", "contour"])
+            axisymmetric = st.checkbox("Is the coil symmetric around the z axis, like a solenoid? (faster, evaluated on a (r, z) grid)", value=False)
+            refinement_str = st.text_input("Adaptive refinement tolerance, the cells are split near the coil until the field is resolved within it (leave empty for a uniform grid)", value="")
+            mirrored = st.checkbox("Use the mirror planes of the coil, if it has any? (faster, only one side of each plane is calculated)", value=False)
             current = st.text_input("Current (A) - Only the numeric value:", value="")
 
             if current != "":
@@ -158,19 +306,40 @@ if Ratio == "Yes":
 
                 plane_thickness = float(plane_thickness_str)
 
-                fig, b, space = coil.cloud(padding, n = n, i = current, integration_method=method, plane_axis=plane_axis, plane_thickness=plane_thickness, plane_value=plane_value, show=False)
-                st.plotly_chart(fig, use_container_width=True)
-                arr = np.asarray(b, dtype=float)
-                
-                if arr.shape[1] == 7:
-                    pass                     # já está (N,6)
-                elif arr.shape[0] == 7:
-                    arr = arr.T              # era (6,N) → vira (N,6)
+                if mirrored:
+                    planes = coil.symmetry = mirrorPlanes(coil.coilPath, method)
+                    st.write("Mirror planes used: " + (", ".join(f"{'xyz'[axis]} = {position:.4g}" for axis, position, _ in planes) or "none found"))
+
+                whole = True
+                if plane_axis is not None:
+                    # The plane is calculated first, the whole cloud only when it is asked for.
+                    plane, plane_axes, value = coil.planeGrid(padding, plane_axis, plane_value, int(slice_n))
+                    slice_arr = backgroundField(coil, plane, method, current, grid={"padding": padding, "plane_axis": plane_axis, "plane_value": value, "n": int(slice_n)})
+                    if slice_arr is not None:
+                        st.plotly_chart(sliceFigure(slice_arr[:, 6], plane_axes, plane_axis, value, slice_style), use_container_width=True)
+                    whole = st.checkbox("Also calculate the whole cloud", value=False)
+
+                space, axes = coil.cloudGrid(padding, n)
+                if not whole:
+                    arr = None
+                elif refinement_str != "":
+                    space, b = adaptiveField(coil.coilPath, padding, n, method, float(refinement_str), coil.symmetry)
+                    st.write(f"Points evaluated: {len(space)} (a uniform grid as fine would have {((max(n, 2) - 1) * 2**REFINEMENT_DEPTH + 1)**3})")
+                    arr = fieldResult(coil, space, b * current, method, current, "adaptive", grid={"padding": padding, "n": n, "refinement": float(refinement_str)})
+                elif axisymmetric:
+                    nodes = max(n, eml.models.coil.AXISYMMETRIC_NODES)
+                    b = coil.axisymmetricField(space, integration_method=method, I=current, n_r=nodes, n_z=nodes, cache=fieldCache())
+                    st.write(f"Deviation of the coil from axial symmetry: {coil.asymmetry:.2%}")
+                    st.write(f"Estimated error against the full calculation: {coil.axisymmetricError:.2%}")
+                    if coil.axisymmetricError > eml.models.coil.AXISYMMETRIC_TOLERANCE:
+                        st.warning("The coil is not symmetric enough around the z axis for this field to be trusted, uncheck the option for the full calculation.")
+                    arr = fieldResult(coil, space, b[3:].T, method, current, "axisymmetric", grid={"padding": padding, "n": n, "axisymmetric": True})
                 else:
-                    raise ValueError(f"Expected (N,7) or (7,N), got {arr.shape}")
-                
-                dfB = pd.DataFrame(arr, columns=["x", "y", "z", "Bx (T)", "By (T)", "Bz (T)", "|B| (T)"])
-                st.dataframe(dfB.style.format("{:.6e}"))
+                    arr = backgroundField(coil, space, method, current, grid={"padding": padding, "n": n})
+                if arr is not None:
+                    fig = cloudFigure(space, arr[:, 6], axes, plane_axis, plane_value, plane_thickness)
+                    # The figure bins large clouds, the downloads above keep every point.
+                    st.plotly_chart(fig, use_container_width=True)
 
 
         quest = st.radio("Do you want to calculate the Resistance of the coil?", options=("Yes", "No"))
@@ -263,13 +432,13 @@ if Ratio == "No":
                 if length == "":
                     length = 0.1
                 length = float(length)
-                coil = eml.mathematics.geometry.line(initial_point, final_point, max_seg_len=length, n_points=num_points)
+                coil = generatePath("line", initial_point, final_point, max_seg_len=length, n_points=num_points)
                 st.success("Coil Path generated successfully!")
-                st.dataframe(pd.DataFrame(coil, columns=['X','Y','Z']))
-                st.download_button(label="Download Coil Path as .txt", data=pd.DataFrame(coil).to_csv(index=False).encode('utf-8'), file_name='Line_coil_path.txt', mime='text/csv')
+                tablePreview(coil, ['X','Y','Z'], "Line")
+                st.download_button(label="Download Coil Path as .txt", data=partial(pathText, coil), file_name='Line_coil_path.txt', mime='text/csv')
+                tableDownloads(coil, eml.export.PATH_COLUMNS, eml.export.metadata(units='m', coil_hash=eml.cache.contentKey(coil)), "Line_coil_path", "Line")
 
-                coil = eml.models.coil.Coil(coil, invertRAxis=True)
-                fig = coil.plot(show=False)    # sua função/objeto que gera o Plot
+                fig = pathFigure(coil)    # sua função/objeto que gera o Plot
                 st.plotly_chart(fig, use_container_width=True)
                 msg = "After downloading the coil path, return to the top and set 'Yes' to upload your coil path file and use it in calculations."
                 st.markdown(f"### {msg}")                
@@ -295,15 +464,15 @@ if Ratio == "No":
                 else:
                     num_points = int(num_points)
                 if Anticlockwise:
-                    coil = eml.mathematics.geometry.arc(center, radius, start_angle, angle, max_seg_len=length, n_points=num_points, anticlockwise=True)
+                    coil = generatePath("arc", center, radius, start_angle, angle, max_seg_len=length, n_points=num_points, anticlockwise=True)
                 else:
-                    coil = eml.mathematics.geometry.arc(center, radius, start_angle, angle, max_seg_len=length, n_points=num_points)
+                    coil = generatePath("arc", center, radius, start_angle, angle, max_seg_len=length, n_points=num_points)
                 st.success("Coil Path generated successfully!")
-                st.dataframe(pd.DataFrame(coil, columns=['X','Y','Z']))
-                st.download_button(label="Download Coil Path as .txt", data=pd.DataFrame(coil).to_csv(index=False).encode('utf-8'), file_name='Arch_coil_path.txt', mime='text/csv')
+                tablePreview(coil, ['X','Y','Z'], "Arch")
+                st.download_button(label="Download Coil Path as .txt", data=partial(pathText, coil), file_name='Arch_coil_path.txt', mime='text/csv')
+                tableDownloads(coil, eml.export.PATH_COLUMNS, eml.export.metadata(units='m', coil_hash=eml.cache.contentKey(coil)), "Arch_coil_path", "Arch")
 
-                coil = eml.models.coil.Coil(coil, invertRAxis=True)
-                fig = coil.plot(show=False)    # sua função/objeto que gera o Plot
+                fig = pathFigure(coil)    # sua função/objeto que gera o Plot
                 st.plotly_chart(fig, use_container_width=True)
                 msg = "After downloading the coil path, return to the top and set 'Yes' to upload your coil path file and use it in calculations."
                 st.markdown(f"### {msg}")    
@@ -321,13 +490,14 @@ if Ratio == "No":
                 if length == "":
                     length = 0.1
                 length = float(length)
-                solenoid = eml.models.coil.Solenoid(n_turns, Pa, Pb, radius, max_seg_len=length, invertRAxis=True)
+                solenoid = buildSolenoid(n_turns, Pa, Pb, radius, length)
                 coilPath = solenoid.coilPath   
                 st.success("Coil Path generated successfully!")
-                st.dataframe(pd.DataFrame(coilPath, columns=['X','Y','Z']))
-                st.download_button(label="Download Coil Path as .txt", data=pd.DataFrame(coilPath).to_csv(index=False).encode('utf-8'), file_name='Solenoid_coil_path.txt', mime='text/csv')
+                tablePreview(coilPath, ['X','Y','Z'], "Solenoid")
+                st.download_button(label="Download Coil Path as .txt", data=partial(pathText, coilPath), file_name='Solenoid_coil_path.txt', mime='text/csv')
+                tableDownloads(coilPath, eml.export.PATH_COLUMNS, eml.export.metadata(units='m', coil_hash=eml.cache.contentKey(coilPath)), "Solenoid_coil_path", "Solenoid")
 
-                fig = solenoid.plot(show=False)    # sua função/objeto que gera o Plot
+                fig = pathFigure(coilPath)    # sua função/objeto que gera o Plot
                 st.plotly_chart(fig, use_container_width=True)
                 st.subheader("After downloading the coil path, return to the top and set 'Yes' to upload your coil path file and use it in calculations.") 
         
@@ -345,12 +515,12 @@ if Ratio == "No":
                 if max_length == "":
                     max_length = 0.1
                 length = float(length)
-                racetrack = eml.mathematics.geometry.race_track(center, width, length, max_length, int_radius)
+                racetrack = generatePath("race_track", center, width, length, max_length, int_radius)
                 st.success("Coil Path generated successfully!")
-                st.dataframe(pd.DataFrame(racetrack, columns=['X','Y','Z']))
-                st.download_button(label="Download Coil Path as .txt", data=pd.DataFrame(racetrack).to_csv(index=False).encode('utf-8'), file_name='RaceTrack_coil_path.txt', mime='text/csv')
-                coil = eml.models.coil.Coil(racetrack, invertRAxis=True)
-                fig = coil.plot(show=False)    # sua função/objeto que gera o Plot
+                tablePreview(racetrack, ['X','Y','Z'], "RaceTrack")
+                st.download_button(label="Download Coil Path as .txt", data=partial(pathText, racetrack), file_name='RaceTrack_coil_path.txt', mime='text/csv')
+                tableDownloads(racetrack, eml.export.PATH_COLUMNS, eml.export.metadata(units='m', coil_hash=eml.cache.contentKey(racetrack)), "RaceTrack_coil_path", "RaceTrack")
+                fig = pathFigure(racetrack)    # sua função/objeto que gera o Plot
                 st.plotly_chart(fig, use_container_width=True)
                 st.subheader("After downloading the coil path, return to the top and set 'Yes' to upload your coil path file and use it in calculations.")
         if shape == "Racetrack 2D":
@@ -369,12 +539,12 @@ if Ratio == "No":
                 if max_length == "":
                     max_length = 0.1
                 max_length = float(max_length)
-                racetrack2D = eml.mathematics.geometry.racetrack2d(center, width, length, max_length, int_radius, thickness)
+                racetrack2D = generatePath("racetrack2d", center, width, length, max_length, int_radius, thickness)
                 st.success("Coil Path generated successfully!")
-                st.dataframe(pd.DataFrame(racetrack2D, columns=['X','Y','Z']))
-                st.download_button(label="Download Coil Path as .txt", data=pd.DataFrame(racetrack2D).to_csv(index=False).encode('utf-8'), file_name='RaceTrack2D_coil_path.txt', mime='text/csv')
-                coil = eml.models.coil.Coil(racetrack2D, invertRAxis=True)
-                fig = coil.plot(show=False)    # sua função/objeto que gera o Plot
+                tablePreview(racetrack2D, ['X','Y','Z'], "RaceTrack2D")
+                st.download_button(label="Download Coil Path as .txt", data=partial(pathText, racetrack2D), file_name='RaceTrack2D_coil_path.txt', mime='text/csv')
+                tableDownloads(racetrack2D, eml.export.PATH_COLUMNS, eml.export.metadata(units='m', coil_hash=eml.cache.contentKey(racetrack2D)), "RaceTrack2D_coil_path", "RaceTrack2D")
+                fig = pathFigure(racetrack2D)    # sua função/objeto que gera o Plot
                 st.plotly_chart(fig, use_container_width=True)
                 st.subheader("After downloading the coil path, return to the top and set 'Yes' to upload your coil path file and use it in calculations.")
 
@@ -396,12 +566,12 @@ if Ratio == "No":
                 if max_length == "":
                     max_length = 0.1
                 max_length = float(max_length)
-                racetrack3D = eml.mathematics.geometry.racetrack3d(center, width, length, max_length, int_radius, thickness, height)
+                racetrack3D = generatePath("racetrack3d", center, width, length, max_length, int_radius, thickness, height)
                 st.success("Coil Path generated successfully!")
-                st.dataframe(pd.DataFrame(racetrack3D, columns=['X','Y','Z']))
-                st.download_button(label="Download Coil Path as .txt", data=pd.DataFrame(racetrack3D).to_csv(index=False).encode('utf-8'), file_name='RaceTrack3D_coil_path.txt', mime='text/csv')
-                coil = eml.models.coil.Coil(racetrack3D, invertRAxis=True)
-                fig = coil.plot(show=False)    # sua função/objeto que gera o Plot
+                tablePreview(racetrack3D, ['X','Y','Z'], "RaceTrack3D")
+                st.download_button(label="Download Coil Path as .txt", data=partial(pathText, racetrack3D), file_name='RaceTrack3D_coil_path.txt', mime='text/csv')
+                tableDownloads(racetrack3D, eml.export.PATH_COLUMNS, eml.export.metadata(units='m', coil_hash=eml.cache.contentKey(racetrack3D)), "RaceTrack3D_coil_path", "RaceTrack3D")
+                fig = pathFigure(racetrack3D)    # sua função/objeto que gera o Plot
                 st.plotly_chart(fig, use_container_width=True)
                 st.subheader("After downloading the coil path, return to the top and set 'Yes' to upload your coil path file and use it in calculations.")
 # else:
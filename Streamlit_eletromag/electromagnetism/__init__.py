@@ -1,6 +1,8 @@
 """
     This package summarizes various electromagnetism and utility calculations.
 """
-from . import system_calculations
-from .mathematics import constants, geometry
+__version__ = '0.0.1'
+
+from . import system_calculations, parallel, cache, jobs, export, loader
+from .mathematics import constants, geometry, compiled, biot_savart, octree, loops, axisymmetry, refinement, symmetry, decimation
 from .models import coil
@@ -0,0 +1,218 @@
+"""Cache Module.
+
+This module contains a persistent cache for field maps. Each entry is a .npy
+file named after a hash of everything that determines its content, such as the
+coil path, the evaluation points, the integration method and the library
+version, so equal requests from different sessions share the same entry.
+
+Entries are written to a temporary file and renamed, so readers never see a
+partial file. The total size of the directory is capped and the least recently
+used entries are removed first, together with the temporary files left behind
+by writes that were interrupted.
+"""
+import hashlib
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from . import __version__
+
+# Default size cap of the cache directory, in bytes.
+DEFAULT_CACHE_SIZE = 512 * 2**20
+
+# Environment variable overriding the default cache directory.
+CACHE_DIR_VARIABLE = 'ELECTROMAGNETISM_CACHE_DIR'
+
+_SUFFIX = '.npy'
+
+_TEMPORARY = '.tmp'
+
+# Age, in seconds, after which a temporary file is left over from a write that never finished.
+STALE_TEMPORARY_AGE = 3600
+
+
+def defaultCacheDirectory():
+    '''
+        Returns the directory used when none is given, either the one in the ELECTROMAGNETISM_CACHE_DIR
+        environment variable or electromagnetism/fields inside the user cache directory.
+    '''
+    if os.environ.get(CACHE_DIR_VARIABLE):
+        return os.environ[CACHE_DIR_VARIABLE]
+    base = os.environ.get('XDG_CACHE_HOME') or os.path.join(os.path.expanduser('~'), '.cache')
+    return os.path.join(base, 'electromagnetism', 'fields')
+
+
+def contentKey(*parts):
+    '''
+        Hashes the parts that identify an entry, together with the library version.
+        Arrays are hashed by their dtype, shape and bytes, any other part by its repr.
+
+        :returns str: the hexadecimal SHA-256 digest.
+    '''
+    digest = hashlib.sha256(f'electromagnetism {__version__}'.encode())
+    for part in parts:
+        if isinstance(part, np.ndarray):
+            part = np.ascontiguousarray(part)
+            digest.update(f'array {part.dtype.str} {part.shape}'.encode())
+            digest.update(part.data)
+        else:
+            digest.update(f'{type(part).__name__} {part!r}'.encode())
+        digest.update(b'\0')
+    return digest.hexdigest()
+
+
+class FieldCache:
+    """FieldCache class.
+    This class stores arrays on disk under content keys, with a size cap, least recently
+    used eviction and counters of the hits and misses of the instance."""
+    def __init__(self, directory: str = None, max_bytes: int = DEFAULT_CACHE_SIZE):
+        '''
+            Opens, or creates, a cache directory.
+
+            :param directory str: (optional) the directory of the entries, see defaultCacheDirectory.
+            :param max_bytes int: (optional) the size cap of the directory, in bytes.
+
+            :raises ValueError: if max_bytes is not positive.
+        '''
+        if max_bytes <= 0:
+            raise ValueError("The size of the cache must be positive")
+        self.directory = directory or defaultCacheDirectory()
+        self.max_bytes = int(max_bytes)
+        self._hits = 0
+        self._misses = 0
+        os.makedirs(self.directory, exist_ok=True)
+
+    @property
+    def hits(self):
+        '''
+            Returns the number of lookups that found an entry.
+        '''
+        return self._hits
+
+    @property
+    def misses(self):
+        '''
+            Returns the number of lookups that did not find an entry.
+        '''
+        return self._misses
+
+    def __path(self, key):
+        return os.path.join(self.directory, key + _SUFFIX)
+
+    def get(self, key: str):
+        '''
+            Looks an entry up and marks it as the most recently used.
+
+            :param key str: the content key, see contentKey.
+
+            :returns numpy.ndarray: the stored array, or None if there is no such entry.
+        '''
+        path = self.__path(key)
+        try:
+            array = np.load(path, allow_pickle=False)
+            os.utime(path)
+        except FileNotFoundError:
+            # Also covers an entry evicted by another process between the two calls.
+            self._misses += 1
+            return None
+        except (OSError, ValueError):
+            # A damaged entry is dropped and recomputed.
+            self.__remove(path)
+            self._misses += 1
+            return None
+        self._hits += 1
+        return array
+
+    def put(self, key: str, array: np.ndarray):
+        '''
+            Stores an array atomically and evicts the least recently used entries above the size cap.
+
+            :param key str: the content key, see contentKey.
+            :param array numpy.ndarray: the array to be stored.
+        '''
+        descriptor, temporary = tempfile.mkstemp(dir=self.directory, suffix=_TEMPORARY)
+        try:
+            with os.fdopen(descriptor, 'wb') as file:
+                np.save(file, np.asarray(array), allow_pickle=False)
+            os.replace(temporary, self.__path(key))
+        except BaseException:
+            self.__remove(temporary)
+            raise
+        self.evict()
+
+    def getOrCompute(self, key: str, compute):
+        '''
+            Returns the entry of a key, computing and storing it when it is missing.
+
+            :param key str: the content key, see contentKey.
+            :param compute callable: a function without arguments returning the array.
+
+            :returns numpy.ndarray: the stored or the computed array.
+        '''
+        array = self.get(key)
+        if array is None:
+            array = compute()
+            self.put(key, array)
+        return array
+
+    def __entries(self, suffix = _SUFFIX):
+        '''
+            Lists the (modification time, size, path) of every entry, or of every file with another suffix.
+        '''
+        entries = []
+        for name in os.listdir(self.directory):
+            if not name.endswith(suffix):
+                continue
+            path = os.path.join(self.directory, name)
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, path))
+        return entries
+
+    def size(self):
+        '''
+            Returns the total size of the entries, in bytes.
+        '''
+        return sum(size for _, size, _ in self.__entries())
+
+    def __removeStale(self):
+        '''
+            Removes the temporary files older than STALE_TEMPORARY_AGE, left over by writes interrupted by a crash.
+        '''
+        limit = time.time() - STALE_TEMPORARY_AGE
+        for mtime, _, path in self.__entries(_TEMPORARY):
+            if mtime < limit:
+                self.__remove(path)
+
+    def evict(self):
+        '''
+            Removes the stale temporary files and the least recently used entries until the directory
+            fits the size cap.
+        '''
+        self.__removeStale()
+        entries = sorted(self.__entries())
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in entries:
+            if total <= self.max_bytes:
+                break
+            self.__remove(path)
+            total -= size
+
+    def clear(self):
+        '''
+            Removes every entry and the stale temporary files.
+        '''
+        self.__removeStale()
+        for _, _, path in self.__entries():
+            self.__remove(path)
+
+    @staticmethod
+    def __remove(path):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,195 @@
+"""Export Module.
+
+This module writes field maps and coil paths to binary files, which are much
+smaller and faster to write and read than text tables. Every file holds a
+table, the names of its columns and a metadata dictionary, such as the hash of
+the coil path, the current, the integration method and the grid the points
+come from.
+
+Three formats are available:
+    - 'npz': a NumPy archive with the table, the columns and the metadata.
+    - 'npy': the bare table, written through a memory map so it can be read back
+      with numpy.load(mmap_mode='r'). The columns and the metadata go to a .json
+      file next to it, so it can only be written to a path.
+    - 'parquet': a Parquet file, needs pyarrow, with the metadata in its schema.
+"""
+import io
+import json
+import os
+
+import numpy as np
+
+from . import __version__
+from .cache import contentKey
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+PARQUET_AVAILABLE = pyarrow is not None
+
+FORMATS = ('npz', 'npy', 'parquet')
+
+FIELD_COLUMNS = ('x', 'y', 'z', 'Bx', 'By', 'Bz', '|B|')
+
+PATH_COLUMNS = ('x', 'y', 'z')
+
+# Key of the metadata in the schema of Parquet files.
+_PARQUET_KEY = b'electromagnetism'
+
+
+def fieldTable(points: np.ndarray, B: np.ndarray):
+    '''
+        Joins points and their magnetic field into a table with the columns of FIELD_COLUMNS.
+
+        :param points numpy.ndarray: the points, in the format [[x1,y1,z1],...].
+        :param B numpy.ndarray: the magnetic field, in the format [[Bx1,By1,Bz1],...].
+
+        :returns numpy.ndarray: the table, in the format [[x1,y1,z1,Bx1,By1,Bz1,|B|1],...].
+    '''
+    B = np.asarray(B, dtype=float)
+    return np.column_stack((np.asarray(points, dtype=float), B, np.linalg.norm(B, axis=1)))
+
+
+def metadata(coil=None, **fields):
+    '''
+        Builds the metadata of a file.
+
+        :param coil electromagnetism.models.coil.Coil: (optional) the coil, identified by the hash of its path.
+        :param fields: (optional) any other entry, such as current, method or grid. Arrays are stored as lists.
+
+        :returns dict: the metadata.
+    '''
+    result = {'version': __version__}
+    if coil is not None:
+        result['coil'] = type(coil).__name__
+        result['coil_hash'] = contentKey(coil.coilPath)
+        result['coil_points'] = len(coil.coilPath)
+    for name, value in fields.items():
+        result[name] = value.tolist() if isinstance(value, np.ndarray) else value
+    return result
+
+
+def formatOf(file, file_format: str = None):
+    '''
+        Returns the format of a file, given or taken from the extension of its path.
+
+        :raises ValueError: if the format is unknown, cannot be guessed, or is 'parquet' without pyarrow.
+    '''
+    if file_format is None and isinstance(file, (str, os.PathLike)):
+        file_format = os.path.splitext(os.fspath(file))[1].lstrip('.').lower()
+    if file_format not in FORMATS:
+        raise ValueError(f"Unknown format '{file_format}', expected one of {FORMATS}")
+    if file_format == 'parquet' and not PARQUET_AVAILABLE:
+        raise ValueError("The 'parquet' format needs pyarrow to be installed")
+    return file_format
+
+
+def saveTable(file, table: np.ndarray, columns, info: dict = None, file_format: str = None):
+    '''
+        Writes a table to a binary file.
+
+        :param file str|file: a path, or a binary file object.
+        :param table numpy.ndarray: the table, one row per point.
+        :param columns list: the name of each column.
+        :param info dict: (optional) the metadata, see the metadata function.
+        :param file_format str: (optional) one of FORMATS, the default is the extension of the path.
+
+        :raises ValueError: if the format is not valid, the columns do not match the table or an 'npy' table
+        is written to a file object, which has no room for the columns and the metadata.
+    '''
+    file_format = formatOf(file, file_format)
+    if file_format == 'npy' and not isinstance(file, (str, os.PathLike)):
+        raise ValueError("The 'npy' format keeps the columns and the metadata in a .json file next to the table, "
+                         "write it to a path or use 'npz'")
+    table = np.asarray(table, dtype=float)
+    columns = [str(column) for column in columns]
+    if table.ndim != 2 or table.shape[1] != len(columns):
+        raise ValueError("The table must have one column for each name")
+    encoded = json.dumps(info or {})
+
+    if file_format == 'npz':
+        np.savez(file, table=table, columns=np.array(columns), metadata=np.array(encoded))
+    elif file_format == 'parquet':
+        arrays = [pyarrow.array(table[:, index]) for index in range(len(columns))]
+        schema = pyarrow.schema([(column, pyarrow.float64()) for column in columns], metadata={_PARQUET_KEY: encoded})
+        pyarrow.parquet.write_table(pyarrow.Table.from_arrays(arrays, schema=schema), file)
+    else:
+        mapped = np.lib.format.open_memmap(file, mode='w+', dtype=float, shape=table.shape)
+        mapped[:] = table
+        mapped.flush()
+        del mapped
+        with open(os.fspath(file) + '.json', 'w') as sidecar:
+            json.dump({'columns': columns, 'metadata': info or {}}, sidecar)
+
+
+def loadTable(file, file_format: str = None, mmap_mode: str = None):
+    '''
+        Reads a table written by saveTable.
+
+        :param file str|file: a path, or a binary file object.
+        :param file_format str: (optional) one of FORMATS, the default is the extension of the path.
+        :param mmap_mode str: (optional) for 'npy' paths, the mode the table is memory-mapped with, such as 'r'.
+
+        :returns tuple: the table, the names of its columns and the metadata. A bare 'npy' file without its
+        .json file has no names and an empty metadata.
+
+        :raises ValueError: if the format is not valid.
+    '''
+    file_format = formatOf(file, file_format)
+    if file_format == 'npz':
+        with np.load(file, allow_pickle=False) as archive:
+            return archive['table'], [str(column) for column in archive['columns']], json.loads(str(archive['metadata']))
+    if file_format == 'parquet':
+        data = pyarrow.parquet.read_table(file)
+        info = (data.schema.metadata or {}).get(_PARQUET_KEY, b'{}')
+        table = np.column_stack([column.to_numpy() for column in data.columns]) if data.num_columns else np.empty((0, 0))
+        return table, list(data.column_names), json.loads(info)
+
+    isPath = isinstance(file, (str, os.PathLike))
+    table = np.load(file, mmap_mode=mmap_mode if isPath else None, allow_pickle=False)
+    sidecar = os.fspath(file) + '.json' if isPath else None
+    if sidecar is not None and os.path.exists(sidecar):
+        with open(sidecar) as handle:
+            info = json.load(handle)
+        return table, info['columns'], info['metadata']
+    return table, None, {}
+
+
+def tableBytes(table: np.ndarray, columns, info: dict = None, file_format: str = 'npz'):
+    '''
+        Writes a table to memory, for instance to be downloaded, in the 'npz' or 'parquet' format, see saveTable.
+
+        :returns bytes: the content of the file.
+    '''
+    buffer = io.BytesIO()
+    saveTable(buffer, table, columns, info, file_format)
+    return buffer.getvalue()
+
+
+def saveField(file, points: np.ndarray, B: np.ndarray, coil=None, file_format: str = None, **fields):
+    '''
+        Writes a field map, see fieldTable and saveTable.
+
+        :param file str|file: a path, or a binary file object.
+        :param points numpy.ndarray: the points, in the format [[x1,y1,z1],...].
+        :param B numpy.ndarray: the magnetic field, in Tesla, in the format [[Bx1,By1,Bz1],...].
+        :param coil electromagnetism.models.coil.Coil: (optional) the coil the field comes from.
+        :param file_format str: (optional) one of FORMATS, the default is the extension of the path.
+        :param fields: (optional) other metadata, such as current, method or grid.
+    '''
+    saveTable(file, fieldTable(points, B), FIELD_COLUMNS, metadata(coil, units='m, T', **fields), file_format)
+
+
+def savePath(file, coil, file_format: str = None, **fields):
+    '''
+        Writes the path of a coil, see saveTable.
+
+        :param file str|file: a path, or a binary file object.
+        :param coil electromagnetism.models.coil.Coil: the coil.
+        :param file_format str: (optional) one of FORMATS, the default is the extension of the path.
+        :param fields: (optional) other metadata.
+    '''
+    saveTable(file, coil.coilPath, PATH_COLUMNS, metadata(coil, units='m', **fields), file_format)
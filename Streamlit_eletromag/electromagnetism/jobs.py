@@ -0,0 +1,305 @@
+"""Jobs Module.
+
+This module runs long field calculations in the background. Each job gets an
+id that can be polled for its status and progress, cancelled, and whose result
+is kept after the job finishes, so callers that are restarted, such as a
+Streamlit script on every rerun, can pick the job up again instead of starting
+it over.
+
+Jobs run on a thread pool. The kernels spend their time in NumPy or in compiled
+code, so the threads do not hold each other back on the GIL. A job is shared with
+its executor through events and its partial result, which do not cross process
+boundaries, so process pools are not supported.
+
+Jobs may have an owner, such as the session of a web page. A job is only found,
+cancelled or forgotten by its owner, so owners sharing a queue cannot reach each
+other's jobs.
+"""
+import threading
+import uuid
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+QUEUED = 'queued'
+RUNNING = 'running'
+DONE = 'done'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+
+# Number of finished jobs kept with their results, the oldest ones are dropped first.
+DEFAULT_MAX_FINISHED = 16
+
+
+class JobCancelled(Exception):
+    """JobCancelled class.
+    Raised inside a job when it notices it was cancelled."""
+
+
+class Job:
+    """Job class.
+    This class holds the state of a background job: its status, progress, result or error."""
+    def __init__(self, key=None, owner=None):
+        '''
+            Creates a queued job.
+
+            :param key str: (optional) the key the job was submitted with.
+            :param owner str: (optional) the owner the job was submitted by.
+        '''
+        self.id = uuid.uuid4().hex
+        self.key = key
+        self.owner = owner
+        self._status = QUEUED
+        self._progress = 0.0
+        self._partial = None
+        self._result = None
+        self._error = None
+        self._cancelled = threading.Event()
+        self._finished = threading.Event()
+
+    @property
+    def status(self):
+        '''
+            Returns one of 'queued', 'running', 'done', 'failed' or 'cancelled'.
+        '''
+        return self._status
+
+    @property
+    def progress(self):
+        '''
+            Returns the fraction of the job that is done, between 0 and 1.
+        '''
+        return self._progress
+
+    @property
+    def partial(self):
+        '''
+            Returns the result computed so far, when the job reports one, or None.
+        '''
+        return self._partial
+
+    @property
+    def result(self):
+        '''
+            Returns the result of a finished job, or None.
+        '''
+        return self._result
+
+    @property
+    def error(self):
+        '''
+            Returns the exception that made the job fail, or None.
+        '''
+        return self._error
+
+    @property
+    def finished(self):
+        '''
+            Returns whether the job is done, failed or was cancelled.
+        '''
+        return self._finished.is_set()
+
+    def cancel(self):
+        '''
+            Asks the job to stop. A queued job never starts, a running one stops at its next progress report.
+        '''
+        self._cancelled.set()
+        if self._status == QUEUED:
+            self.__finish(CANCELLED)
+
+    def wait(self, timeout: float = None):
+        '''
+            Waits for the job to finish.
+
+            :param timeout float: (optional) the maximum time to wait, in seconds.
+
+            :returns bool: whether the job is finished.
+        '''
+        return self._finished.wait(timeout)
+
+    def report(self, progress: float, partial=None):
+        '''
+            Called by the running function to report its progress, it raises JobCancelled when the job
+            was cancelled.
+
+            :param progress float: the fraction of the job that is done.
+            :param partial: (optional) the result computed so far.
+
+            :raises JobCancelled: if the job was cancelled.
+        '''
+        if self._cancelled.is_set():
+            raise JobCancelled()
+        self._progress = float(progress)
+        if partial is not None:
+            self._partial = partial
+
+    def _run(self, function, args, kwargs):
+        '''
+            Runs the function of the job in the executor, passing the job itself as the first argument.
+        '''
+        if self._cancelled.is_set():
+            return
+        self._status = RUNNING
+        try:
+            result = function(self, *args, **kwargs)
+        except JobCancelled:
+            self.__finish(CANCELLED)
+        except Exception as error:
+            self._error = error
+            self.__finish(FAILED)
+        else:
+            self._result = result
+            self._progress = 1.0
+            self.__finish(DONE)
+
+    def __finish(self, status):
+        self._status = status
+        self._finished.set()
+
+
+def _fieldJob(job, coil, points, integration_method, I, chunk, options):
+    '''
+        Evaluates the magnetic field of a coil block by block, reporting the blocks as they are done.
+    '''
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    field = np.full((len(points), 3), np.nan)
+    job.report(0.0, field)
+    done = 0
+    for block, B in coil.iterBiotSavart(points, integration_method, I, chunk=chunk, **options):
+        field[block] = B
+        done += len(B)
+        job.report(done / max(len(points), 1))
+    return field
+
+
+class JobQueue:
+    """JobQueue class.
+    This class submits functions to a thread pool and keeps track of them by id. Jobs submitted
+    with the same key by the same owner are shared, so a repeated request returns the job already running."""
+    def __init__(self, executor: ThreadPoolExecutor = None, max_workers: int = 1,
+                 max_finished: int = DEFAULT_MAX_FINISHED):
+        '''
+            Creates a queue.
+
+            :param executor concurrent.futures.ThreadPoolExecutor: (optional) the thread pool running the jobs,
+            the default is one owned by the queue. The jobs keep their state in the process, so other
+            executors, such as a process pool, are not supported.
+            :param max_workers int: (optional) the number of threads of the default executor.
+            :param max_finished int: (optional) the number of finished jobs kept with their results.
+
+            :raises ValueError: if the executor is not a thread pool.
+        '''
+        if executor is not None and not isinstance(executor, ThreadPoolExecutor):
+            raise ValueError(f"the executor must be a ThreadPoolExecutor, not {type(executor).__name__}")
+        self._executor = executor or ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='field-job')
+        self.max_finished = int(max_finished)
+        self._jobs = OrderedDict()
+        self._keys = {}
+        self._lock = threading.Lock()
+
+    def submit(self, function, *args, key=None, owner=None, **kwargs):
+        '''
+            Submits a function, called as function(job, *args, **kwargs). It may call job.report to
+            publish its progress and to be cancelled.
+
+            :param function callable: the function to be run.
+            :param key str: (optional) identifies the request. When a job with the same key and owner is
+            still known and was not cancelled nor failed, that job is returned instead of a new one.
+            :param owner str: (optional) the owner of the job, such as a session id.
+
+            :returns Job: the job.
+        '''
+        with self._lock:
+            if key is not None and (owner, key) in self._keys:
+                job = self._jobs.get(self._keys[(owner, key)])
+                if job is not None and job.status not in (CANCELLED, FAILED):
+                    return job
+            job = Job(key, owner)
+            self._jobs[job.id] = job
+            if key is not None:
+                self._keys[(owner, key)] = job.id
+            self.__dropFinished()
+        self._executor.submit(job._run, function, args, kwargs)
+        return job
+
+    def submitField(self, coil, points, integration_method='Simpson', I: float = 1, *, chunk: int = 1024, key=None,
+                    owner=None, **options):
+        '''
+            Submits the calculation of the magnetic field of a coil, see Coil.iterBiotSavart. The partial
+            result is filled block by block, NaN marking the points not done yet.
+
+            :param coil electromagnetism.models.coil.Coil: the coil.
+            :param points numpy.ndarray: the points, in the format [[x1,y1,z1],...].
+            :param integration_method str: (optional) any method accepted by Coil.biotSavart3d.
+            :param I float: (optional) the current going through the coil, in Amperes.
+            :param chunk int: (optional) the number of points between two progress reports.
+            :param key str: (optional) same as in submit.
+            :param owner str: (optional) same as in submit.
+            :param options: (optional) other keyword arguments of Coil.iterBiotSavart, such as cache.
+
+            :returns Job: the job, whose result is the field in the format [[Bx1,By1,Bz1],...].
+        '''
+        return self.submit(_fieldJob, coil, points, integration_method, I, chunk, options, key=key, owner=owner)
+
+    def get(self, job_id: str, owner=None):
+        '''
+            Returns the job with an id, or None if it is not known anymore or belongs to another owner.
+        '''
+        job = self._jobs.get(job_id)
+        return job if job is not None and job.owner == owner else None
+
+    def find(self, key, owner=None):
+        '''
+            Returns the last job submitted with a key by an owner, or None.
+        '''
+        job_id = self._keys.get((owner, key))
+        return None if job_id is None else self._jobs.get(job_id)
+
+    def cancel(self, job_id: str, owner=None):
+        '''
+            Cancels a job of an owner, see Job.cancel.
+        '''
+        job = self.get(job_id, owner)
+        if job is not None:
+            job.cancel()
+
+    def forget(self, job_id: str, owner=None):
+        '''
+            Cancels a job of an owner and removes it from the queue.
+        '''
+        with self._lock:
+            job = self.get(job_id, owner)
+            if job is None:
+                return
+            del self._jobs[job_id]
+            if job.key is not None and self._keys.get((owner, job.key)) == job_id:
+                del self._keys[(owner, job.key)]
+        job.cancel()
+
+    def jobs(self, owner=None):
+        '''
+            Returns a list with every known job of an owner, from the oldest to the newest.
+        '''
+        return [job for job in self._jobs.values() if job.owner == owner]
+
+    def shutdown(self, cancel: bool = True):
+        '''
+            Shuts the executor down.
+
+            :param cancel bool: (optional) whether the unfinished jobs are cancelled first.
+        '''
+        if cancel:
+            for job in list(self._jobs.values()):
+                job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=cancel)
+
+    def __dropFinished(self):
+        '''
+            Drops the oldest finished jobs above max_finished, the lock must be held.
+        '''
+        finished = [job for job in self._jobs.values() if job.finished]
+        for job in finished[:max(0, len(finished) - self.max_finished)]:
+            del self._jobs[job.id]
+            if job.key is not None and self._keys.get((job.owner, job.key)) == job.id:
+                del self._keys[(job.owner, job.key)]
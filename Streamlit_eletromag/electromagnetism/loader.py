@@ -0,0 +1,263 @@
+"""Loader Module.
+
+This module loads coil paths from text files. A text file is parsed only once:
+the parsed array is written to a .npy sidecar next to it, named after a key
+made of the modification time, the size and the hash of the source, and later
+loads memory-map the sidecar instead of parsing the text again.
+
+The arrays returned are read-only memory maps, so every coil, or every process,
+loading the same path shares the pages of a single file instead of holding its
+own copy.
+
+Text tables, whether files or uploaded bytes, are read by parseTable: the
+delimiter and a title row are sniffed from the start of the table, which is
+then parsed in blocks by the C parser of pandas, when it is installed, and
+each block is validated as soon as it is read.
+"""
+import glob
+import hashlib
+import io
+import os
+import tempfile
+
+import numpy as np
+
+from .cache import contentKey
+
+try:
+    import pandas
+except ImportError:
+    pandas = None
+
+# Delimiters recognised by sniffTable, white space is used when none of them is found.
+DELIMITERS = (',', ';', '\t')
+
+# Bytes, and lines, at the start of a table looked at by sniffTable.
+SNIFF_BYTES = 64 * 2**10
+SNIFF_LINES = 50
+
+# Rows parsed and validated at once by parseTable.
+CHUNK_ROWS = 2**18
+
+_SIDECAR = '.{name}.{key}.npy'
+
+# Bytes read at once when hashing a source file.
+_HASH_BLOCK = 2**20
+
+
+def sourceKey(filename: str):
+    '''
+        Identifies the content of a file by its modification time, size and SHA-256 digest.
+
+        :returns str: the key, a shortened content key.
+    '''
+    stat = os.stat(filename)
+    digest = hashlib.sha256()
+    with open(filename, 'rb') as file:
+        for block in iter(lambda: file.read(_HASH_BLOCK), b''):
+            digest.update(block)
+    return contentKey('path source', stat.st_mtime_ns, stat.st_size, digest.hexdigest())[:32]
+
+
+def sidecarPath(filename: str, key: str = None):
+    '''
+        Returns the path of the sidecar of a source file.
+
+        :param filename str: the source file.
+        :param key str: (optional) the key of its content, see sourceKey.
+    '''
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, _SIDECAR.format(name=name, key=key or sourceKey(filename)))
+
+
+def parsePath(filename: str):
+    '''
+        Parses a text file of coordinates, see parseTable.
+
+        :returns numpy.ndarray: the parsed array, two-dimensional.
+    '''
+    with open(filename, 'rb') as file:
+        return parseTable(file)
+
+
+def _isNumeric(line, delimiter):
+    try:
+        [float(value) for value in (line.split(delimiter) if delimiter else line.split()) if value.strip()]
+    except ValueError:
+        return False
+    return True
+
+
+def sniffTable(sample: bytes):
+    '''
+        Guesses the layout of a text table from its first bytes.
+
+        :param sample bytes: the start of the table.
+
+        :returns tuple: the delimiter, None meaning white space, and the number of title rows, 0 or 1.
+
+        :raises ValueError: if the sample has no data.
+    '''
+    lines = sample.decode('utf-8', errors='replace').splitlines()
+    if len(sample) >= SNIFF_BYTES and lines:
+        # The last line may be cut, a line longer than the sample loses its last value instead.
+        if len(lines) > 1:
+            lines = lines[:-1]
+        else:
+            lines[0] = lines[0][:max(lines[0].rfind(separator) for separator in (*DELIMITERS, ' '))]
+    lines = [line.strip() for line in lines if line.strip()][:SNIFF_LINES]
+    if not lines:
+        raise ValueError("The table is empty")
+
+    # The first line is a title when it is not a row of numbers whatever the delimiter.
+    title = not any(_isNumeric(lines[0], candidate) for candidate in (*DELIMITERS, None))
+    data = lines[title:] or lines
+    # A delimiter splitting every line into numbers is preferred, then white space, which also splits lines
+    # mixing tabs and spaces, then a delimiter found in every line, so the parser reports the wrong values.
+    present = [candidate for candidate in DELIMITERS if all(candidate in line for line in data)]
+    delimiter = next((candidate for candidate in present if all(_isNumeric(line, candidate) for line in data)), None)
+    if delimiter is None and present and not all(_isNumeric(line, None) for line in data):
+        delimiter = present[0]
+    return delimiter, int(title)
+
+
+def _badLine(source, start, delimiter, header):
+    '''
+        Returns the number, counted from 1, of the first line of a table, after its title rows, that is not
+        a row of numbers, or None if there is none.
+    '''
+    source.seek(start)
+    for number, line in enumerate(source, 1):
+        line = line.decode('utf-8', errors='replace')
+        if number > header and line.strip() and not _isNumeric(line.strip(), delimiter):
+            return number
+    return None
+
+
+def parseTable(source, delimiter: str = 'sniff', header: int = None):
+    '''
+        Parses a text table of numbers, validating it block by block.
+
+        :param source bytes|file: the content of the table, or a binary file object positioned at its start.
+        :param delimiter str: (optional) the delimiter, None for white space, or 'sniff' to guess it, see sniffTable.
+        :param header int: (optional) the number of title rows, guessed by default.
+
+        :returns numpy.ndarray: the table, two-dimensional.
+
+        :raises ValueError: if the table is empty, its rows have different lengths, or a value is not a number.
+    '''
+    if isinstance(source, (bytes, bytearray, memoryview)):
+        source = io.BytesIO(source)
+    start = source.tell()
+    sample = source.read(SNIFF_BYTES)
+    source.seek(start)
+    sniffed = sniffTable(sample)
+    if delimiter == 'sniff':
+        delimiter = sniffed[0]
+    if header is None:
+        header = sniffed[1]
+
+    if pandas is None:
+        return np.loadtxt(source, dtype=float, delimiter=delimiter, skiprows=header, ndmin=2)
+
+    reader = pandas.read_csv(source, sep=delimiter or r'\s+', header=None, skiprows=header, dtype=float,
+                             skipinitialspace=True, engine='c', chunksize=CHUNK_ROWS)
+    blocks, rows = [], header
+    with reader:
+        while True:
+            try:
+                block = next(reader, None)
+            except ValueError as error:
+                line = _badLine(source, start, delimiter, header)
+                where = f"at line {line}" if line is not None else f"after line {rows}"
+                raise ValueError(f"The table could not be read {where}: {error}") from error
+            if block is None:
+                break
+            block = block.to_numpy()
+            if blocks and block.shape[1] != blocks[0].shape[1]:
+                raise ValueError(f"The rows after line {rows} have {block.shape[1]} values instead of {blocks[0].shape[1]}")
+            missing = np.flatnonzero(np.isnan(block).any(axis=1))
+            if len(missing):
+                raise ValueError(f"Line {rows + missing[0] + 1} has missing values")
+            blocks.append(block)
+            rows += len(block)
+    if not blocks:
+        raise ValueError("The table is empty")
+    return np.concatenate(blocks) if len(blocks) > 1 else blocks[0]
+
+
+def orientTable(table: np.ndarray):
+    '''
+        Puts a table of points in the format [[x1,y1,z1],...], transposing it if it is given as [[X],[Y],[Z]].
+
+        :returns tuple: the points and whether they were transposed.
+
+        :raises ValueError: if the table has neither three columns nor three rows.
+    '''
+    table = np.asarray(table, dtype=float)
+    if table.ndim == 2 and table.shape[1] == 3:
+        return table, False
+    if table.ndim == 2 and table.shape[0] == 3:
+        return np.ascontiguousarray(table.T), True
+    raise ValueError(f"The points must have three columns, or three rows, not the shape {table.shape}")
+
+
+def loadPath(filename: str, sidecar: bool = True):
+    '''
+        Loads a path from a text file, through its .npy sidecar when it is up to date.
+
+        :param filename str: the text file.
+        :param sidecar bool: (optional) whether the sidecar is used and written. Stale sidecars of the
+        same source are removed. When the directory is not writable the file is just parsed.
+
+        :returns numpy.ndarray: the array, a read-only memory map of the sidecar when there is one.
+    '''
+    filename = os.fspath(filename)
+    if not sidecar:
+        array = parsePath(filename)
+        array.flags.writeable = False
+        return array
+
+    target = sidecarPath(filename)
+    if not os.path.exists(target):
+        array = parsePath(filename)
+        try:
+            _writeSidecar(target, array)
+        except OSError:
+            array.flags.writeable = False
+            return array
+    try:
+        return np.load(target, mmap_mode='r', allow_pickle=False)
+    except (OSError, ValueError):
+        # A damaged sidecar is removed, the next load writes it again.
+        _remove(target)
+        return loadPath(filename, sidecar=False)
+
+
+def _writeSidecar(target, array):
+    '''
+        Writes a sidecar atomically and removes the older sidecars of the same source.
+    '''
+    directory, name = os.path.split(target)
+    source = name.split('.')[1:-2]
+    stale = glob.glob(os.path.join(glob.escape(directory), _SIDECAR.format(name=glob.escape('.'.join(source)), key='*')))
+    descriptor, temporary = tempfile.mkstemp(dir=directory, suffix='.tmp')
+    try:
+        with os.fdopen(descriptor, 'wb') as file:
+            np.save(file, np.ascontiguousarray(array), allow_pickle=False)
+        os.replace(temporary, target)
+    except BaseException:
+        _remove(temporary)
+        raise
+    for path in stale:
+        if path != target:
+            _remove(path)
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+    except OSError:
+        # Already removed, or still mapped on a platform that cannot remove mapped files: a later write
+        # of a sidecar of the same source removes it.
+        pass
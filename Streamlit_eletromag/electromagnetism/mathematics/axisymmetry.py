@@ -0,0 +1,85 @@
+"""Axisymmetry Module.
+
+This module contains the tools to evaluate nearly axisymmetric coils, such as
+solenoids, on a 2D (rho, z) grid instead of on every requested 3D point. The
+field is sampled on a few half-planes around the axis, averaged in cylindrical
+components and interpolated back to the 3D points by rotation. The spread
+between the half-planes measures how far the coil is from being symmetric.
+"""
+import numpy as np
+from scipy.interpolate import RegularGridInterpolator
+
+
+def toCylindrical(points: np.ndarray, center):
+    '''
+        Converts points to cylindrical coordinates around an axis parallel to z.
+
+        :param points numpy.ndarray: the points in the format [[x1,y1,z1],...].
+        :param center list|numpy.ndarray: the (x, y) position of the axis.
+
+        :returns tuple: the arrays rho, phi and z.
+    '''
+    x = points[:, 0] - center[0]
+    y = points[:, 1] - center[1]
+    return np.hypot(x, y), np.arctan2(y, x), points[:, 2]
+
+
+def gridAxes(points: np.ndarray, center, n_r: int, n_z: int):
+    '''
+        Calculates the (rho, z) grid covering a set of points.
+
+        :returns tuple: the rho and z axes of the grid.
+    '''
+    rho, _, z = toCylindrical(points, center)
+    rhoAxis = np.linspace(0, max(rho.max(), np.finfo(float).eps), n_r)
+    zAxis = np.linspace(z.min(), z.max() if z.max() > z.min() else z.min() + 1, n_z)
+    return rhoAxis, zAxis
+
+
+def halfPlanePoints(rhoAxis: np.ndarray, zAxis: np.ndarray, center, n_phi: int):
+    '''
+        Places the (rho, z) grid on n_phi half-planes evenly spread around the axis.
+
+        :returns numpy.ndarray: the points in the format [[x1,y1,z1],...], ordered by half-plane, rho and z.
+    '''
+    phi = 2 * np.pi * np.arange(n_phi) / n_phi
+    pp, rr, zz = np.meshgrid(phi, rhoAxis, zAxis, indexing='ij')
+    return np.column_stack((center[0] + (rr * np.cos(pp)).ravel(),
+                            center[1] + (rr * np.sin(pp)).ravel(),
+                            zz.ravel()))
+
+
+def cylindricalAverage(field: np.ndarray, n_phi: int, n_r: int, n_z: int):
+    '''
+        Averages the field sampled by halfPlanePoints in cylindrical components.
+
+        :param field numpy.ndarray: the cartesian field at the points of halfPlanePoints.
+
+        :returns tuple: the averaged (B_rho, B_phi, B_z) grid, of shape (n_r, n_z, 3), and the relative
+        asymmetry, the RMS deviation of the half-planes from the average over the RMS averaged field. The
+        RMS keeps the nodes that fall next to the wire from dominating the measure.
+    '''
+    phi = 2 * np.pi * np.arange(n_phi) / n_phi
+    field = field.reshape(n_phi, n_r, n_z, 3)
+    cos, sin = np.cos(phi)[:, None, None], np.sin(phi)[:, None, None]
+    cylindrical = np.stack((field[..., 0] * cos + field[..., 1] * sin,
+                            -field[..., 0] * sin + field[..., 1] * cos,
+                            field[..., 2]), axis=-1)
+
+    average = cylindrical.mean(axis=0)
+    scale = np.linalg.norm(average) * np.sqrt(n_phi)
+    deviation = np.linalg.norm(cylindrical - average)
+    return average, (float(deviation / scale) if scale > 0 else 0.0)
+
+
+def interpolateField(rhoAxis: np.ndarray, zAxis: np.ndarray, grid: np.ndarray, points: np.ndarray, center):
+    '''
+        Interpolates the (B_rho, B_phi, B_z) grid at 3D points and rotates it back to cartesian components.
+
+        :returns numpy.ndarray: the field in the format [[Bx1,By1,Bz1],...].
+    '''
+    rho, phi, z = toCylindrical(points, center)
+    interpolator = RegularGridInterpolator((rhoAxis, zAxis), grid, bounds_error=False, fill_value=None)
+    bRho, bPhi, bZ = interpolator(np.column_stack((rho, z))).T
+    cos, sin = np.cos(phi), np.sin(phi)
+    return np.column_stack((bRho * cos - bPhi * sin, bRho * sin + bPhi * cos, bZ))
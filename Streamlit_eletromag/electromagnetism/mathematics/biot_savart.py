@@ -0,0 +1,385 @@
+"""Biot-Savart Module.
+
+This module contains the batched numerical kernels used to integrate the
+Biot-Savart law over a discretized coil path. The kernels evaluate blocks of
+points against every segment of the path at once, keeping the size of the
+(points x segments x 3) temporaries under a configurable memory budget.
+
+Besides the 'Riemann' and 'Simpson' quadratures, the 'Analytic' method uses the
+closed-form field of a finite straight segment, which is exact for polygonal
+paths no matter how long the segments are.
+
+Every kernel accepts a backend option: 'numpy' uses the blocked kernels of this
+module, 'numba' the fused loops of the Compiled Module and 'auto', the default,
+uses Numba whenever it is installed.
+
+Neither the current nor the vacuum permeability / 4pi are taken into account,
+the callers are responsible for multiplying the results by I * MU0_PRIME.
+"""
+import numpy as np
+from numpy.linalg import norm
+from .compiled import resolveBackend, quadratureField, analyticField
+
+# Default memory budget, in bytes, for the temporaries of a single block of points.
+DEFAULT_MAX_MEMORY = 256 * 2**20
+
+# Number of (points x segments x 3) float64 temporaries alive at the same time
+# while a block is being integrated.
+_TEMPORARIES = 4
+
+INTEGRATION_METHODS = ('Riemann', 'Simpson', 'Analytic')
+
+
+def segmentData(coilPath: np.ndarray, integration_method: str = 'Simpson'):
+    '''
+        Calculates the per segment data used by the integration kernels.
+
+        :param coilPath numpy.ndarray: the ordered array of points of the path, in the format [[x1,y1,z1],...].
+        :param integration_method str: (optional) either 'Riemann', 'Simpson' or 'Analytic'.
+
+        :returns tuple: the source positions, the dl vectors, the integration weights (None when
+        the method has no weights), the constant factor of the quadrature and the minimum distance
+        allowed between a point and a source (None when there is no clamping). For 'Analytic'
+        the sources are the starting points of the segments and dl goes to their end points.
+
+        :raises ValueError: if the integration method is unknown.
+    '''
+    if integration_method == 'Riemann':
+        avgR = 0.5 * (coilPath[:-1] + coilPath[1:])
+        dl = coilPath[1:] - coilPath[:-1]
+        return avgR, dl, None, None, None
+
+    elif integration_method == 'Simpson':
+        dl = np.gradient(coilPath, axis=0)
+        h = norm(coilPath[1] - coilPath[0])
+
+        weights = 2 * np.ones(len(coilPath))
+        weights[1::2] = 4
+        weights[0], weights[-1] = 1, 1
+
+        return coilPath, dl, weights, h/3, 1e-12
+
+    elif integration_method == 'Analytic':
+        dl = coilPath[1:] - coilPath[:-1]
+        return coilPath[:-1], dl, None, None, None
+
+    raise ValueError(f"Unknown integration method '{integration_method}', "
+                     f"expected one of {INTEGRATION_METHODS}")
+
+
+def blockSize(nSegments: int, max_memory: int = DEFAULT_MAX_MEMORY):
+    '''
+        Calculates how many points can be integrated at once under a memory budget.
+
+        :param nSegments int: the number of segments (sources) of the path.
+        :param max_memory int: (optional) the memory budget in bytes.
+
+        :returns int: the number of points per block, at least one.
+    '''
+    bytesPerPoint = _TEMPORARIES * 3 * 8 * max(nSegments, 1)
+    return max(1, int(max_memory // bytesPerPoint))
+
+
+def _integrateBlock(points, sources, dl, weights, factor, epsilon):
+    '''
+        Integrates the Biot-Savart law for a block of points against every source.
+    '''
+    rPrime = points[:, np.newaxis, :] - sources
+    rMod = norm(rPrime, axis=2)
+    if epsilon is not None:
+        rMod = np.maximum(rMod, epsilon)
+
+    integrand = np.cross(dl, rPrime) / rMod[:, :, np.newaxis]**3
+    del rPrime, rMod
+
+    if weights is None:
+        return np.sum(integrand, axis=1)
+    return factor * np.sum(integrand * weights[:, np.newaxis], axis=1)
+
+
+def _analyticBlock(points, starts, dl, weights=None):
+    '''
+        Integrates the Biot-Savart law exactly for a block of points against every straight segment.
+        Uses the form 2 (dl x r1) (n1 + n2) / (n1 n2 ((n1 + n2)**2 - L**2)), which stays accurate
+        close to long segments. Points lying on a segment get no contribution from it. The contribution
+        of each segment is multiplied by its weight, when there are weights.
+    '''
+    r1 = points[:, np.newaxis, :] - starts
+    n1 = norm(r1, axis=2)
+    n2 = norm(r1 - dl, axis=2)
+    lengths = norm(dl, axis=1)
+
+    nSum = n1 + n2
+    denominator = n1 * n2 * (nSum - lengths) * (nSum + lengths)
+    scale = np.divide(2 * nSum, denominator, out=np.zeros_like(denominator), where=denominator > 0)
+    if weights is not None:
+        scale *= weights
+    del n1, n2, nSum, denominator
+
+    return np.sum(np.cross(dl, r1) * scale[:, :, np.newaxis], axis=1)
+
+
+class PreparedPath:
+    """PreparedPath class.
+    This class holds the segment data of a coil path for one integration method, computed once
+    and reused by every kernel call. The data is kept as separate, contiguous and read-only
+    arrays, which can be shared with other processes without being recomputed."""
+    __slots__ = ('integration_method', 'sources', 'dl', 'weights', 'factor', 'epsilon')
+
+    def __init__(self, integration_method: str, sources: np.ndarray, dl: np.ndarray, weights: np.ndarray = None,
+                 factor: float = None, epsilon: float = None):
+        '''
+            Wraps already computed segment data, as returned by segmentData. Use fromPath to prepare a coil path.
+
+            :param integration_method str: the method the data was computed for.
+            :param sources numpy.ndarray: the source positions.
+            :param dl numpy.ndarray: the dl vectors.
+            :param weights numpy.ndarray: (optional) the integration weights.
+            :param factor float: (optional) the constant factor of the quadrature.
+            :param epsilon float: (optional) the minimum distance allowed between a point and a source.
+        '''
+        setattr_ = super().__setattr__
+        setattr_('integration_method', integration_method)
+        for name, values in (('sources', sources), ('dl', dl), ('weights', weights)):
+            if values is not None:
+                # A read-only view, the array given by the caller keeps its own flags.
+                values = np.ascontiguousarray(values, dtype=float).view()
+                values.flags.writeable = False
+            setattr_(name, values)
+        setattr_('factor', factor)
+        setattr_('epsilon', epsilon)
+
+    @classmethod
+    def fromPath(cls, coilPath: np.ndarray, integration_method: str = 'Simpson'):
+        '''
+            Prepares a coil path for an integration method.
+
+            :param coilPath numpy.ndarray: the ordered array of points of the path, in the format [[x1,y1,z1],...].
+            :param integration_method str: (optional) either 'Riemann', 'Simpson' or 'Analytic'.
+
+            :returns PreparedPath: the prepared path.
+
+            :raises ValueError: if the integration method is unknown.
+        '''
+        sources, dl, weights, factor, epsilon = segmentData(np.asarray(coilPath, dtype=float), integration_method)
+        # The sources of 'Simpson' are the path itself, copy them so the preparation owns its data.
+        return cls(integration_method, np.array(sources), dl, weights, factor, epsilon)
+
+    def __setattr__(self, name, value):
+        raise AttributeError("A PreparedPath can not be modified, prepare the new path instead")
+
+    def __reduce__(self):
+        return (PreparedPath, (self.integration_method, self.sources, self.dl, self.weights, self.factor, self.epsilon))
+
+    def integrate(self, points: np.ndarray, max_memory: int = DEFAULT_MAX_MEMORY, backend: str = 'auto'):
+        '''
+            Calculates the Biot-Savart integral of the path for an array of points.
+            The points are processed in blocks so that the temporaries never exceed max_memory.
+
+            :param points numpy.ndarray: the points to check for the magnetic field, in the format [[x1,y1,z1],...].
+            :param max_memory int: (optional) the memory budget in bytes for each block of points.
+            :param backend str: (optional) 'numpy', 'numba' or 'auto'.
+
+            :returns numpy.ndarray: the integral for each point, in the format [[Ix1,Iy1,Iz1],...].
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if resolveBackend(backend) == 'numba':
+            if self.integration_method == 'Analytic':
+                return analyticField(points, self.sources, self.dl, self.weights)
+            return quadratureField(points, self.sources, self.dl, self.weights, self.factor, self.epsilon)
+
+        step = blockSize(len(self.sources), max_memory)
+        results = np.empty((len(points), 3))
+        for start in range(0, len(points), step):
+            stop = start + step
+            if self.integration_method == 'Analytic':
+                results[start:stop] = _analyticBlock(points[start:stop], self.sources, self.dl, self.weights)
+            else:
+                results[start:stop] = _integrateBlock(points[start:stop], self.sources, self.dl, self.weights,
+                                                      self.factor, self.epsilon)
+        return results
+
+    def elements(self):
+        '''
+            Rewrites the quadrature as a list of current elements, see currentElements.
+
+            :returns tuple: the positions and the moments of the elements, and the minimum distance
+            allowed between a point and an element (None when there is no clamping).
+
+            :raises ValueError: for the 'Analytic' method, whose segments are not point sources.
+        '''
+        if self.integration_method == 'Analytic':
+            raise ValueError("The 'Analytic' method has no current element form")
+        if self.weights is None:
+            return self.sources, self.dl, self.epsilon
+        return self.sources, self.factor * self.weights[:, np.newaxis] * self.dl, self.epsilon
+
+
+def packPaths(paths, currents):
+    '''
+        Packs the prepared paths of several coils into a single one whose weights carry the current of
+        each coil, so that the total field of the coils is integrated in a single pass over the points.
+        The constant factor of each quadrature is moved into its weights as well.
+
+        :param paths list: the PreparedPath of each coil, all for the same integration method.
+        :param currents list: the current of each coil.
+
+        :returns PreparedPath: the packed path, whose integral is the sum of the integrals of the paths
+        multiplied by their currents.
+
+        :raises ValueError: if there are no paths, they were prepared for different methods or the
+        number of currents does not match.
+    '''
+    paths = list(paths)
+    currents = np.asarray(currents, dtype=float).reshape(-1)
+    if not paths:
+        raise ValueError("There must be at least one path")
+    if len(currents) != len(paths):
+        raise ValueError("There must be one current for each path")
+    method = paths[0].integration_method
+    if any(path.integration_method != method for path in paths):
+        raise ValueError("Every path must be prepared for the same integration method")
+
+    weights = []
+    for path, current in zip(paths, currents):
+        pathWeights = np.ones(len(path.sources)) if path.weights is None else path.weights * path.factor
+        weights.append(pathWeights * current)
+    return PreparedPath(method, np.concatenate([path.sources for path in paths]),
+                        np.concatenate([path.dl for path in paths]), np.concatenate(weights),
+                        None if method == 'Analytic' else 1.0, paths[0].epsilon)
+
+
+def preparedChunks(chunks, integration_method: str = 'Simpson'):
+    '''
+        Prepares a path given as consecutive chunks of points one chunk at a time, so that only a chunk is
+        held in memory. The integrals of the prepared chunks add up to the one of the whole path prepared by
+        PreparedPath.fromPath: the segment joining two chunks belongs to the second one and 'Simpson' keeps
+        the weights and the central differences it would have on the whole path.
+
+        :param chunks iterable: the chunks, in the format [[x1,y1,z1],...], which joined make the path.
+        :param integration_method str: (optional) either 'Riemann', 'Simpson' or 'Analytic'.
+
+        :returns generator: the PreparedPath of each chunk.
+
+        :raises ValueError: if the integration method is unknown.
+    '''
+    if integration_method not in INTEGRATION_METHODS:
+        raise ValueError(f"Unknown integration method '{integration_method}', "
+                         f"expected one of {INTEGRATION_METHODS}")
+    chunks = (chunk for chunk in (np.asarray(chunk, dtype=float).reshape(-1, 3) for chunk in chunks) if len(chunk))
+    previous, current, start, h = None, next(chunks, None), 0, None
+    while current is not None:
+        following = next(chunks, None)
+        if integration_method != 'Simpson':
+            joined = current if previous is None else np.concatenate((previous[np.newaxis], current))
+            sources, dl, weights, factor, epsilon = segmentData(joined, integration_method)
+            yield PreparedPath(integration_method, sources, dl, weights, factor, epsilon)
+        else:
+            # One neighbouring point on each side gives the central differences at the ends of the chunk.
+            halo = [current]
+            if previous is not None:
+                halo.insert(0, previous[np.newaxis])
+            if following is not None:
+                halo.append(following[:1])
+            halo = np.concatenate(halo)
+            if h is None:
+                h = norm(halo[1] - halo[0])
+            dl = np.gradient(halo, axis=0)[previous is not None:len(halo) - (following is not None)]
+            index = start + np.arange(len(current))
+            weights = np.where(index % 2 == 1, 4.0, 2.0)
+            weights[index == 0] = 1
+            if following is None:
+                weights[-1] = 1
+            yield PreparedPath(integration_method, current, dl, weights, h / 3, 1e-12)
+        previous, start, current = current[-1], start + len(current), following
+
+
+def biotSavartDimensionless(coilPath: np.ndarray, points: np.ndarray, integration_method: str = 'Simpson',
+                            max_memory: int = DEFAULT_MAX_MEMORY, backend: str = 'auto'):
+    '''
+        Calculates the Biot-Savart integral of a coil path for an array of points.
+        The points are processed in blocks so that the temporaries never exceed max_memory.
+
+        :param coilPath numpy.ndarray|PreparedPath: the ordered array of points of the path, in the format
+        [[x1,y1,z1],...], or the path already prepared for the integration method.
+        :param points numpy.ndarray: the points to check for the magnetic field, in the format [[x1,y1,z1],...].
+        :param integration_method str: (optional) either 'Riemann', 'Simpson' or 'Analytic'.
+        :param max_memory int: (optional) the memory budget in bytes for each block of points.
+        :param backend str: (optional) 'numpy', 'numba' or 'auto'.
+
+        :returns numpy.ndarray: the integral part of the Biot-Savart law for each point, in the
+        format [[Ix1,Iy1,Iz1],...].
+    '''
+    if not isinstance(coilPath, PreparedPath):
+        coilPath = PreparedPath.fromPath(coilPath, integration_method)
+    return coilPath.integrate(points, max_memory, backend)
+
+
+def segmentField(points: np.ndarray, starts: np.ndarray, ends: np.ndarray, max_memory: int = DEFAULT_MAX_MEMORY,
+                 backend: str = 'auto'):
+    '''
+        Calculates the dimensionless Biot-Savart integral of independent straight segments, using the
+        closed form of the 'Analytic' method.
+
+        :param points numpy.ndarray: the points to check for the magnetic field, in the format [[x1,y1,z1],...].
+        :param starts numpy.ndarray: the starting point of each segment, the current flows from it.
+        :param ends numpy.ndarray: the end point of each segment.
+        :param max_memory int: (optional) the memory budget in bytes for each block of points.
+        :param backend str: (optional) 'numpy', 'numba' or 'auto'.
+
+        :returns numpy.ndarray: the integral for each point, in the format [[Ix1,Iy1,Iz1],...].
+    '''
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    starts = np.asarray(starts, dtype=float).reshape(-1, 3)
+    dl = np.asarray(ends, dtype=float).reshape(-1, 3) - starts
+    if resolveBackend(backend) == 'numba':
+        return analyticField(points, starts, dl)
+
+    step = blockSize(len(starts), max_memory)
+    results = np.empty((len(points), 3))
+    for start in range(0, len(points), step):
+        stop = start + step
+        results[start:stop] = _analyticBlock(points[start:stop], starts, dl)
+    return results
+
+
+def currentElements(coilPath: np.ndarray, integration_method: str = 'Simpson'):
+    '''
+        Rewrites the quadrature of a coil path as a list of current elements, so that the
+        Biot-Savart integral becomes sum(moment x (r - position) / |r - position|**3).
+        This form is used by the approximated and the multi-coil evaluations.
+
+        :param coilPath numpy.ndarray: the ordered array of points of the path, in the format [[x1,y1,z1],...].
+        :param integration_method str: (optional) either 'Riemann' or 'Simpson'.
+
+        :returns tuple: the positions and the moments of the elements, and the minimum distance
+        allowed between a point and an element (None when there is no clamping).
+
+        :raises ValueError: for the 'Analytic' method, whose segments are not point sources.
+    '''
+    return PreparedPath.fromPath(coilPath, integration_method).elements()
+
+
+def elementField(points: np.ndarray, positions: np.ndarray, moments: np.ndarray, epsilon: float = None,
+                 max_memory: int = DEFAULT_MAX_MEMORY, backend: str = 'auto'):
+    '''
+        Calculates the dimensionless Biot-Savart sum of a list of current elements for an array of points.
+
+        :param points numpy.ndarray: the points to check for the magnetic field, in the format [[x1,y1,z1],...].
+        :param positions numpy.ndarray: the positions of the current elements.
+        :param moments numpy.ndarray: the moments (dl times the quadrature weight) of the current elements.
+        :param epsilon float: (optional) the minimum distance allowed between a point and an element.
+        :param max_memory int: (optional) the memory budget in bytes for each block of points.
+        :param backend str: (optional) 'numpy', 'numba' or 'auto'.
+
+        :returns numpy.ndarray: the sum for each point, in the format [[Ix1,Iy1,Iz1],...].
+    '''
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    if resolveBackend(backend) == 'numba':
+        return quadratureField(points, positions, moments, epsilon=epsilon)
+    step = blockSize(len(positions), max_memory)
+    results = np.empty((len(points), 3))
+    for start in range(0, len(points), step):
+        stop = start + step
+        results[start:stop] = _integrateBlock(points[start:stop], positions, moments, None, None, epsilon)
+    return results
@@ -0,0 +1,136 @@
+"""Compiled Module.
+
+This module contains the compiled Biot-Savart kernels, used when Numba is
+installed. Each kernel is a single fused loop over points and segments, so no
+(points x segments x 3) temporaries are allocated, and the points are spread
+across threads. When Numba is not available the NumPy kernels of the
+Biot-Savart Module are used instead.
+
+As in the Biot-Savart Module, neither the current nor MU0 / 4pi are taken into account.
+"""
+import numpy as np
+
+try:
+    from numba import njit, prange, set_num_threads
+except ImportError:
+    njit = None
+
+NUMBA_AVAILABLE = njit is not None
+
+BACKENDS = ('auto', 'numpy', 'numba')
+
+
+def resolveBackend(backend: str = 'auto'):
+    '''
+        Converts the backend option into the backend that is going to be used.
+
+        :param backend str: (optional) 'numpy', 'numba' or 'auto', which uses Numba when it is installed.
+
+        :returns str: either 'numpy' or 'numba'.
+
+        :raises ValueError: if the backend is unknown, or if 'numba' is requested without Numba installed.
+    '''
+    if backend is None or backend == 'auto':
+        return 'numba' if NUMBA_AVAILABLE else 'numpy'
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown backend '{backend}', expected one of {BACKENDS}")
+    if backend == 'numba' and not NUMBA_AVAILABLE:
+        raise ValueError("The 'numba' backend needs Numba to be installed")
+    return backend
+
+
+def limitThreads(threads: int = 1):
+    '''
+        Limits the number of threads used by the compiled kernels in the current process.
+
+        Process pool workers call it, so that N workers run N threads in total instead of
+        N times the number of cores.
+
+        :param threads int: (optional) the number of threads of each kernel call.
+    '''
+    if NUMBA_AVAILABLE:
+        set_num_threads(max(1, int(threads)))
+
+
+if NUMBA_AVAILABLE:
+    @njit(parallel=True, cache=True)
+    def _quadratureKernel(points, sources, dl, weights, factor, epsilon, out):
+        for i in prange(points.shape[0]):
+            bx = by = bz = 0.0
+            for j in range(sources.shape[0]):
+                rx = points[i, 0] - sources[j, 0]
+                ry = points[i, 1] - sources[j, 1]
+                rz = points[i, 2] - sources[j, 2]
+                rMod = max(np.sqrt(rx * rx + ry * ry + rz * rz), epsilon)
+                scale = weights[j] / (rMod * rMod * rMod)
+                bx += (dl[j, 1] * rz - dl[j, 2] * ry) * scale
+                by += (dl[j, 2] * rx - dl[j, 0] * rz) * scale
+                bz += (dl[j, 0] * ry - dl[j, 1] * rx) * scale
+            out[i, 0] = factor * bx
+            out[i, 1] = factor * by
+            out[i, 2] = factor * bz
+
+    @njit(parallel=True, cache=True)
+    def _analyticKernel(points, starts, dl, weights, out):
+        for i in prange(points.shape[0]):
+            bx = by = bz = 0.0
+            for j in range(starts.shape[0]):
+                rx = points[i, 0] - starts[j, 0]
+                ry = points[i, 1] - starts[j, 1]
+                rz = points[i, 2] - starts[j, 2]
+                n1 = np.sqrt(rx * rx + ry * ry + rz * rz)
+                n2 = np.sqrt((rx - dl[j, 0])**2 + (ry - dl[j, 1])**2 + (rz - dl[j, 2])**2)
+                length = np.sqrt(dl[j, 0]**2 + dl[j, 1]**2 + dl[j, 2]**2)
+                nSum = n1 + n2
+                denominator = n1 * n2 * (nSum - length) * (nSum + length)
+                if denominator > 0:
+                    scale = weights[j] * 2 * nSum / denominator
+                    bx += (dl[j, 1] * rz - dl[j, 2] * ry) * scale
+                    by += (dl[j, 2] * rx - dl[j, 0] * rz) * scale
+                    bz += (dl[j, 0] * ry - dl[j, 1] * rx) * scale
+            out[i, 0] = bx
+            out[i, 1] = by
+            out[i, 2] = bz
+
+
+def quadratureField(points: np.ndarray, sources: np.ndarray, dl: np.ndarray, weights: np.ndarray = None,
+                    factor: float = None, epsilon: float = None):
+    '''
+        Compiled equivalent of the 'Riemann' and 'Simpson' kernels, and of the current element sum.
+
+        :param points numpy.ndarray: the points to check for the magnetic field, in the format [[x1,y1,z1],...].
+        :param sources numpy.ndarray: the source positions.
+        :param dl numpy.ndarray: the dl vectors, or the moments of the current elements.
+        :param weights numpy.ndarray: (optional) the integration weights.
+        :param factor float: (optional) the constant factor of the quadrature.
+        :param epsilon float: (optional) the minimum distance allowed between a point and a source.
+
+        :returns numpy.ndarray: the integral for each point, in the format [[Ix1,Iy1,Iz1],...].
+    '''
+    points = np.ascontiguousarray(points, dtype=float)
+    if weights is None:
+        weights, factor = np.ones(len(sources)), 1.0
+    out = np.empty((len(points), 3))
+    _quadratureKernel(points, np.ascontiguousarray(sources, dtype=float), np.ascontiguousarray(dl, dtype=float),
+                      np.ascontiguousarray(weights, dtype=float), float(factor),
+                      0.0 if epsilon is None else float(epsilon), out)
+    return out
+
+
+def analyticField(points: np.ndarray, starts: np.ndarray, dl: np.ndarray, weights: np.ndarray = None):
+    '''
+        Compiled equivalent of the 'Analytic' kernel.
+
+        :param points numpy.ndarray: the points to check for the magnetic field, in the format [[x1,y1,z1],...].
+        :param starts numpy.ndarray: the starting point of each segment.
+        :param dl numpy.ndarray: the vector from the start to the end of each segment.
+        :param weights numpy.ndarray: (optional) a factor for each segment, such as its current.
+
+        :returns numpy.ndarray: the integral for each point, in the format [[Ix1,Iy1,Iz1],...].
+    '''
+    if weights is None:
+        weights = np.ones(len(starts))
+    out = np.empty((len(points), 3))
+    _analyticKernel(np.ascontiguousarray(points, dtype=float), np.ascontiguousarray(starts, dtype=float),
+                    np.ascontiguousarray(dl, dtype=float), np.ascontiguousarray(weights, dtype=float), out)
+    return out
@@ -0,0 +1,169 @@
+"""Decimation Module.
+
+This module contains the level of detail reductions applied to the data sent
+to the figures. Paths are simplified with the Ramer-Douglas-Peucker algorithm,
+keeping every vertex that deviates from the simplified line by more than a
+fraction of the size of the path, that is, by more than a pixel on a figure of
+a given resolution. Clouds of points are binned on a coarser grid so that no
+more than a budget of markers is drawn.
+
+Only the figures are reduced, the data they come from is left untouched. The
+exception is pathImportance, which ranks every vertex of a path at once for
+Coil.simplify to pick the smallest path keeping the field within a tolerance.
+"""
+import numpy as np
+
+# Width, in pixels, of the figures the paths are simplified for.
+DEFAULT_RESOLUTION = 1000
+
+# Largest number of markers drawn for a cloud of points.
+DEFAULT_MARKER_BUDGET = 20000
+
+
+def chordDistances(points: np.ndarray, start: np.ndarray, end: np.ndarray):
+    '''
+        Calculates the distance from points to the segment between two points.
+
+        :returns numpy.ndarray: the distance of each point.
+    '''
+    chord = end - start
+    length = np.dot(chord, chord)
+    offsets = points - start
+    if length == 0:
+        return np.linalg.norm(offsets, axis=1)
+    t = np.clip(offsets @ chord / length, 0, 1)
+    return np.linalg.norm(offsets - t[:, np.newaxis] * chord, axis=1)
+
+
+def pathImportance(path: np.ndarray):
+    '''
+        Runs the Ramer-Douglas-Peucker recursion down to every vertex, one level of the recursion at a time,
+        and returns the largest tolerance each vertex survives: the smallest of its own distance to the
+        chord it splits and the distances of the vertices that split the ranges above it. Ties, such as
+        the vertices of a straight run, are split at the middle of their range.
+
+        :param path numpy.ndarray: the path, in the format [[x1,y1,z1],...].
+
+        :returns numpy.ndarray: the importance of each vertex, infinite for the first and the last.
+    '''
+    path = np.asarray(path, dtype=float)
+    importance = np.full(len(path), np.inf)
+    if len(path) < 3:
+        return importance
+    resolution = max(float(np.linalg.norm(np.ptp(path, axis=0))), np.finfo(float).tiny) * 1e-12
+
+    first, last, inherited = np.array([0]), np.array([len(path) - 1]), np.array([np.inf])
+    while len(first):
+        counts = last - first - 1
+        starts = np.cumsum(counts) - counts
+        ranges = np.repeat(np.arange(len(first)), counts)
+        index = first[ranges] + 1 + np.arange(counts.sum()) - starts[ranges]
+        start, chord = path[first][ranges], (path[last] - path[first])[ranges]
+        lengths = np.einsum('ij,ij->i', chord, chord)
+        offsets = path[index] - start
+        t = np.clip(np.einsum('ij,ij->i', offsets, chord) / np.where(lengths > 0, lengths, 1), 0, 1)
+        distances = np.linalg.norm(offsets - t[:, np.newaxis] * chord, axis=1)
+
+        rounded = np.round(distances / resolution)
+        farthest = rounded == np.maximum.reduceat(rounded, starts)[ranges]
+        centering = np.where(farthest, np.abs(index - (first + last)[ranges] / 2), np.inf)
+        candidates = np.flatnonzero(centering == np.minimum.reduceat(centering, starts)[ranges])
+        chosen = candidates[np.searchsorted(ranges[candidates], np.arange(len(first)))]
+        split = index[chosen]
+        value = np.minimum(distances[chosen], inherited)
+        importance[split] = value
+
+        first, last = np.concatenate((first, split)), np.concatenate((split, last))
+        inherited = np.concatenate((value, value))
+        wide = last - first >= 2
+        first, last, inherited = first[wide], last[wide], inherited[wide]
+    return importance
+
+
+def simplifyPath(path: np.ndarray, tolerance: float):
+    '''
+        Simplifies a path with the Ramer-Douglas-Peucker algorithm.
+
+        :param path numpy.ndarray: the path, in the format [[x1,y1,z1],...].
+        :param tolerance float: the largest distance allowed between a removed vertex and the simplified path.
+
+        :returns numpy.ndarray: the sorted indices of the vertices kept, always including the first and the last.
+
+        :raises ValueError: if the tolerance is negative.
+    '''
+    if tolerance < 0:
+        raise ValueError("The tolerance must not be negative")
+    path = np.asarray(path, dtype=float)
+    if len(path) < 3:
+        return np.arange(len(path))
+
+    keep = np.zeros(len(path), dtype=bool)
+    keep[[0, -1]] = True
+    ranges = [(0, len(path) - 1)]
+    while ranges:
+        first, last = ranges.pop()
+        if last - first < 2:
+            continue
+        distances = chordDistances(path[first + 1:last], path[first], path[last])
+        farthest = int(np.argmax(distances))
+        if distances[farthest] > tolerance:
+            split = first + 1 + farthest
+            keep[split] = True
+            ranges.append((first, split))
+            ranges.append((split, last))
+    return np.flatnonzero(keep)
+
+
+def screenTolerance(points: np.ndarray, resolution: int = DEFAULT_RESOLUTION):
+    '''
+        Returns the size of a pixel when the bounding box of the points is drawn with a resolution.
+    '''
+    points = np.asarray(points, dtype=float)
+    return float(np.linalg.norm(np.ptp(points, axis=0))) / resolution if len(points) else 0.0
+
+
+def binCloud(points: np.ndarray, values: np.ndarray, budget: int = DEFAULT_MARKER_BUDGET):
+    '''
+        Reduces a cloud of points to at most a budget of markers. A regular grid, such as the ones of
+        Coil.cloud, keeps every k-th layer along each axis, so it stays regular. Any other cloud is binned
+        on a regular grid over the axes it extends along, and each occupied bin becomes a marker at the
+        centroid of its points, with the mean of their values.
+
+        :param points numpy.ndarray: the points, in the format [[x1,y1,z1],...].
+        :param values numpy.ndarray: the value at each point.
+        :param budget int: (optional) the largest number of markers.
+
+        :returns tuple: the markers and their values, or the points and values themselves if they fit the budget.
+
+        :raises ValueError: if the budget is lower than 1.
+    '''
+    if budget < 1:
+        raise ValueError("The budget must be at least one marker")
+    points = np.asarray(points, dtype=float)
+    values = np.asarray(values, dtype=float)
+    if len(points) <= budget:
+        return points, values
+
+    layers = [np.unique(points[:, axis], return_inverse=True) for axis in range(3)]
+    sizes = np.array([len(coordinates) for coordinates, _ in layers])
+    if np.prod(sizes) == len(points):
+        # Every point is a node of the grid, the axis with the most layers kept is strided first.
+        strides = np.ones(3, dtype=int)
+        while np.prod(-(-sizes // strides)) > budget:
+            axis = np.argmax(-(-sizes // strides))
+            strides[axis] += 1
+        keep = np.all([inverse.reshape(-1) % stride == 0 for (_, inverse), stride in zip(layers, strides)], axis=0)
+        return points[keep], values[keep]
+
+    low = points.min(axis=0)
+    span = np.ptp(points, axis=0)
+    # Axes without extent take a single bin, so the budget is spread over the others.
+    bins = np.ones(3, dtype=int)
+    bins[span > 0] = max(int(np.floor(budget ** (1 / max(np.count_nonzero(span > 0), 1)))), 1)
+    cells = np.floor((points - low) / np.where(span > 0, span, 1) * bins).astype(int)
+    cells = np.minimum(cells, bins - 1)
+    _, inverse, counts = np.unique(np.ravel_multi_index(cells.T, tuple(bins)), return_inverse=True,
+                                   return_counts=True)
+    inverse = inverse.reshape(-1)
+    centroids = np.column_stack([np.bincount(inverse, weights=points[:, axis]) for axis in range(3)])
+    return centroids / counts[:, np.newaxis], np.bincount(inverse, weights=values) / counts
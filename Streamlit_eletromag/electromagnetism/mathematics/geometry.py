@@ -210,27 +210,104 @@ def race_track(center,width: float, length: float, max_seg_len:float, int_radius
 
     return path
 
-def racetrack2d(center, inwidth, inlength, max_seg_len, int_radius, thickness):
-    N_coils_h = int(thickness / max_seg_len)
+def _racetrack_pack(center, inwidth, inlength, max_seg_len, int_radius, turns, z_layers):
+    """Builds the path of a winding pack, the given turns of racetrack2d repeated on every layer, into a single array.
 
-    inwidths = inwidth + max_seg_len * np.arange(N_coils_h)
-    inlengths = inlength + max_seg_len * np.arange(N_coils_h)
-    int_radii = int_radius + max_seg_len * np.arange(N_coils_h)
+    The arcs and lines of every turn are evaluated at once with the same arithmetic as arc, line and
+    numpy.linspace, so the points match the ones of race_track exactly, in the same order.
+    """
+    if len(turns) < 1 or len(z_layers) < 1:
+        raise ValueError("The thickness and the height must hold at least one turn and one layer")
+    steps = max_seg_len * np.asarray(turns)
+    widths = (inwidth + steps)[:, np.newaxis]
+    lengths = (inlength + steps)[:, np.newaxis]
+    radii = (int_radius + steps)[:, np.newaxis]
+
+    # Centers, first and last angles and steps of the four arcs of every turn, in the order of race_track.
+    arc_x = np.hstack([center[0] + widths / 2, center[0] + widths / 2, center[0] - widths / 2, center[0] - widths / 2])
+    arc_y = np.hstack([center[1] + lengths / 2, center[1] - lengths / 2, center[1] - lengths / 2, center[1] + lengths / 2])
+    starts = np.array([0, np.pi / 2, np.pi, 3 * np.pi / 2])
+    stops = starts + np.pi / 2
+    arc_points = (np.abs(np.pi / 2) * radii / max_seg_len).astype(int) + 1
+    if np.any(arc_points < 2):
+        raise ValueError("The internal radius is too small for the maximum segment length")
+    arc_steps = (stops - starts) / (arc_points - 1)
+
+    # Each line goes from the last point of an arc to the second point of the next one.
+    line_x0, line_y0 = arc_x + radii * np.sin(stops), arc_y + radii * np.cos(stops)
+    second = np.roll(starts + arc_steps, -1, axis=1)
+    line_x1 = np.roll(arc_x, -1, axis=1) + radii * np.sin(second)
+    line_y1 = np.roll(arc_y, -1, axis=1) + radii * np.cos(second)
+    line_lengths = np.sqrt((line_x0 - line_x1)**2 + (line_y0 - line_y1)**2)
+    if np.any(line_lengths < max_seg_len):
+        raise ValueError("The straight sides must be at least as long as the maximum segment length")
+    line_points = np.ceil(line_lengths / max_seg_len).astype(int) + 1
+
+    # Every point of a layer as the index of its arc or line, arc0, line0, arc1, ... for each turn, and its index in it.
+    sizes = np.stack([np.broadcast_to(arc_points, line_points.shape), line_points], axis=2).reshape(-1)
+    piece = np.repeat(np.arange(len(sizes)), sizes)
+    index = np.arange(len(piece)) - np.repeat(np.cumsum(sizes) - sizes, sizes)
+    last = index == sizes[piece] - 1
+    turn, corner, on_arc = piece // 8, piece % 8 // 2, piece % 2 == 0
+
+    path = np.empty((len(z_layers), len(piece), 3))
+    layer = path[0]
+    arc_turn, arc_corner = turn[on_arc], corner[on_arc]
+    angles = np.where(last[on_arc], stops[arc_corner],
+                      index[on_arc] * arc_steps[arc_turn, arc_corner] + starts[arc_corner])
+    layer[on_arc, 0] = arc_x[arc_turn, arc_corner] + radii[arc_turn, 0] * np.sin(angles)
+    layer[on_arc, 1] = arc_y[arc_turn, arc_corner] + radii[arc_turn, 0] * np.cos(angles)
+
+    on_line = ~on_arc
+    line_turn, line_corner = turn[on_line], corner[on_line]
+    fractions = index[on_line] / (line_points[line_turn, line_corner] - 1)
+    for axis, (start, stop) in enumerate(((line_x0, line_x1), (line_y0, line_y1))):
+        begin, end = start[line_turn, line_corner], stop[line_turn, line_corner]
+        layer[on_line, axis] = np.where(last[on_line], end, fractions * (end - begin) + begin)
+
+    path[1:, :, :2] = layer[:, :2]
+    path[:, :, 2] = np.asarray(z_layers, dtype=float)[:, np.newaxis]
+    return path.reshape(-1, 3)
 
-    racetracks = [race_track(center, w, l, max_seg_len, r) for w, l, r in zip(inwidths, inlengths, int_radii)]
-    return np.concatenate(racetracks, axis=0)
+
+def racetrack2d(center, inwidth, inlength, max_seg_len, int_radius, thickness):
+    """Returns the path of a flat racetrack winding, int(thickness / max_seg_len) turns of race_track, each one
+    max_seg_len wider, longer and rounder than the previous.
+
+    Returns:
+        numpy.ndarray: the path, in the format [[x1,y1,z1],...].
+    """
+    return _racetrack_pack(center, inwidth, inlength, max_seg_len, int_radius, np.arange(int(thickness / max_seg_len)),
+                           [float(center[2])])
 
 def racetrack3d(center, inwidth, inlength, max_seg_len, int_radius, thickness, height):
-    
+    """Returns the path of a racetrack winding pack, int(height / max_seg_len) layers of racetrack2d stacked
+    max_seg_len apart, or a single one when the height is zero.
+
+    Returns:
+        numpy.ndarray: the path, in the format [[x1,y1,z1],...].
+    """
     if height == 0:
         return racetrack2d(center, inwidth, inlength, max_seg_len, int_radius, thickness)
-    
-    N_layers = int(height / max_seg_len)                                            
-    z_space = np.arange(N_layers) * max_seg_len                           
-    z_coords = [center[2] + z for z in z_space]
-    all_layers = [
-        racetrack2d(np.array([center[0], center[1], z]), inwidth, inlength, max_seg_len, int_radius, thickness)
-        for z in z_coords
-    ]
+    return _racetrack_pack(center, inwidth, inlength, max_seg_len, int_radius, np.arange(int(thickness / max_seg_len)),
+                           _racetrack_layers(center, max_seg_len, height))
 
-    return np.concatenate(all_layers, axis=0)
\ No newline at end of file
+def _racetrack_layers(center, max_seg_len, height):
+    """Returns the height of each layer of racetrack3d."""
+    if height == 0:
+        return [float(center[2])]
+    N_layers = int(height / max_seg_len)
+    z_space = np.arange(N_layers) * max_seg_len
+    return [center[2] + z for z in z_space]
+
+def racetrack_turns(center, inwidth, inlength, max_seg_len, int_radius, thickness, height):
+    """Yields the turns of racetrack3d one at a time, in the order they are wound, so that a winding pack
+    can be walked through with the memory of a single turn. Joined together, they are the path of racetrack3d.
+
+    Yields:
+        numpy.ndarray: the path of a turn, in the format [[x1,y1,z1],...].
+    """
+    turns = range(int(thickness / max_seg_len))
+    for z in _racetrack_layers(center, max_seg_len, height):
+        for turn in turns:
+            yield _racetrack_pack(center, inwidth, inlength, max_seg_len, int_radius, [turn], [z])
@@ -0,0 +1,118 @@
+"""Loops Module.
+
+This module contains closed-form and high order fields of circular current
+paths, used to evaluate ideal coil models without discretizing them:
+    - full circular loops around the z direction, through the complete elliptic
+      integrals of the first and second kinds;
+    - circular arcs in planes of constant z, through a Gauss-Legendre quadrature
+      on the exact circle, returned as current elements for the Biot-Savart Module.
+
+As in the Biot-Savart Module, neither the current nor MU0 / 4pi are taken into account.
+The arcs follow the parametrization of geometry.arc: (x, y) = center + radius (sin, cos)(angle).
+"""
+import numpy as np
+from scipy.special import ellipe, ellipk
+from .biot_savart import blockSize, DEFAULT_MAX_MEMORY
+
+# Largest angle, in radians, integrated by a single Gauss-Legendre panel.
+ARC_PANEL_ANGLE = np.pi / 8
+
+# Number of Gauss-Legendre nodes in each panel.
+ARC_PANEL_NODES = 8
+
+
+def _loopBlock(points, centers, radii, sense):
+    '''
+        Field of loops for a block of points, sense being 1 for counterclockwise currents seen from +z.
+    '''
+    rel = points[:, np.newaxis, :] - centers
+    rho = np.hypot(rel[:, :, 0], rel[:, :, 1])
+    z = rel[:, :, 2]
+
+    alpha2 = (radii - rho)**2 + z**2
+    beta2 = (radii + rho)**2 + z**2
+    onWire = alpha2 == 0
+    alpha2 = np.where(onWire, 1.0, alpha2)
+    m = np.where(onWire, 0.0, 4 * radii * rho / beta2)
+    K, E = ellipk(m), ellipe(m)
+    beta = np.sqrt(beta2)
+
+    # mu0 I / 2pi = 2 mu0 I / 4pi, hence the factor of 2. rhoBRho is rho times the radial component.
+    bZ = 2 * sense / beta * (K + (radii**2 - rho**2 - z**2) / alpha2 * E)
+    rhoBRho = 2 * sense * z / beta * (-K + (radii**2 + rho**2 + z**2) / alpha2 * E)
+    bZ[onWire] = 0
+    rhoBRho[onWire] = 0
+
+    # The radial component vanishes on the axis, where its direction is undefined.
+    invRho2 = np.divide(1.0, rho**2, out=np.zeros_like(rho), where=rho > 0)
+    bX = rhoBRho * rel[:, :, 0] * invRho2
+    bY = rhoBRho * rel[:, :, 1] * invRho2
+    return np.stack((bX.sum(axis=1), bY.sum(axis=1), bZ.sum(axis=1)), axis=1)
+
+
+def loopField(points: np.ndarray, centers: np.ndarray, radii, sense: float = 1,
+              max_memory: int = DEFAULT_MAX_MEMORY):
+    '''
+        Calculates the dimensionless field of circular loops whose axes are parallel to z.
+
+        :param points numpy.ndarray: the points to check for the magnetic field, in the format [[x1,y1,z1],...].
+        :param centers numpy.ndarray: the centers of the loops, in the format [[x1,y1,z1],...].
+        :param radii float|numpy.ndarray: the radius of every loop, or one radius for all of them.
+        :param sense float: (optional) 1 for a counterclockwise current seen from +z, -1 otherwise.
+        It may also be an array with the relative current of each loop.
+        :param max_memory int: (optional) the memory budget in bytes for each block of points.
+
+        :returns numpy.ndarray: the field of the loops for each point, in the format [[Ix1,Iy1,Iz1],...].
+    '''
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+    radii = np.broadcast_to(np.asarray(radii, dtype=float), (len(centers),))
+    sense = np.broadcast_to(np.asarray(sense, dtype=float), (len(centers),))
+
+    results = np.empty((len(points), 3))
+    step = blockSize(3 * len(centers), max_memory)
+    for start in range(0, len(points), step):
+        stop = start + step
+        results[start:stop] = _loopBlock(points[start:stop], centers, radii, sense)
+    return results
+
+
+def arcElements(centers: np.ndarray, radii, start_angles, angles, anticlockwise: bool = False):
+    '''
+        Discretizes circular arcs in planes of constant z with a Gauss-Legendre quadrature on the
+        exact circle. The result can be evaluated with biot_savart.elementField.
+
+        :param centers numpy.ndarray: the centers of the arcs, in the format [[x1,y1,z1],...].
+        :param radii float|numpy.ndarray: the radius of every arc.
+        :param start_angles float|numpy.ndarray: the starting angle of every arc, in radians.
+        :param angles float|numpy.ndarray: the angle swept by every arc, in radians.
+        :param anticlockwise bool: (optional) same meaning as in geometry.arc.
+
+        :returns tuple: the positions and the moments of the current elements.
+    '''
+    centers = np.asarray(centers, dtype=float).reshape(-1, 3)
+    n = len(centers)
+    radii = np.broadcast_to(np.asarray(radii, dtype=float), (n,))
+    start_angles = np.broadcast_to(np.asarray(start_angles, dtype=float), (n,))
+    angles = np.broadcast_to(np.asarray(angles, dtype=float), (n,))
+
+    nodes, weights = np.polynomial.legendre.leggauss(ARC_PANEL_NODES)
+    panels = np.maximum(1, np.ceil(np.abs(angles) / ARC_PANEL_ANGLE)).astype(int)
+
+    arc = np.repeat(np.arange(n), panels)
+    panel = np.arange(len(arc)) - np.repeat(np.cumsum(panels) - panels, panels)
+    width = (angles / panels)[arc]
+    middle = start_angles[arc] + (panel + 0.5) * width
+
+    theta = (middle[:, np.newaxis] + 0.5 * width[:, np.newaxis] * nodes).ravel()
+    dTheta = (0.5 * width[:, np.newaxis] * weights).ravel()
+    owner = np.repeat(arc, ARC_PANEL_NODES)
+
+    sign = -1.0 if anticlockwise else 1.0
+    r = radii[owner]
+    positions = np.column_stack((centers[owner, 0] + sign * r * np.sin(theta),
+                                 centers[owner, 1] + sign * r * np.cos(theta),
+                                 centers[owner, 2]))
+    moments = sign * (r * dTheta)[:, np.newaxis] * np.column_stack((np.cos(theta), -np.sin(theta),
+                                                                     np.zeros_like(theta)))
+    return positions, moments
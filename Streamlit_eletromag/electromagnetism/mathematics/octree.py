@@ -0,0 +1,244 @@
+"""Octree Module.
+
+This module contains a Barnes-Hut approximation of the Biot-Savart law for
+paths with a large number of segments. The current elements of the path are
+clustered in an octree and, for every node, the moments of its far-field
+expansion (up to the first order in the size of the node) are precomputed.
+A node is used as a whole when it is seen under an angle smaller than the
+opening angle derived from the tolerance, otherwise its children, or the
+elements of a leaf, are evaluated instead.
+
+As in the Biot-Savart Module, neither the current nor MU0 / 4pi are taken into account.
+"""
+import numpy as np
+from numpy.linalg import norm
+from .biot_savart import elementField, DEFAULT_MAX_MEMORY
+
+DEFAULT_LEAF_SIZE = 32
+
+# Nodes deeper than this are always leaves, it protects against repeated positions.
+MAX_DEPTH = 32
+
+# Number of points traversing the tree at once.
+_POINTS_PER_BLOCK = 4096
+
+
+def openingAngle(tolerance: float):
+    '''
+        Converts a relative accuracy tolerance into the opening angle of the tree.
+        The first neglected term of the expansion is of order (size / distance)**2, the
+        factor of 2 keeps the measured error of typical coils below the tolerance.
+
+        :param tolerance float: the requested relative accuracy, must be positive.
+
+        :returns float: the opening angle, never larger than one.
+
+        :raises ValueError: if the tolerance is not positive.
+    '''
+    if tolerance <= 0:
+        raise ValueError("The tolerance must be positive")
+    return min(2 * float(np.sqrt(tolerance)), 1.0)
+
+
+def _rangeReduce(ufunc, values, starts, ends):
+    '''
+        Applies a reduction to values[start:end] for every (start, end) pair of non-empty ranges.
+    '''
+    padded = np.concatenate((values, np.zeros((1,) + values.shape[1:])))
+    indices = np.ravel(np.column_stack((starts, ends)))
+    return ufunc.reduceat(padded, indices, axis=0)[::2]
+
+
+class SegmentTree:
+    """SegmentTree class.
+    This class clusters the current elements of a path in an octree and evaluates their
+    Biot-Savart sum with far-field expansions for the nodes that are far enough from each point."""
+    def __init__(self, positions: np.ndarray, moments: np.ndarray, epsilon: float = None,
+                 leaf_size: int = DEFAULT_LEAF_SIZE):
+        '''
+            Builds the tree over a list of current elements.
+
+            :param positions numpy.ndarray: the positions of the current elements, in the format [[x1,y1,z1],...].
+            :param moments numpy.ndarray: the moments (dl times the quadrature weight) of the elements.
+            :param epsilon float: (optional) the minimum distance allowed between a point and an element.
+            :param leaf_size int: (optional) the maximum number of elements in a leaf.
+        '''
+        if leaf_size < 1:
+            raise ValueError("The leaf size must be positive")
+        self.positions = np.ascontiguousarray(positions, dtype=float)
+        self.moments = np.ascontiguousarray(moments, dtype=float)
+        self.epsilon = epsilon
+        self.leaf_size = int(leaf_size)
+        self.__build()
+        self.__calculateExpansions()
+
+    def __build(self):
+        '''
+            Splits the elements recursively into octants, keeping each node as a contiguous
+            range of the sorted elements.
+        '''
+        order = np.arange(len(self.positions))
+        starts, ends, children = [0], [len(order)], [[-1] * 8]
+        stack = [(0, self.positions.min(axis=0), self.positions.max(axis=0), 0)]
+
+        while stack:
+            node, low, high, depth = stack.pop()
+            start, end = starts[node], ends[node]
+            if end - start <= self.leaf_size or depth >= MAX_DEPTH or np.all(high == low):
+                continue
+
+            mid = 0.5 * (low + high)
+            block = order[start:end]
+            codes = (self.positions[block] >= mid) @ np.array([1, 2, 4])
+            sort = np.argsort(codes, kind='stable')
+            order[start:end] = block[sort]
+            counts = np.bincount(codes, minlength=8)
+
+            offset = start
+            for octant in range(8):
+                if counts[octant] == 0:
+                    continue
+                bits = np.array([octant & 1, octant & 2, octant & 4]) > 0
+                children[node][octant] = len(starts)
+                starts.append(offset)
+                ends.append(offset + counts[octant])
+                children.append([-1] * 8)
+                stack.append((len(starts) - 1, np.where(bits, mid, low), np.where(bits, high, mid), depth + 1))
+                offset += counts[octant]
+
+        self.order = order
+        self.starts = np.array(starts)
+        self.ends = np.array(ends)
+        self.children = np.array(children)
+        self.isLeaf = np.all(self.children < 0, axis=1)
+        # Leaves at MAX_DEPTH may hold more than leaf_size elements.
+        self.maxLeafCount = int(np.max((self.ends - self.starts)[self.isLeaf]))
+
+    def __calculateExpansions(self):
+        '''
+            Calculates the center, the radius and the expansion moments of every node.
+        '''
+        positions = self.positions[self.order]
+        moments = self.moments[self.order]
+        self.sortedPositions, self.sortedMoments = positions, moments
+
+        count = (self.ends - self.starts)[:, np.newaxis]
+        self.centers = _rangeReduce(np.add, positions, self.starts, self.ends) / count
+
+        low = _rangeReduce(np.minimum, positions, self.starts, self.ends)
+        high = _rangeReduce(np.maximum, positions, self.starts, self.ends)
+        self.radii = norm(np.maximum(high - self.centers, self.centers - low), axis=1)
+
+        # Zeroth order: the sum of the moments.
+        self.monopoles = _rangeReduce(np.add, moments, self.starts, self.ends)
+
+        # First order: sum(m (x) (p - c)), kept whole for the symmetric part and
+        # contracted to sum(m x (p - c)) for the antisymmetric part.
+        outer = (moments[:, :, np.newaxis] * positions[:, np.newaxis, :]).reshape(-1, 9)
+        tensors = _rangeReduce(np.add, outer, self.starts, self.ends).reshape(-1, 3, 3)
+        tensors -= self.monopoles[:, :, np.newaxis] * self.centers[:, np.newaxis, :]
+        self.tensors = tensors
+        self.dipoles = np.column_stack((tensors[:, 1, 2] - tensors[:, 2, 1],
+                                        tensors[:, 2, 0] - tensors[:, 0, 2],
+                                        tensors[:, 0, 1] - tensors[:, 1, 0]))
+
+    def __expansion(self, R, nodes):
+        '''
+            Evaluates the far-field expansion of the nodes at the displacements R = r - center.
+        '''
+        rMod = norm(R, axis=1)[:, np.newaxis]
+        tensorR = np.einsum('nab,nb->na', self.tensors[nodes], R)
+        return (np.cross(self.monopoles[nodes], R) / rMod**3
+                - self.dipoles[nodes] / rMod**3
+                + 3 * np.cross(tensorR, R) / rMod**5)
+
+    def __leafDirect(self, points, nodes, max_memory):
+        '''
+            Evaluates every element of the leaves directly, padding the leaves to the largest one.
+        '''
+        offsets = np.arange(self.maxLeafCount)
+        pairsPerBlock = max(1, int(max_memory // (4 * 3 * 8 * self.maxLeafCount)))
+        results = np.empty((len(points), 3))
+        for start in range(0, len(points), pairsPerBlock):
+            stop = start + pairsPerBlock
+            block = nodes[start:stop]
+            valid = offsets < (self.ends[block] - self.starts[block])[:, np.newaxis]
+            indices = np.where(valid, self.starts[block][:, np.newaxis] + offsets, 0)
+
+            rPrime = points[start:stop, np.newaxis, :] - self.sortedPositions[indices]
+            rMod = norm(rPrime, axis=2)
+            if self.epsilon is not None:
+                rMod = np.maximum(rMod, self.epsilon)
+            rMod = np.where(valid, rMod, 1.0)
+            moments = self.sortedMoments[indices] * valid[:, :, np.newaxis]
+            results[start:stop] = np.sum(np.cross(moments, rPrime) / rMod[:, :, np.newaxis]**3, axis=1)
+        return results
+
+    def evaluate(self, points: np.ndarray, tolerance: float = 1e-6, max_memory: int = DEFAULT_MAX_MEMORY):
+        '''
+            Calculates the approximated Biot-Savart sum for an array of points.
+
+            :param points numpy.ndarray: the points to check for the magnetic field, in the format [[x1,y1,z1],...].
+            :param tolerance float: (optional) the requested relative accuracy.
+            :param max_memory int: (optional) the memory budget in bytes for the direct evaluation of the leaves.
+
+            :returns numpy.ndarray: the sum for each point, in the format [[Ix1,Iy1,Iz1],...].
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        theta = openingAngle(tolerance)
+        results = np.zeros((len(points), 3))
+        for start in range(0, len(points), _POINTS_PER_BLOCK):
+            block = points[start:start + _POINTS_PER_BLOCK]
+            results[start:start + len(block)] = self.__traverse(block, theta, max_memory)
+        return results
+
+    def __traverse(self, points, theta, max_memory):
+        '''
+            Walks the tree for a block of points, one level of (point, node) pairs at a time.
+        '''
+        nPoints = len(points)
+        results = np.zeros((nPoints, 3))
+        pairPoints = np.arange(nPoints)
+        pairNodes = np.zeros(nPoints, dtype=int)
+
+        while pairPoints.size:
+            R = points[pairPoints] - self.centers[pairNodes]
+            accepted = self.radii[pairNodes] < theta * norm(R, axis=1)
+            direct = ~accepted & self.isLeaf[pairNodes]
+            opened = ~accepted & ~self.isLeaf[pairNodes]
+
+            for mask, contribution in (
+                    (accepted, lambda m: self.__expansion(R[m], pairNodes[m])),
+                    (direct, lambda m: self.__leafDirect(points[pairPoints[m]], pairNodes[m], max_memory))):
+                if mask.any():
+                    values = contribution(mask)
+                    for axis in range(3):
+                        results[:, axis] += np.bincount(pairPoints[mask], weights=values[:, axis],
+                                                        minlength=nPoints)
+
+            children = self.children[pairNodes[opened]]
+            exists = children >= 0
+            pairPoints = np.repeat(pairPoints[opened], exists.sum(axis=1))
+            pairNodes = children[exists]
+        return results
+
+    def estimateError(self, points: np.ndarray, approximation: np.ndarray, samples: int = 64):
+        '''
+            Estimates the error of an approximation against the direct sum over a sample of the points.
+
+            :param points numpy.ndarray: the points that were evaluated, in the format [[x1,y1,z1],...].
+            :param approximation numpy.ndarray: the values returned by evaluate for those points.
+            :param samples int: (optional) the number of points evaluated directly.
+
+            :returns float: the relative error, norm(approximation - direct) / norm(direct), over the sample.
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if len(points) == 0:
+            return 0.0
+        rng = np.random.default_rng(0)
+        sample = np.sort(rng.choice(len(points), min(samples, len(points)), replace=False))
+        direct = elementField(points[sample], self.positions, self.moments, self.epsilon)
+        scale = norm(direct)
+        if scale == 0:
+            return float(norm(approximation[sample]))
+        return float(norm(approximation[sample] - direct) / scale)
@@ -0,0 +1,123 @@
+"""Refinement Module.
+
+This module contains the adaptive sampling of a vector field over a box. The box
+starts as a coarse grid of cells. A cell is split into its eight octants when
+the field at its center differs from the average of its corners, that is, from
+what a coarse sampling would show there, by more than a relative tolerance.
+Smooth regions keep their coarse cells while the regions where the field or its
+gradient changes quickly, such as next to the windings, are refined.
+
+Every sample lives on the integer lattice of the finest level, so the corners
+shared between neighbouring cells are evaluated only once.
+"""
+import numpy as np
+
+# Offsets of the eight corners, and of the eight children, of a cell.
+OCTANTS = np.array([[i, j, k] for i in (0, 1) for j in (0, 1) for k in (0, 1)])
+
+# Fields weaker than this fraction of the strongest sample are compared in absolute terms,
+# which keeps the cancellation regions from being refined forever.
+FIELD_FLOOR = 1e-6
+
+
+class _LatticeSamples:
+    """_LatticeSamples class.
+    Keeps the field samples taken at the nodes of the finest lattice, indexed by their sorted keys."""
+    def __init__(self, field, low, step, nodes):
+        self.field = field
+        self.low = low
+        self.step = step
+        self.nodes = nodes
+        self.keys = np.empty(0, dtype=np.int64)
+        self.values = np.empty((0, 3))
+
+    def encode(self, ijk):
+        '''
+            Converts lattice coordinates into integer keys.
+        '''
+        return (ijk[..., 0] * self.nodes + ijk[..., 1]) * self.nodes + ijk[..., 2]
+
+    def decode(self, keys):
+        '''
+            Converts integer keys back into lattice coordinates.
+        '''
+        return np.stack((keys // self.nodes**2, keys // self.nodes % self.nodes, keys % self.nodes), axis=-1)
+
+    def points(self, keys):
+        '''
+            Converts integer keys into the positions of the nodes.
+        '''
+        return self.low + self.decode(keys) * self.step
+
+    def sample(self, ijk):
+        '''
+            Returns the field at lattice nodes, evaluating only the nodes not sampled yet.
+        '''
+        keys = self.encode(ijk)
+        new = np.unique(keys)
+        new = new[~np.isin(new, self.keys)]
+        if new.size:
+            merged = np.concatenate((self.keys, new))
+            values = np.concatenate((self.values, np.asarray(self.field(self.points(new)), dtype=float)))
+            order = np.argsort(merged)
+            self.keys, self.values = merged[order], values[order]
+        return self.values[np.searchsorted(self.keys, keys)]
+
+
+def adaptiveGrid(field, low, high, n: int, tolerance: float = 1e-2, max_depth: int = 3):
+    '''
+        Samples a vector field over a box, refining the cells where it is not well represented.
+
+        :param field callable: a function taking points in the format [[x1,y1,z1],...] and returning
+        the field at each of them in the same format.
+        :param low list|numpy.ndarray: the lowest corner of the box.
+        :param high list|numpy.ndarray: the highest corner of the box.
+        :param n int: the number of points along each axis of the coarse grid, at least 2.
+        :param tolerance float: (optional) the relative difference between the field at the center of a cell
+        and the average of its corners above which the cell is split.
+        :param max_depth int: (optional) the number of times a coarse cell may be split.
+
+        :returns tuple: the sampled points, the field at each of them, and the leaf cells as an array with
+        their lowest corners and an array with their sizes along each axis.
+
+        :raises ValueError: if n is lower than 2, the tolerance is not positive or max_depth is negative.
+    '''
+    if n < 2:
+        raise ValueError("The coarse grid needs at least two points along each axis")
+    if tolerance <= 0:
+        raise ValueError("The tolerance must be positive")
+    if max_depth < 0:
+        raise ValueError("The depth must not be negative")
+
+    low = np.asarray(low, dtype=float)
+    high = np.asarray(high, dtype=float)
+    scale = 2**int(max_depth)
+    finest = (n - 1) * scale
+    samples = _LatticeSamples(field, low, (high - low) / finest, finest + 1)
+
+    coarse = np.arange(n - 1) * scale
+    origins = np.stack(np.meshgrid(coarse, coarse, coarse, indexing='ij'), axis=-1).reshape(-1, 3)
+    size = scale
+    leaves, leafSizes = [], []
+    while len(origins):
+        corners = samples.sample(origins[:, np.newaxis, :] + OCTANTS * size)
+        if size == 1:
+            leaves.append(origins)
+            leafSizes.append(np.full(len(origins), size))
+            break
+
+        center = samples.sample(origins + size // 2)
+        difference = np.linalg.norm(center - corners.mean(axis=1), axis=1)
+        floor = FIELD_FLOOR * np.max(np.linalg.norm(samples.values, axis=1))
+        refine = difference > tolerance * np.maximum(np.linalg.norm(center, axis=1), floor)
+
+        leaves.append(origins[~refine])
+        leafSizes.append(np.full(np.count_nonzero(~refine), size))
+        size //= 2
+        origins = (origins[refine][:, np.newaxis, :] + OCTANTS * size).reshape(-1, 3)
+
+    step = samples.step
+    leaves = np.concatenate(leaves)
+    leafSizes = np.concatenate(leafSizes)
+    return (samples.points(samples.keys), samples.values, low + leaves * step,
+            leafSizes[:, np.newaxis] * step)
@@ -0,0 +1,167 @@
+"""Symmetry Module.
+
+This module contains the tools to evaluate the field of coils with mirror
+planes on a fundamental domain only. A mirror is given as a tuple
+(axis, position, parity): the plane is perpendicular to the x, y or z axis
+(0, 1 or 2) at the given position, and reflecting the coil on it maps the
+current density J to parity * sigma J, sigma being the reflection.
+
+Since B is a pseudovector, the field then obeys B(sigma r) = -parity * sigma B(r).
+A planar loop seen through a plane perpendicular to it has its current reversed
+by the reflection (parity -1), so B(sigma r) = sigma B(r): only the component
+normal to the plane changes sign.
+
+Points are folded onto the side of each plane at or below its position, the
+folded points that coincide are evaluated once and the field is unfolded back
+with the sign flips of every reflection undone.
+"""
+import numpy as np
+
+# Folded points closer than this fraction of the extent of the points are evaluated once.
+MERGE_TOLERANCE = 1e-9
+
+# Declared mirrors the field deviates from by more than this, see mirrorError, are not used to fold points.
+SYMMETRY_TOLERANCE = 1e-3
+
+
+def validateMirrors(mirrors):
+    '''
+        Checks a list of mirrors and converts it into a tuple of (axis, position, parity) tuples.
+
+        :param mirrors list: the mirrors, each one as (axis, position, parity).
+
+        :returns tuple: the mirrors.
+
+        :raises ValueError: if an axis is not 0, 1 or 2, appears twice, or a parity is not 1 or -1.
+    '''
+    result = []
+    for axis, position, parity in mirrors or ():
+        if axis not in (0, 1, 2):
+            raise ValueError("The axis of a mirror must be 0, 1 or 2")
+        if parity not in (1, -1):
+            raise ValueError("The parity of a mirror must be 1 or -1")
+        if any(axis == other for other, _, _ in result):
+            raise ValueError("Each axis may have a single mirror")
+        result.append((int(axis), float(position), int(parity)))
+    return tuple(result)
+
+
+def reflect(points: np.ndarray, mirror):
+    '''
+        Reflects points on a mirror plane.
+
+        :param points numpy.ndarray: the points in the format [[x1,y1,z1],...].
+        :param mirror tuple: the mirror, as (axis, position, parity).
+
+        :returns numpy.ndarray: the reflected points.
+    '''
+    axis, position, _ = mirror
+    reflected = np.array(points, dtype=float)
+    reflected[:, axis] = 2 * position - reflected[:, axis]
+    return reflected
+
+
+def mirrorSigns(mirror):
+    '''
+        Returns the factors taking the field at a point to the field at its reflection, -parity * sigma.
+    '''
+    axis, _, parity = mirror
+    signs = np.full(3, -float(parity))
+    signs[axis] = parity
+    return signs
+
+
+def foldPoints(points: np.ndarray, mirrors):
+    '''
+        Folds points onto the fundamental domain of a set of mirrors and merges the folded points that coincide.
+
+        :param points numpy.ndarray: the points in the format [[x1,y1,z1],...].
+        :param mirrors tuple: the mirrors, see validateMirrors.
+
+        :returns tuple: the distinct folded points, the index of the folded point of each point, and the
+        factors, in the format [[sx1,sy1,sz1],...], taking the field of the folded point to the one of each point.
+    '''
+    folded = np.array(points, dtype=float).reshape(-1, 3)
+    signs = np.ones_like(folded)
+    for mirror in mirrors:
+        axis, position, _ = mirror
+        outside = folded[:, axis] > position
+        folded[outside] = reflect(folded[outside], mirror)
+        signs[outside] *= mirrorSigns(mirror)
+
+    if len(folded) == 0:
+        return folded, np.zeros(0, dtype=int), signs
+    low = folded.min(axis=0)
+    scale = max(float(np.ptp(folded, axis=0).max()), 1.0) * MERGE_TOLERANCE
+    _, first, inverse = np.unique(np.round((folded - low) / scale), axis=0, return_index=True,
+                                  return_inverse=True)
+    return folded[first], inverse.reshape(-1), signs
+
+
+def unfoldField(field: np.ndarray, inverse: np.ndarray, signs: np.ndarray):
+    '''
+        Spreads the field of the folded points back to the original points, see foldPoints.
+
+        :returns numpy.ndarray: the field in the format [[Bx1,By1,Bz1],...].
+    '''
+    return np.asarray(field)[inverse] * signs
+
+
+def mirrorError(field, points: np.ndarray, mirror):
+    '''
+        Measures how far a field is from obeying a mirror, comparing it at points and at their reflections.
+
+        :param field callable: a function taking points in the format [[x1,y1,z1],...] and returning
+        the field at each of them in the same format.
+        :param points numpy.ndarray: the probe points, which should not lie on the coil.
+        :param mirror tuple: the mirror, as (axis, position, parity).
+
+        :returns float: the largest difference, at any probe, between the field at its reflection and the
+        one predicted by the mirror, over the RMS field.
+    '''
+    values = np.asarray(field(np.concatenate((points, reflect(points, mirror)))), dtype=float)
+    direct, reflected = values[:len(points)], values[len(points):]
+    scale = np.sqrt(np.mean(np.sum(direct ** 2, axis=1)))
+    deviation = np.linalg.norm(reflected - direct * mirrorSigns(mirror), axis=1)
+    return float(deviation.max() / scale) if scale > 0 else 0.0
+
+
+def probePoints(path: np.ndarray, center, n: int = 256, seed: int = 0):
+    '''
+        Places probe points around a path, at distances from the center between a quarter of and two times
+        the size of its bounding box, so the field is probed close to the windings as well as away from them.
+
+        :returns numpy.ndarray: the points in the format [[x1,y1,z1],...].
+    '''
+    rng = np.random.default_rng(seed)
+    size = max(float(np.ptp(path, axis=0).max()), np.finfo(float).eps)
+    directions = rng.normal(size=(n, 3))
+    directions /= np.linalg.norm(directions, axis=1)[:, np.newaxis]
+    return np.asarray(center, dtype=float) + directions * size * rng.uniform(0.25, 2.0, size=(n, 1))
+
+
+def detectMirrors(field, path: np.ndarray, center=None, tolerance: float = 1e-6):
+    '''
+        Finds the mirror planes through a center, perpendicular to the coordinate axes, that the field of
+        a coil obeys within a tolerance.
+
+        :param field callable: same as in mirrorError.
+        :param path numpy.ndarray: the path of the coil, in the format [[x1,y1,z1],...].
+        :param center list|numpy.ndarray: (optional) the point the planes go through, the default is the
+        center of the bounding box of the path.
+        :param tolerance float: (optional) the largest relative error, see mirrorError, a mirror may have.
+
+        :returns tuple: the mirrors found, see validateMirrors.
+    '''
+    path = np.asarray(path, dtype=float)
+    if center is None:
+        center = (path.min(axis=0) + path.max(axis=0)) / 2
+    probes = probePoints(path, center)
+    mirrors = []
+    for axis in range(3):
+        for parity in (-1, 1):
+            mirror = (axis, float(center[axis]), parity)
+            if mirrorError(field, probes, mirror) <= tolerance:
+                mirrors.append(mirror)
+                break
+    return tuple(mirrors)
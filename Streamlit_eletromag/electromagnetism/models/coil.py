@@ -7,15 +7,49 @@ magnetic field it generates at various points in space using numerical
 methods (e.g., Biot-Savart Law).
 """
 
-from numpy import array, ndarray, loadtxt, moveaxis, newaxis, cross, concatenate, shape
+from numpy import array, ndarray, moveaxis, newaxis, concatenate
 from numpy.linalg import norm
+import os
+import warnings
 import numpy as np
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
 from ..mathematics.constants import MU0_PRIME
+from ..mathematics.biot_savart import PreparedPath, DEFAULT_MAX_MEMORY, preparedChunks
+from ..mathematics.biot_savart import elementField, segmentField
+from ..mathematics.compiled import resolveBackend
+from ..mathematics.loops import loopField, arcElements
+from ..mathematics.octree import SegmentTree
+from ..mathematics.axisymmetry import gridAxes, halfPlanePoints, cylindricalAverage, interpolateField
+from ..mathematics.refinement import adaptiveGrid
+from ..mathematics.decimation import simplifyPath, pathImportance, screenTolerance, binCloud, DEFAULT_RESOLUTION, DEFAULT_MARKER_BUDGET
+from ..mathematics.symmetry import validateMirrors, foldPoints, unfoldField, mirrorError, probePoints, detectMirrors
+from ..mathematics.symmetry import SYMMETRY_TOLERANCE
+from ..parallel import parallelBiotSavart, resolveWorkers
+from ..cache import contentKey
+from ..loader import loadPath, sidecarPath
 from electromagnetism.mathematics.geometry import helicoid
-from electromagnetism.mathematics.geometry import racetrack3d
-import plotly.express as px
+from electromagnetism.mathematics.geometry import racetrack3d, racetrack_turns
 import plotly.graph_objects as go
-from plotly.io import show
+
+# Default number of points in each block yielded by Coil.iterBiotSavart.
+DEFAULT_CHUNK = 1024
+
+# Index of the axis normal to the planes of Coil.planeGrid.
+PLANE_AXES = {'x': 0, 'y': 1, 'z': 2}
+
+# Memory, in bytes, each coil may use to remember the unit-current fields it calculated.
+UNIT_FIELD_MEMORY = 64 * 2**20
+
+# Deviation of a 'Model' field from the field of the path, see Coil.modelError, above which a warning is issued.
+MODEL_TOLERANCE = 1e-2
+
+# Nodes of the (rho, z) grid of Coil.axisymmetricField along each axis, independent of the points asked for.
+AXISYMMETRIC_NODES = 50
+
+# Points of an axisymmetric calculation checked against the direct field, and the error above which a warning is issued.
+AXISYMMETRIC_PROBES = 256
+AXISYMMETRIC_TOLERANCE = 1e-2
 
 class Coil:
     """Coil class.
@@ -24,34 +58,222 @@ class Coil:
     computing the magnetic field it generates at various points in space using numerical 
     methods (e.g., Biot-Savart Law)."""
     def __init__(self, coilPath:ndarray, invertRAxis:bool=False,
-                 *, crossSectionalArea:float = 1 , resistivity:float=1.7e-8):
+                 *, crossSectionalArea:float = 1 , resistivity:float=1.7e-8, symmetry = None):
         '''
             initialize a instance from Coil class
         
 
-            :param coilPath numpy.ndarray: the ordered array of points where the path goes trough.
+            :param coilPath numpy.ndarray|str: the ordered array of points where the path goes trough, or a
+            text file with it, which is loaded through a memory-mapped sidecar, see the Loader Module.
             :param invertRAxis bol: (optional) used if the coilPath is in the format of 
             [[X1,Y1,Z1],...] rather than [[X], [Y], [Z]].
             :param crossSectionalArea float: (optional) the area of a cross section of the wire in 
             squared meters, the default is unitary.
             :param resistivity float: (optional) the resistivity of the wire material in Ohm meter, 
             the default is copper.
+            :param symmetry list: (optional) the mirror planes of the coil, see the symmetry property.
 
         '''
-        if isinstance(coilPath, str):
-            self.coilPath = loadtxt(coilPath)
-        else:
-            self.coilPath = coilPath
+        pathFile = None
+        if isinstance(coilPath, (str, os.PathLike)):
+            source = os.path.abspath(coilPath)
+            coilPath = loadPath(source)
+            if isinstance(coilPath, np.memmap):
+                pathFile = coilPath.filename
 
         if not invertRAxis:
-            self.coilPath = moveaxis(self.coilPath, 0, 1)
+            coilPath = moveaxis(coilPath, 0, 1)
         if crossSectionalArea is None:
             raise ValueError('Insert a valid cross sectional area')
-        length = self.__calculateCoilLength()
-        self._length = length
         self._resistivity = resistivity
         self._crossSectionalArea = crossSectionalArea
-        self._resistance = self.__calculateCoilResistance()
+        self.coilPath = coilPath
+        # Pickled coils carry the sidecar instead of the path, which other processes map again.
+        self._pathFile = None if pathFile is None else (pathFile, not invertRAxis, source)
+        self.symmetry = symmetry
+        self._treeError = None
+        self._asymmetry = None
+        self._axisymmetricError = None
+
+    @property
+    def modelError(self):
+        '''
+            Returns the relative deviation of the 'Model' field from the direct field of the path, the
+            largest one at the probes around the coil over the RMS field, as symmetry.mirrorError does.
+            It is measured once for each path by the first 'Model' calculation, or None before it.
+        '''
+        return self._prepared.get('model')
+
+    @property
+    def treeError(self):
+        '''
+            Returns the estimated relative error, against the direct kernel, of the last
+            tree-accelerated field calculation, or None if there was none.
+        '''
+        return self._treeError
+
+    @property
+    def asymmetry(self):
+        '''
+            Returns the relative deviation from axial symmetry measured by the last
+            axisymmetric field calculation, or None if there was none.
+        '''
+        return self._asymmetry
+
+    @property
+    def axisymmetricError(self):
+        '''
+            Returns the RMS deviation of the last axisymmetric field calculation from the direct field, over
+            the RMS direct field, at up to AXISYMMETRIC_PROBES of its points, or None if there was none.
+            It measures the asymmetry of the coil and the coarseness of the (rho, z) grid together.
+        '''
+        return self._axisymmetricError
+
+    @property
+    def symmetry(self):
+        '''
+            Returns the mirror planes of the coil, a tuple of (axis, position, parity) tuples, see the
+            Symmetry Module. When there are any, and the field obeys them within SYMMETRY_TOLERANCE, the
+            field is only calculated on the points folded onto one side of every plane and reflected back
+            to the others.
+        '''
+        return self._symmetry
+
+    @symmetry.setter
+    def symmetry(self, mirrors):
+        '''
+            Declares the mirror planes of the coil, an empty list or None removes them.
+
+            :param mirrors list: the mirrors, each one as (axis, position, parity), axis being 0, 1 or 2
+            for planes perpendicular to x, y or z and parity being -1 when the reflection reverses the
+            current, as for planes perpendicular to a planar loop, or 1 otherwise.
+
+            :raises ValueError: if a mirror is not valid.
+        '''
+        self._symmetry = validateMirrors(mirrors)
+
+    @property
+    def symmetryError(self):
+        '''
+            Returns the relative deviation of the field from the declared mirror planes, the largest one at
+            the probes around the coil, see symmetry.mirrorError, measured by the last calculation of a coil
+            with mirror planes, or None if there was none.
+        '''
+        return self._symmetryError
+
+    def detectSymmetry(self, center = None, tolerance:float = 1e-6, integration_method:str = 'Analytic'):
+        '''
+            Looks for mirror planes through a center, perpendicular to the coordinate axes, and declares the
+            ones the field obeys, see the symmetry property.
+
+            :param center list|numpy.ndarray: (optional) the point the planes go through, the default is the
+            center of the bounding box of the path.
+            :param tolerance float: (optional) the largest relative deviation of the field, measured away
+            from the coil, a mirror may have.
+            :param integration_method str: (optional) the method the field is compared with.
+
+            :returns tuple: the mirrors found.
+        '''
+        self.symmetry = detectMirrors(lambda points: self.__kernel(points, integration_method),
+                                      np.array(self.bounds()), center, tolerance)
+        return self.symmetry
+
+    def __getstate__(self):
+        '''
+            Pickles the coil, replacing a path mapped from a sidecar by the names of the sidecar and its source.
+            The prepared segment data and the remembered unit fields are left out, they are rebuilt when needed.
+        '''
+        state = self.__dict__.copy()
+        state['_prepared'] = {}
+        state['_unitFields'] = OrderedDict()
+        if state.get('_pathFile') is not None:
+            state['_coilPath'] = None
+        return state
+
+    def __setstate__(self, state):
+        '''
+            Restores a pickled coil, keeping its path read-only. When the sidecar is gone, removed as stale
+            once its source changed for instance, the source is loaded again. A source that changed gives
+            a new path, which discards the prepared data, with a RuntimeWarning.
+        '''
+        self.__dict__.update(state)
+        self._prepared = {}
+        self._unitFields = OrderedDict()
+        if self.__dict__.get('_pathFile') is not None:
+            filename, transposed, source = self._pathFile
+            try:
+                path = np.load(filename, mmap_mode='r', allow_pickle=False)
+            except FileNotFoundError:
+                unchanged = sidecarPath(source) == filename
+                path = loadPath(source)
+                if not unchanged:
+                    warnings.warn(f"{source} changed since the coil was pickled, its current content is used",
+                                  RuntimeWarning)
+                    self.coilPath = moveaxis(path, 0, 1) if transposed else path
+                    self._pathFile = (path.filename, transposed, source) if isinstance(path, np.memmap) else None
+            if self._coilPath is None:
+                self._coilPath = (moveaxis(path, 0, 1) if transposed else path).view(np.ndarray)
+        if self._coilPath is not None:
+            self._coilPath.flags.writeable = False
+
+    @property
+    def coilPath(self):
+        '''
+            Returns the ordered array of points of the path, in the format [[x1,y1,z1],...].
+            The array is read-only, assign a new path to change it.
+        '''
+        return self._coilPath
+
+    @coilPath.setter
+    def coilPath(self, new_path):
+        '''
+            Sets a new path, in the format [[x1,y1,z1],...]. The prepared segment data is discarded
+            and the length and the resistance of the coil are recalculated.
+
+            :param new_path numpy.ndarray: the ordered array of points where the path goes trough. A float array
+            that no one can write to, such as a read-only memory map, is kept as a view instead of being copied.
+        '''
+        path = new_path
+        shared, base = isinstance(path, np.ndarray) and path.dtype == float, path
+        while shared and isinstance(base, np.ndarray):
+            shared, base = not base.flags.writeable, base.base
+        if not shared:
+            path = np.array(path, dtype=float)
+        path = path.view(np.ndarray)
+        path.flags.writeable = False
+        self._coilPath = path
+        self._pathFile = None
+        self._prepared = {}
+        self._unitFields = OrderedDict()
+        # The mirror planes of the old path may not hold for the new one.
+        self._symmetry = ()
+        self._symmetryError = None
+        self._length = self.__calculateCoilLength()
+        # Models assign their path before the resistivity and the area are known.
+        if hasattr(self, '_crossSectionalArea'):
+            self._resistance = self.__calculateCoilResistance()
+
+    def prepared(self, integration_method:str = 'Simpson'):
+        '''
+            Returns the segment data of the path for an integration method, computed on the first
+            call and reused until the path changes.
+
+            :param integration_method str: (optional) 'Riemann', 'Simpson' or 'Analytic'.
+
+            :returns PreparedPath: the prepared path, which can be given to the kernels and to other processes.
+
+            :raises ValueError: if the integration method is unknown.
+        '''
+        if integration_method not in self._prepared:
+            self._prepared[integration_method] = PreparedPath.fromPath(self.coilPath, integration_method)
+        return self._prepared[integration_method]
+
+    def bounds(self):
+        '''
+            Returns the lowest and the highest corners of the bounding box of the path, which the grids
+            and the probes around the coil are placed from.
+        '''
+        return self.coilPath.min(axis=0), self.coilPath.max(axis=0)
 
     @property
     def resistivity(self):
@@ -149,37 +371,17 @@ class Coil:
             :returns float: the integral part of the Biot-Savart law for the coil path 
             and the point r0.
         '''
-        if integration_method == 'Riemann':
-            avgR = 0.5 * (self.coilPath[:-1] + self.coilPath[1:])
-            dl = self.coilPath[1:] - self.coilPath[:-1]
-                        
-            rPrime = r0 - avgR
-            rMod = norm(rPrime, axis=1)
-
-            integrand = np.cross(dl, rPrime) / rMod[:, np.newaxis]**3
-            integ = np.sum(integrand, axis=0)
-            return integ
-
-        elif integration_method == 'Simpson':
-
-            points = self.coilPath
-            rPrime = r0 - self.coilPath
-            rMod = norm(rPrime, axis=1)
-            epsilon = 1e-12
-            rMod = np.maximum(rMod, epsilon)
-            dl = np.gradient(self.coilPath, axis=0)
-            integrand = np.cross(dl, rPrime) / rMod[:, np.newaxis]**3
-
-            h = norm(self.coilPath[1] - self.coilPath[0])
-
-            weights = 2 * np.ones(len(self.coilPath))
-            weights[1::2] = 4
-            weights[0], weights[-1] = 1, 1
-
-            integ = (h/3) * np.sum(integrand * weights[:, np.newaxis], axis=0)
-            return integ
+        return self._dimensionlessField(np.reshape(r0, (1, 3)), integration_method)[0]
 
+    def _modelIntegral(self, points:ndarray, max_memory:int = DEFAULT_MAX_MEMORY):
+        '''
+            Calculates the Biot-Savart integral of the ideal geometry the coil was generated from,
+            for the points in the format [[x1,y1,z1],...]. Used by the 'Model' integration method.
 
+            :raises ValueError: if the coil was not generated from a model.
+        '''
+        raise ValueError("The 'Model' integration method is only available for coils generated "
+                         "from a model, such as Solenoid and Racetrack")
 
     def biotSavart1p(self, r0:ndarray, I:float, integration_method: str = 'Simpson'):
         '''
@@ -188,6 +390,8 @@ class Coil:
 
             :param r0 numpy.ndarray(float): the point to check for the magnetic field.
             :param I float: (optional) the current going through the coil in meters.
+            :param integration_method str: (optional) 'Riemann', 'Simpson' or 'Analytic', the last one
+            being exact for straight segments of any length.
 
             :returns numpy.ndarray: a list of the magnetic field components in r0 
             because of the current going through coilPath.
@@ -198,15 +402,39 @@ class Coil:
         integ = self.__BiotSavart1pDimensionless(r0, integration_method)
         return integ*outsideValue
 
-    def biotSavart3d( self, pointsList:ndarray,integration_method = 'Simpson', I:float = 1, invertPAxis:bool=False ):
+    def biotSavart3d( self, pointsList:ndarray,integration_method = 'Simpson', I:float = 1, invertPAxis:bool=False,
+                      *, max_memory:int = DEFAULT_MAX_MEMORY, workers:int = None, executor = None,
+                      tolerance:float = None, backend:str = 'auto', cache = None ):
         '''
             Calculates the magnetic fields for an array of points in space by using Biot-Savart
             and assuming constant current.
 
             :param pointsList numpy.ndarray: the array of points to check for the magnetic field.
+            :param integration_method str: (optional) 'Riemann', 'Simpson' or 'Analytic', the last one
+            being exact for straight segments of any length. Coils generated from a model, such as
+            Solenoid and Racetrack, also accept 'Model', which uses the closed-form fields of their
+            ideal geometry instead of the discretized path, with the deviation stored in modelError.
             :param I float: (optional) the current going through the coil, in Amperes.
             :param invertPAxis bool: (optional) whether the pointsList is in the format of 
             [[x1,y1,z1],...] rather than [[X], [Y], [Z]].
+            :param max_memory int: (optional) the memory budget, in bytes, for each block of points
+            integrated at once.
+            :param workers int: (optional) the number of processes the points are sharded across,
+            any value lower than 1 uses every core. The default is a serial evaluation.
+            :param executor concurrent.futures.Executor: (optional) an existing executor to run the
+            shards on instead of creating a new process pool.
+            :param tolerance float: (optional) when given, the segments are clustered in an octree and
+            far away clusters are replaced by their far-field expansion, with this relative accuracy.
+            The estimated error against the direct kernel is stored in treeError. The tree is evaluated
+            in the calling process and is not available for the 'Analytic' method.
+            :param backend str: (optional) 'numpy', 'numba' or 'auto'. 'numba' uses compiled and
+            multithreaded kernels, 'auto' uses them whenever Numba is installed.
+            :param cache electromagnetism.cache.FieldCache: (optional) a persistent cache the field is looked up
+            in before being calculated. The entries hold the field for a unit current, so they are shared
+            by every current.
+
+            The field of a unit current is also remembered by the coil, up to UNIT_FIELD_MEMORY bytes, so
+            calling it again for the same points with another current only rescales the stored field.
 
             :returns numpy.ndarray: a list of coordinates and the respective magnetic field values 
             for each point caused by the coilPath.
@@ -217,15 +445,265 @@ class Coil:
         if invertPAxis:
             pointsList = moveaxis(pointsList, 0, 1)
 
-        pListLen = shape(pointsList)[0]
-        results = []
-        for i in range(pListLen):
-            singleResult = self.__BiotSavart1pDimensionless(pointsList[i], integration_method)
-            results.append(singleResult)
+        results = self._dimensionlessField(pointsList, integration_method, max_memory, workers, executor, tolerance,
+                                           backend, cache)
 
           # Multiplies the integrals by the outside factor.
-        results = array(results) * I * MU0_PRIME
+        results = results * I * MU0_PRIME
+
+        return self.__withPoints(pointsList, results, invertPAxis)
+
+    def _dimensionlessField(self, points:ndarray, integration_method='Simpson', max_memory:int = DEFAULT_MAX_MEMORY,
+                            workers:int = None, executor = None, tolerance:float = None, backend:str = 'auto',
+                            cache = None):
+        '''
+            Dispatches the dimensionless field of an array of points in the format [[x1,y1,z1],...]
+            to the kernel selected by the options of biotSavart3d.
+            The field is the one of a unit current, so it is remembered by the coil and any
+            later call for the same points only has to scale it by the new current.
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        key = self.__fieldKey(points, integration_method, tolerance, backend)
+        results = self.__recall(key)
+        if results is not None:
+            return results
+
+        if cache is not None:
+            results = cache.get(key)
+            if results is not None and tolerance is not None:
+                # The error of the tree that produced the entry is not known.
+                self._treeError = None
+        if results is None:
+            results = self.__integrate(points, integration_method, max_memory, workers, executor, tolerance,
+                                       backend)
+            if cache is not None:
+                cache.put(key, results)
+        return self.__remember(key, results)
+
+    def unitField(self, pointsList:ndarray, integration_method = 'Simpson', *, max_memory:int = DEFAULT_MAX_MEMORY,
+                  workers:int = None, executor = None, tolerance:float = None, backend:str = 'auto', cache = None):
+        '''
+            Calculates the magnetic field of a current of one Ampere, as biotSavart3d does, for points in the
+            format [[x1,y1,z1],...]. The field of any other current is this one times the current.
+
+            :param pointsList numpy.ndarray: the array of points, in the format [[x1,y1,z1],...].
+            :param integration_method str: (optional) any method accepted by biotSavart3d.
+            :param max_memory int: (optional) same as in biotSavart3d.
+            :param workers int: (optional) same as in biotSavart3d.
+            :param executor concurrent.futures.Executor: (optional) same as in biotSavart3d.
+            :param tolerance float: (optional) same as in biotSavart3d.
+            :param backend str: (optional) same as in biotSavart3d.
+            :param cache electromagnetism.cache.FieldCache: (optional) same as in biotSavart3d.
+
+            :returns numpy.ndarray: the magnetic field in Tesla per Ampere, in the format [[Bx1,By1,Bz1],...].
+        '''
+        return self._dimensionlessField(pointsList, integration_method, max_memory, workers, executor, tolerance,
+                                        backend, cache) * MU0_PRIME
+
+    def remembers(self, pointsList:ndarray, integration_method = 'Simpson', tolerance:float = None,
+                  backend:str = 'auto'):
+        '''
+            Tells whether the field of a unit current at points in the format [[x1,y1,z1],...], with the
+            options of biotSavart3d, is remembered by the coil, so calculating it again only recalls it.
+        '''
+        points = np.asarray(pointsList, dtype=float).reshape(-1, 3)
+        return self.__fieldKey(points, integration_method, tolerance, backend) in self._unitFields
+
+    def __recall(self, key):
+        '''
+            Returns a remembered unit-current field, or None.
+        '''
+        results = self._unitFields.get(key)
+        if results is not None:
+            self._unitFields.move_to_end(key)
+        return results
 
+    def __remember(self, key, results):
+        '''
+            Remembers a unit-current field, forgetting the least recently used ones above UNIT_FIELD_MEMORY.
+        '''
+        results = np.asarray(results)
+        results.flags.writeable = False
+        if results.nbytes <= UNIT_FIELD_MEMORY:
+            self._unitFields[key] = results
+            while sum(field.nbytes for field in self._unitFields.values()) > UNIT_FIELD_MEMORY:
+                self._unitFields.popitem(last=False)
+        return results
+
+    def __integrate(self, points, integration_method, max_memory, workers, executor, tolerance, backend):
+        '''
+            Calculates the dimensionless field with the kernel selected by the options of biotSavart3d,
+            on the fundamental domain of the mirror planes when the coil has any that the field obeys.
+        '''
+        if not self.__mirrorsHold(integration_method):
+            return self.__kernel(points, integration_method, max_memory, workers, executor, tolerance, backend)
+        folded, inverse, signs = foldPoints(points, self.symmetry)
+        results = self.__kernel(folded, integration_method, max_memory, workers, executor, tolerance, backend)
+        return unfoldField(results, inverse, signs)
+
+    def __mirrorsHold(self, integration_method):
+        '''
+            Measures once, for each integration method, how well the field obeys the mirror planes and tells
+            whether the points can be folded. Planes the field deviates from by more than SYMMETRY_TOLERANCE,
+            see the Symmetry Module, are not used and a RuntimeWarning is issued when they are measured.
+        '''
+        if not self.symmetry:
+            return False
+        key = ('symmetry', integration_method, self.symmetry)
+        if key not in self._prepared:
+            low, high = self.bounds()
+            probes = probePoints(np.array((low, high)), (low + high) / 2)
+            self._prepared[key] = max(mirrorError(lambda p: self.__kernel(p, integration_method), probes, mirror)
+                                      for mirror in self.symmetry)
+            if self._prepared[key] > SYMMETRY_TOLERANCE:
+                warnings.warn(f"The field deviates by {self._prepared[key]:.2%} from the mirror planes of the coil, "
+                              "which are not used", RuntimeWarning)
+        self._symmetryError = self._prepared[key]
+        return self._symmetryError <= SYMMETRY_TOLERANCE
+
+    def __kernel(self, points, integration_method, max_memory = DEFAULT_MAX_MEMORY, workers = None, executor = None,
+                 tolerance = None, backend = 'auto'):
+        '''
+            Calculates the dimensionless field of every point with the kernel selected by the options of biotSavart3d.
+        '''
+        if integration_method == 'Model':
+            results = self._modelIntegral(np.asarray(points, dtype=float), max_memory)
+            self.__checkModel(max_memory)
+            return results
+        if tolerance is None:
+            return self._integral(points, integration_method, max_memory, workers, executor, backend)
+        tree = self.__segmentTree(integration_method)
+        results = tree.evaluate(points, tolerance, max_memory)
+        self._treeError = tree.estimateError(points, results)
+        return results
+
+    def __checkModel(self, max_memory = DEFAULT_MAX_MEMORY):
+        '''
+            Compares the 'Model' field with the 'Analytic' field of the path at the probes around the coil,
+            once for each path, and issues a RuntimeWarning when they differ by more than MODEL_TOLERANCE.
+        '''
+        if 'model' not in self._prepared:
+            low, high = self.bounds()
+            probes = probePoints(np.array((low, high)), (low + high) / 2)
+            model = self._modelIntegral(probes, max_memory)
+            direct = self.__kernel(probes, 'Analytic', max_memory)
+            scale = np.sqrt(np.mean(np.sum(direct ** 2, axis=1)))
+            deviation = np.linalg.norm(model - direct, axis=1).max()
+            self._prepared['model'] = float(deviation / scale) if scale > 0 else 0.0
+            if self._prepared['model'] > MODEL_TOLERANCE:
+                warnings.warn(f"The 'Model' field deviates by up to {self._prepared['model']:.2%} from the field "
+                              "of the path, see modelError", RuntimeWarning)
+
+    def _integral(self, points, integration_method, max_memory = DEFAULT_MAX_MEMORY, workers = None, executor = None,
+                  backend = 'auto'):
+        '''
+            Calculates the dimensionless field of the points with the direct kernel of an integration method.
+        '''
+        return parallelBiotSavart(self.prepared(integration_method), points, integration_method, max_memory,
+                                  workers=workers, executor=executor, backend=backend)
+
+    def _pathKey(self):
+        '''
+            Returns what identifies the path in the keys of the fields, the path itself.
+        '''
+        return self.coilPath
+
+    def __pathDigest(self):
+        '''
+            Returns the digest of what identifies the path, hashed once and kept with the prepared data.
+        '''
+        if 'digest' not in self._prepared:
+            self._prepared['digest'] = contentKey(type(self).__name__, self._pathKey())
+        return self._prepared['digest']
+
+    def __fieldKey(self, points, integration_method, tolerance, backend):
+        '''
+            Returns the key of the dimensionless field of the points in a FieldCache.
+        '''
+        return contentKey(self.__pathDigest(), points, integration_method, tolerance, self.symmetry,
+                          resolveBackend(backend))
+
+    def __segmentTree(self, integration_method):
+        '''
+            Returns the octree of the current elements, built once and kept with the prepared data.
+        '''
+        key = ('tree', integration_method)
+        if key not in self._prepared:
+            self._prepared[key] = SegmentTree(*self.prepared(integration_method).elements())
+        return self._prepared[key]
+
+    def iterBiotSavart(self, pointsList:ndarray, integration_method = 'Simpson', I:float = 1,
+                       *, chunk:int = DEFAULT_CHUNK, max_memory:int = DEFAULT_MAX_MEMORY, workers:int = None,
+                       executor = None, tolerance:float = None, backend:str = 'auto', cache = None):
+        '''
+            Calculates the magnetic fields for an array of points block by block, yielding each block as
+            soon as it is done. The calculation stops as soon as the iteration is abandoned, so long
+            evaluations can be followed and cancelled.
+
+            :param pointsList numpy.ndarray: the array of points, in the format [[x1,y1,z1],...].
+            :param integration_method str: (optional) any method accepted by biotSavart3d.
+            :param I float: (optional) the current going through the coil, in Amperes.
+            :param chunk int: (optional) the number of points in each block.
+            :param max_memory int: (optional) same as in biotSavart3d.
+            :param workers int: (optional) same as in biotSavart3d, the pool is created for each block unless
+            an executor is given.
+            :param executor concurrent.futures.Executor: (optional) same as in biotSavart3d.
+            :param tolerance float: (optional) same as in biotSavart3d, the tree is built only once.
+            :param backend str: (optional) same as in biotSavart3d.
+            :param cache electromagnetism.cache.FieldCache: (optional) same as in biotSavart3d. A field that
+            is cached, or remembered by the coil, is yielded as a single block. A new one is only stored
+            once every block is done.
+
+            When the coil has mirror planes, the blocks are taken from the points folded onto the fundamental
+            domain and each one yields every point that folds into it, given by an array of indices.
+
+            :returns generator: tuples (index, B) where B, in the format [[Bx1,By1,Bz1],...], is the magnetic
+            field of pointsList[index], index being a slice or an array of indices.
+
+            :raises ValueError: if chunk is not positive.
+        '''
+        if chunk < 1:
+            raise ValueError("The chunk must have at least one point")
+        points = np.asarray(pointsList, dtype=float).reshape(-1, 3)
+
+        key = self.__fieldKey(points, integration_method, tolerance, backend)
+        results = self.__recall(key)
+        if results is None and cache is not None:
+            results = cache.get(key)
+            if results is not None:
+                self.__remember(key, results)
+        if results is not None:
+            yield slice(0, len(points)), results * I * MU0_PRIME
+            return
+
+        results = np.empty((len(points), 3))
+        if self.__mirrorsHold(integration_method):
+            folded, inverse, signs = foldPoints(points, self.symmetry)
+            order = np.argsort(inverse, kind='stable')
+            bounds = np.searchsorted(inverse[order], np.arange(0, len(folded) + chunk, chunk))
+            for n, start in enumerate(range(0, len(folded), chunk)):
+                block = slice(start, min(start + chunk, len(folded)))
+                field = self.__kernel(folded[block], integration_method, max_memory, workers, executor, tolerance,
+                                      backend)
+                index = order[bounds[n]:bounds[n + 1]]
+                results[index] = field[inverse[index] - start] * signs[index]
+                yield index, results[index] * I * MU0_PRIME
+        else:
+            for start in range(0, len(points), chunk):
+                block = slice(start, min(start + chunk, len(points)))
+                results[block] = self.__integrate(points[block], integration_method, max_memory, workers,
+                                                  executor, tolerance, backend)
+                yield block, results[block] * I * MU0_PRIME
+
+        if cache is not None:
+            cache.put(key, results)
+        self.__remember(key, results)
+
+    @staticmethod
+    def __withPoints(pointsList, results, invertPAxis):
+        '''
+            Concatenates the points in the format [[x1,y1,z1],...] and their fields in the output format of biotSavart3d.
+        '''
         # Returns the lists to the default orientation and concatenates the
         # new data to each position.
         results = moveaxis(results, 0, 1)
@@ -238,6 +716,71 @@ class Coil:
             returnal = moveaxis(returnal, 0, 1)
         return returnal
 
+    def axisymmetricField(self, pointsList:ndarray, integration_method='Simpson', I:float = 1, invertPAxis:bool=False,
+                          *, center=None, n_r:int = AXISYMMETRIC_NODES, n_z:int = AXISYMMETRIC_NODES, n_phi:int = 4,
+                          max_memory:int = DEFAULT_MAX_MEMORY, workers:int = None, executor = None,
+                          backend:str = 'auto', cache = None):
+        '''
+            Calculates the magnetic fields for an array of points assuming the coil is symmetric around an
+            axis parallel to z, such as a solenoid. The field is evaluated on a (rho, z) grid placed on n_phi
+            half-planes around the axis, averaged in cylindrical components and interpolated back to every
+            point, so the cost depends on n_phi * n_r * n_z rather than on the number of points.
+
+            The RMS deviation of the half-planes from their average, relative to the RMS averaged field,
+            is stored in asymmetry. A large value means the coil is not close enough to symmetric
+            for the result to be trusted. A few of the points are also calculated directly and their
+            deviation is stored in axisymmetricError, with a RuntimeWarning above AXISYMMETRIC_TOLERANCE,
+            which also catches a grid too coarse for the coil.
+
+            :param pointsList numpy.ndarray: the array of points to check for the magnetic field.
+            :param integration_method str: (optional) any method accepted by biotSavart3d.
+            :param I float: (optional) the current going through the coil, in Amperes.
+            :param invertPAxis bool: (optional) same as in biotSavart3d.
+            :param center list: (optional) the (x, y) position of the axis, the default is the center of
+            the bounding box of the coil path.
+            :param n_r int: (optional) the number of radial nodes of the grid.
+            :param n_z int: (optional) the number of axial nodes of the grid.
+            :param n_phi int: (optional) the number of half-planes, at least one.
+            :param max_memory int: (optional) same as in biotSavart3d.
+            :param workers int: (optional) same as in biotSavart3d.
+            :param executor concurrent.futures.Executor: (optional) same as in biotSavart3d.
+            :param backend str: (optional) same as in biotSavart3d.
+            :param cache electromagnetism.cache.FieldCache: (optional) same as in biotSavart3d.
+
+            :returns numpy.ndarray: the points and their magnetic fields, in the same format as biotSavart3d.
+
+            :raises ValueError: if the grid has fewer than two nodes along an axis or n_phi is not positive.
+        '''
+        if n_r < 2 or n_z < 2:
+            raise ValueError('The (rho, z) grid needs at least two nodes along each axis')
+        if n_phi < 1:
+            raise ValueError('At least one half-plane is needed')
+
+        if invertPAxis:
+            pointsList = moveaxis(pointsList, 0, 1)
+        points = np.asarray(pointsList, dtype=float).reshape(-1, 3)
+        if center is None:
+            low, high = self.bounds()
+            center = 0.5 * (low[:2] + high[:2])
+
+        rhoAxis, zAxis = gridAxes(points, center, n_r, n_z)
+        samples = self._dimensionlessField(halfPlanePoints(rhoAxis, zAxis, center, n_phi), integration_method,
+                                           max_memory, workers, executor, backend=backend, cache=cache)
+        grid, self._asymmetry = cylindricalAverage(samples, n_phi, n_r, n_z)
+
+        results = interpolateField(rhoAxis, zAxis, grid, points, center)
+
+        # The points checked are drawn at random, a stride could follow the pattern of a grid.
+        probes = np.random.default_rng(0).choice(len(points), min(len(points), AXISYMMETRIC_PROBES), replace=False)
+        direct = self.__kernel(points[probes], integration_method, max_memory, backend=backend)
+        scale = np.sqrt(np.mean(np.sum(direct ** 2, axis=1))) if len(probes) else 0.0
+        deviation = np.sqrt(np.mean(np.sum((results[probes] - direct) ** 2, axis=1))) if len(probes) else 0.0
+        self._axisymmetricError = float(deviation / scale) if scale > 0 else 0.0
+        if self._axisymmetricError > AXISYMMETRIC_TOLERANCE:
+            warnings.warn(f"The axisymmetric field deviates by {self._axisymmetricError:.2%} from the direct field, "
+                          "see axisymmetricError", RuntimeWarning)
+        return self.__withPoints(points, results * I * MU0_PRIME, invertPAxis)
+
     def dissipationPotency (self, I):
         '''
             Calculates the dissipated potency of the coil
@@ -250,31 +793,235 @@ class Coil:
         dissipationPotency = self._resistance * I**2
         return dissipationPotency
 
+    def simplify(self, tolerance:float, pointsList:ndarray, invertPAxis:bool=False, *,
+                 max_memory:int = DEFAULT_MAX_MEMORY, workers:int = None, executor = None, backend:str = 'auto'):
+        '''
+            Builds a coil with as few vertices as the field at some points allows. The vertices are ranked
+            once by how far the path moves when they are removed, see pathImportance, so the vertices of
+            tight bends are the last to go and the ones of straight runs the first, and the smallest set of
+            top ranked vertices keeping the field within the tolerance is found by bisection.
+
+            Every candidate is evaluated with the 'Analytic' method, the only one that does not assume
+            evenly spaced vertices, and compared with the field of the whole path by the same method.
+            The error of the returned coil is the measured one, not an estimate.
+
+            :param tolerance float: the largest difference allowed between the fields at any point, relative
+            to the strongest field at the points.
+            :param pointsList numpy.ndarray: the points the field is kept at, which should not lie on the coil.
+            :param invertPAxis bool: (optional) same as in biotSavart3d.
+            :param max_memory int: (optional) same as in biotSavart3d.
+            :param workers int: (optional) same as in biotSavart3d.
+            :param executor concurrent.futures.Executor: (optional) same as in biotSavart3d.
+            :param backend str: (optional) same as in biotSavart3d.
+
+            :returns tuple: the simplified coil, with the same wire, and a report with the number of
+            vertices before and after, the largest distance between the removed vertices and the new path,
+            the largest and the RMS relative errors at the points and the number of candidates evaluated.
+
+            :raises ValueError: if the tolerance is not positive or there are no points.
+        '''
+        if tolerance <= 0:
+            raise ValueError("The tolerance must be positive")
+        if invertPAxis:
+            pointsList = moveaxis(pointsList, 0, 1)
+        points = np.asarray(pointsList, dtype=float).reshape(-1, 3)
+        if len(points) == 0:
+            raise ValueError("The field must be kept at one point at least")
+
+        reference = self._dimensionlessField(points, 'Analytic', max_memory, workers, executor, backend=backend)
+        scale = max(float(norm(reference, axis=1).max()), np.finfo(float).tiny)
+        importance = pathImportance(self.coilPath)
+        distances = np.unique(importance[np.isfinite(importance)])
+
+        def errors(distance):
+            kept = np.flatnonzero(importance > distance)
+            field = parallelBiotSavart(PreparedPath.fromPath(self.coilPath[kept], 'Analytic'), points, 'Analytic',
+                                       max_memory, workers=workers, executor=executor, backend=backend)
+            difference = norm(field - reference, axis=1) / scale
+            return kept, float(difference.max()), float(np.sqrt(np.mean(difference**2)))
+
+        # Removing no vertex at all is exact, the bisection looks for the last distance within the tolerance.
+        best = (np.arange(len(self.coilPath)), 0.0, 0.0), 0.0
+        low, high, evaluations = -1, len(distances), 0
+        while high - low > 1:
+            middle = (low + high) // 2
+            candidate = errors(distances[middle])
+            evaluations += 1
+            if candidate[1] <= tolerance:
+                low, best = middle, (candidate, distances[middle])
+            else:
+                high = middle
+
+        (kept, maxError, rmsError), distance = best
+        coil = Coil(self.coilPath[kept], True, crossSectionalArea=self.crossSectionalArea,
+                    resistivity=self.resistivity)
+        report = {'original_vertices': len(self.coilPath), 'vertices': len(kept), 'distance': float(distance),
+                  'max_error': maxError, 'rms_error': rmsError, 'evaluations': evaluations}
+        return coil, report
+
+    def resample(self, max_seg_len:float):
+        '''
+            Builds a coil with the same path split into segments no longer than max_seg_len. Every vertex is
+            kept and each segment is split into equal parts, so the shape does not change, which brings a
+            simplified path back to the nearly even steps the 'Riemann' and 'Simpson' methods assume.
+
+            :param max_seg_len float: the largest length of a segment, in meters.
+
+            :returns Coil: the resampled coil, with the same wire.
+
+            :raises ValueError: if max_seg_len is not positive.
+        '''
+        if max_seg_len <= 0:
+            raise ValueError("The length of the segments must be positive")
+        path = self.coilPath
+        lengths = norm(path[1:] - path[:-1], axis=1)
+        pieces = np.maximum(np.ceil(lengths / max_seg_len).astype(int), 1)
+        segment = np.repeat(np.arange(len(lengths)), pieces)
+        fraction = (np.arange(pieces.sum()) - np.repeat(np.cumsum(pieces) - pieces, pieces)) / pieces[segment]
+        points = path[segment] + fraction[:, newaxis] * (path[segment + 1] - path[segment])
+        return Coil(concatenate((points, path[len(path) - 1:])), True, crossSectionalArea=self.crossSectionalArea,
+                    resistivity=self.resistivity)
+
+
+    def cloudGrid(self, padding, n = 10):
+        '''
+            Builds the grid of points used by cloud, the bounding box of the coil grown by padding.
+
+            :param padding float: the distance the grid goes beyond the coil along each axis.
+            :param n int: (optional) the number of points along each axis.
 
-    def cloud(self, padding,n = 10,i = 1, integration_method='Simpson', plane_axis=None, plane_value='mid', plane_thickness=0.0, show=False):
-        x = np.linspace(self.coilPath[:,0].min()-padding, self.coilPath[:,0].max()+padding,n)
-        y = np.linspace(self.coilPath[:,1].min()-padding, self.coilPath[:,1].max()+padding,n)
-        z = np.linspace(self.coilPath[:,2].min()-padding, self.coilPath[:,2].max()+padding,n)
+            :returns tuple: the points, in the format [[x1,y1,z1],...], and the x, y and z axes of the grid.
+        '''
+        low, high = self.bounds()
+        x = np.linspace(low[0]-padding, high[0]+padding,n)
+        y = np.linspace(low[1]-padding, high[1]+padding,n)
+        z = np.linspace(low[2]-padding, high[2]+padding,n)
  
         xx,yy, zz = np.meshgrid(x,y,z)
         space = np.zeros((x.shape[0] * y.shape[0] * z.shape[0], 3))
         space[:, 0] = xx.flatten()
         space[:, 1] = yy.flatten()
         space[:, 2] = zz.flatten()
- 
-        b = self.biotSavart3d(space,integration_method=integration_method, I= i)
-        b_t = np.linalg.norm((b[3],b[4],b[5]), axis=0)
-        b = np.concatenate((b,[b_t]))
-    
+        return space, (x, y, z)
+
+    def planeGrid(self, padding, plane_axis, plane_value='mid', n = 100):
+        '''
+            Builds a grid of points on a plane normal to an axis, spanning the same box as cloudGrid.
+
+            :param padding float: the distance the grid goes beyond the coil along each axis.
+            :param plane_axis str: 'x', 'y' or 'z', the axis normal to the plane.
+            :param plane_value float|str: (optional) the position of the plane, 'mid' is the middle of the box.
+            :param n int: (optional) the number of points along each direction of the plane.
+
+            :returns tuple: the points, in the format [[x1,y1,z1],...], ordered so that reshaping them to
+            (n, n) gives rows along the second in-plane axis, the two in-plane axes, and the position of the plane.
+
+            :raises ValueError: if the axis is not 'x', 'y' or 'z'.
+        '''
+        if str(plane_axis).lower() not in PLANE_AXES:
+            raise ValueError("The plane axis must be 'x', 'y' or 'z'")
+        normal = PLANE_AXES[str(plane_axis).lower()]
+        inPlane = [axis for axis in range(3) if axis != normal]
+        low, high = self.bounds()
+        low, high = low - padding, high + padding
+        value = 0.5 * (low[normal] + high[normal]) if plane_value == 'mid' else float(plane_value)
+
+        u = np.linspace(low[inPlane[0]], high[inPlane[0]], n)
+        v = np.linspace(low[inPlane[1]], high[inPlane[1]], n)
+        uu, vv = np.meshgrid(u, v)
+        plane = np.full((uu.size, 3), value)
+        plane[:, inPlane[0]] = uu.ravel()
+        plane[:, inPlane[1]] = vv.ravel()
+        return plane, (u, v), value
+
+    @staticmethod
+    def sliceFigure(b_t, axes, plane_axis, plane_value, style='heatmap'):
+        '''
+            Draws the field modulus on a plane as a heatmap or as contour lines.
+
+            :param b_t numpy.ndarray: the modulus of the magnetic field at each point of planeGrid.
+            :param axes tuple: the two in-plane axes, as returned by planeGrid.
+            :param plane_axis str: 'x', 'y' or 'z', the axis normal to the plane.
+            :param plane_value float: the position of the plane.
+            :param style str: (optional) 'heatmap' or 'contour'.
+
+            :returns plotly.graph_objects.Figure: the figure.
+
+            :raises ValueError: if the style is unknown.
+        '''
+        u, v = axes
+        labels = [name for name in 'xyz' if name != str(plane_axis).lower()]
+        b_t = np.reshape(b_t, (len(v), len(u)))
+        if style == 'heatmap':
+            trace = go.Heatmap(x=u, y=v, z=b_t, colorscale="Plasma", colorbar=dict(title="|B|"))
+        elif style == 'contour':
+            trace = go.Contour(x=u, y=v, z=b_t, colorscale="Plasma", colorbar=dict(title="|B|"))
+        else:
+            raise ValueError("The style must be 'heatmap' or 'contour'")
+
+        fig = go.Figure(trace)
+        fig.update_layout(
+            xaxis_title=labels[0],
+            yaxis_title=labels[1],
+            yaxis=dict(scaleanchor="x", scaleratio=1),
+            margin=dict(l=0, r=0, b=0, t=30),
+            title=f"Magnetic field on {str(plane_axis).lower()} = {plane_value:.3g}"
+        )
+        return fig
+
+    def slice(self, padding, plane_axis, plane_value='mid', n = 100, i = 1, integration_method='Simpson',
+              style='heatmap', show=False, *, max_memory=DEFAULT_MAX_MEMORY, workers=None, executor=None,
+              tolerance=None, backend='auto', cache=None):
+        '''
+            Calculates the magnetic field on a plane only, at the resolution of an image, which costs n times less
+            than a cloud as fine. See planeGrid and sliceFigure for the plane options, and biotSavart3d for the others.
+
+            :returns tuple: the figure, the points and fields in the format [[X],[Y],[Z],[Bx],[By],[Bz],[|B|]],
+            and the points.
+        '''
+        plane, axes, value = self.planeGrid(padding, plane_axis, plane_value, n)
+        b = self.biotSavart3d(plane, integration_method=integration_method, I=i, max_memory=max_memory,
+                              workers=workers, executor=executor, tolerance=tolerance, backend=backend, cache=cache)
+        b_t = np.linalg.norm(b[3:6], axis=0)
+        b = np.concatenate((b, [b_t]))
+        fig = self.sliceFigure(b_t, axes, plane_axis, value, style)
+
+        if show:
+            fig.show()
+
+        return fig, b, plane
+
+    @staticmethod
+    def cloudFigure(space, b_t, axes, plane_axis=None, plane_value='mid', plane_thickness=0.0,
+                    max_markers=DEFAULT_MARKER_BUDGET):
+        '''
+            Draws the field modulus of a cloud, optionally highlighting the points close to a plane.
+            Clouds with more points than max_markers are thinned, keeping a regular grid when they are one, see
+            decimation.binCloud.
+
+            :param space numpy.ndarray: the points of the grid, as returned by cloudGrid.
+            :param b_t numpy.ndarray: the modulus of the magnetic field at each point.
+            :param axes tuple: the x, y and z axes of the grid, as returned by cloudGrid.
+            :param plane_axis str: (optional) 'x', 'y' or 'z', the axis normal to the highlighted plane.
+            :param plane_value float|str: (optional) the position of the plane, 'mid' is the middle of the grid.
+            :param plane_thickness float: (optional) the width of the highlighted band, 0 is one grid step.
+            :param max_markers int: (optional) the largest number of markers of each trace, None draws every point.
+
+            :returns plotly.graph_objects.Figure: the figure.
+        '''
+        def markers(points, values):
+            return (points, values) if max_markers is None else binCloud(points, values, max_markers)
+
         fig = go.Figure()
+        markerSpace, markerB = markers(space, b_t)
         fig.add_trace(go.Scatter3d(
-        x=space[:, 0],
-        y=space[:, 1],
-        z=space[:, 2],
+        x=markerSpace[:, 0],
+        y=markerSpace[:, 1],
+        z=markerSpace[:, 2],
         mode="markers",
         marker=dict(
             size=5,                    # marcador pequeno
-            color=b_t,             # |B|
+            color=markerB,             # |B|
             colorscale="Plasma",         # escolha a que você gostar
             opacity=0.5,                # bem transparente (volume todo)
             colorbar=dict(title="|B|"),  # barra de cores
@@ -299,6 +1046,7 @@ class Coil:
                 # espessura da faixa em torno do plano
                 if plane_thickness <= 0.0:
                     # usa 1 passo da malha naquele eixo
+                    x, y, z = axes
                     if plane_axis.lower() == 'x':
                         dz = x[1] - x[0]
                     elif plane_axis.lower() == 'y':
@@ -312,14 +1060,15 @@ class Coil:
                 mask = np.abs(coord - val) <= plane_thickness_eff / 2.0
 
                 if mask.any():
+                    planeSpace, planeB = markers(space[mask], b_t[mask])
                     fig.add_trace(go.Scatter3d(
-                        x=space[mask, 0],
-                        y=space[mask, 1],
-                        z=space[mask, 2],
+                        x=planeSpace[:, 0],
+                        y=planeSpace[:, 1],
+                        z=planeSpace[:, 2],
                         mode="markers",
                         marker=dict(
                             size=4,              # maior
-                            color=b_t[mask],
+                            color=planeB,
                             colorscale="Plasma",
                             opacity=0.9          # bem visível
                         ),
@@ -336,14 +1085,62 @@ class Coil:
             title="Magnetic field cloud"
         )
 
+        return fig
+
+    def cloud(self, padding,n = 10,i = 1, integration_method='Simpson', plane_axis=None, plane_value='mid', plane_thickness=0.0, show=False,
+              *, max_memory=DEFAULT_MAX_MEMORY, workers=None, executor=None, tolerance=None, axisymmetric=False,
+              backend='auto', cache=None, refinement=None, max_depth=3, slice_only=False,
+              max_markers=DEFAULT_MARKER_BUDGET):
+        if slice_only:
+            # Only the highlighted plane is calculated, with n points along each of its directions.
+            if plane_axis is None:
+                raise ValueError("A slice needs a plane_axis")
+            return self.slice(padding, plane_axis, plane_value, n, i, integration_method, show=show,
+                              max_memory=max_memory, workers=workers, executor=executor, tolerance=tolerance,
+                              backend=backend, cache=cache)
+        space, axes = self.cloudGrid(padding, n)
+
+        if refinement is not None:
+            # The uniform grid is the coarsest level, its cells are split where the field is poorly sampled.
+            def field(points):
+                return self._dimensionlessField(points, integration_method, max_memory, workers, executor,
+                                                tolerance, backend, cache)
+            space, integral, _, _ = adaptiveGrid(field, [axis[0] for axis in axes], [axis[-1] for axis in axes],
+                                                 max(n, 2), refinement, max_depth)
+            b = self.__withPoints(space, integral * i * MU0_PRIME, False)
+        elif axisymmetric:
+            # The (rho, z) grid resolves the coil however coarse the cloud is, and is finer for finer clouds.
+            b = self.axisymmetricField(space, integration_method=integration_method, I=i,
+                                       n_r=max(n, AXISYMMETRIC_NODES), n_z=max(n, AXISYMMETRIC_NODES),
+                                       max_memory=max_memory, workers=workers, executor=executor,
+                                       backend=backend, cache=cache)
+        else:
+            b = self.biotSavart3d(space,integration_method=integration_method, I= i, max_memory=max_memory,
+                                  workers=workers, executor=executor, tolerance=tolerance, backend=backend,
+                                  cache=cache)
+        b_t = np.linalg.norm((b[3],b[4],b[5]), axis=0)
+        b = np.concatenate((b,[b_t]))
+        fig = self.cloudFigure(space, b_t, axes, plane_axis, plane_value, plane_thickness, max_markers)
+
         if show:
             fig.show()
         
         return fig, b, space
 
-    def plot(self, show=False):
-       
+    def plot(self, show=False, resolution=DEFAULT_RESOLUTION):
+        '''
+            Draws the path of the coil. The vertices that would move the line by less than a pixel on a figure
+            of the given resolution are left out, see decimation.simplifyPath.
+
+            :param show bool: (optional) whether the figure is opened.
+            :param resolution int: (optional) the width, in pixels, the path is simplified for, None draws
+            every vertex.
+
+            :returns plotly.graph_objects.Figure: the figure.
+        '''
         pts = self.coilPath  # (N, 3)
+        if resolution is not None:
+            pts = pts[simplifyPath(pts, screenTolerance(pts, resolution))]
         x, y, z = pts[:, 0], pts[:, 1], pts[:, 2]
 
         copper_metallic = [
@@ -383,6 +1180,12 @@ class Coil:
         return fig
     
 class Solenoid(Coil):
+    """Solenoid class.
+    A Coil whose path is an helicoid around the z axis. With the 'Model' integration method its
+    field is calculated from closed-form circular loops, one per turn, plus a correction for the pitch.
+    The model is accurate far from the winding and inside it, close to the axis, but it deviates by
+    up to about ten percent next to the wires, see modelError. Its cost grows with turns times points,
+    as the path with one segment per turn would."""
     def __init__(self, n_turns: int, z_initial_point: float, z_final_point: float, radius: float, max_seg_len: float,
                  *, crossSectionalArea: float = 1.0, resistivity: float = 1.7e-8,invertRAxis: bool = False):
 
@@ -399,15 +1202,50 @@ class Solenoid(Coil):
         self.max_seg_len = max_seg_len
         self._resistivity = resistivity
         self._crossSectionalArea = crossSectionalArea
-        self.coilPath = np.array(helicoid(self.n_turns, [0,0,self.z_initial_point], self.z_initial_point + self.z_final_point, self.radius, self.max_seg_len))
+        self._zStart = self.z_initial_point
+        self._zLength = self.z_initial_point + self.z_final_point
+        self.coilPath = np.array(helicoid(self.n_turns, [0,0,self._zStart], self._zLength, self.radius, self.max_seg_len))
  
  
         super().__init__(self.coilPath, invertRAxis=invertRAxis, crossSectionalArea=crossSectionalArea, resistivity=resistivity)
 
+    def _modelIntegral(self, points:ndarray, max_memory:int = DEFAULT_MAX_MEMORY):
+        '''
+            Calculates the Biot-Savart integral of the ideal helicoid for the points in the format [[x1,y1,z1],...].
+            Each turn, closed by a straight return to its starting point, becomes a circular loop tilted by the
+            pitch so that it keeps the dipole moment of the closed turn. Undoing the returns adds up to a single
+            straight filament along the line where every turn starts. The error of the model grows with
+            pitch / (pi * radius) close to the winding, where it is largest, and vanishes far away from it.
+            It is measured against the path by the first calculation, see modelError.
+        '''
+        pitch = self._zLength / self.n_turns
+        zCenters = self._zStart + (np.arange(self.n_turns) + 0.5) * pitch
+        centers = np.column_stack((np.zeros(self.n_turns), np.zeros(self.n_turns), zCenters))
+
+        # Rotation about y that takes the normal of the tilted loops, (pitch / (pi radius), 0, 1), to z.
+        tilt = np.arctan(pitch / (np.pi * self.radius))
+        rotation = np.array([[np.cos(tilt), 0, -np.sin(tilt)],
+                             [0, 1, 0],
+                             [np.sin(tilt), 0, np.cos(tilt)]])
+
+        # geometry.arc sweeps clockwise when seen from +z.
+        integ = loopField(points @ rotation.T, centers @ rotation.T, self.radius, sense=-1,
+                          max_memory=max_memory) @ rotation
+
+        start = np.array([0, self.radius, self._zStart])
+        integ += segmentField(points, start, start + [0, 0, self._zLength], max_memory)
+        return integ
+
 class Racetrack(Coil):
-    
+    """Racetrack class.
+    A Coil whose path is a winding pack of racetrack turns. With the 'Model' integration method its
+    field is calculated from the exact circular arcs and straight sides of every turn, without the
+    steps from one turn to the next, which makes it differ from the path close to them, see modelError.
+    With symmetric=True the mirror planes the field of the path obeys are declared, see mirrorPlanes."""
+
     def __init__(self, center, inwidth: float, inlength: float, max_seg_len: float, int_radius: float, thickness: float,
-                 *, crossSectionalArea: float = 1.0, resistivity: float = 1.7e-8,invertRAxis: bool = False):
+                 height: float = 0, *, crossSectionalArea: float = 1.0, resistivity: float = 1.7e-8,invertRAxis: bool = False,
+                 symmetric: bool = False):
         if int_radius <= 0:
             raise ValueError("Invalid parameters.")
         if max_seg_len <= 0:
@@ -419,10 +1257,207 @@ class Racetrack(Coil):
         self.max_seg_len = max_seg_len
         self.int_radius = int_radius
         self.thickness = thickness
+        self.height = height
         self._resistivity = resistivity
         self._crossSectionalArea = crossSectionalArea
         self.coilPath = np.array(racetrack3d(self.center, self.inwidth, self.inlength, self.max_seg_len,
-                                             self.int_radius, self.thickness))
+                                             self.int_radius, self.thickness, self.height))
         
         super().__init__(self.coilPath, invertRAxis=invertRAxis, crossSectionalArea=crossSectionalArea, resistivity=resistivity)
-    
\ No newline at end of file
+        if symmetric:
+            self.mirrorPlanes()
+
+    def mirrorPlanes(self):
+        '''
+            Looks for mirror planes through the center of the winding pack, halfway up its layers, and declares
+            the ones the field of the path obeys within SYMMETRY_TOLERANCE, see detectSymmetry. The steps from
+            one turn, or layer, to the next and the gap the path leaves where each turn closes break the planes
+            perpendicular to x and y, and the steps between layers the one perpendicular to z, so usually only
+            the plane of a single layer is found.
+
+            :returns tuple: the mirrors, as (axis, position, parity) tuples.
+        '''
+        center = np.array(self.center, dtype=float)
+        nLayers = int(self.height / self.max_seg_len)
+        if nLayers > 1:
+            center[2] += (nLayers - 1) * self.max_seg_len / 2
+        return self.detectSymmetry(center, SYMMETRY_TOLERANCE)
+
+    def turnParameters(self):
+        '''
+            Returns the parameters of every turn in the order they are wound, following geometry.racetrack3d.
+
+            :returns numpy.ndarray: an array in the format [[x, y, z, width, length, radius],...], (x, y, z)
+            being the center of the turn.
+        '''
+        nTurns = int(self.thickness / self.max_seg_len)
+        if self.height == 0:
+            zLayers = np.array([self.center[2]], dtype=float)
+        else:
+            zLayers = self.center[2] + np.arange(int(self.height / self.max_seg_len)) * self.max_seg_len
+        steps = self.max_seg_len * np.arange(nTurns)
+
+        turns = np.empty((len(zLayers), nTurns, 6))
+        turns[:, :, 0] = self.center[0]
+        turns[:, :, 1] = self.center[1]
+        turns[:, :, 2] = zLayers[:, np.newaxis]
+        turns[:, :, 3] = self.inwidth + steps
+        turns[:, :, 4] = self.inlength + steps
+        turns[:, :, 5] = self.int_radius + steps
+        return turns.reshape(-1, 6)
+
+    def _modelIntegral(self, points:ndarray, max_memory:int = DEFAULT_MAX_MEMORY):
+        '''
+            Calculates the Biot-Savart integral of the ideal winding pack for the points in the format
+            [[x1,y1,z1],...]. The arcs of each turn are integrated on the exact circles, its sides and the
+            steps between consecutive turns with the closed form of straight segments.
+        '''
+        turns = self.turnParameters()
+        center, width, length, radius = turns[:, :3], turns[:, 3], turns[:, 4], turns[:, 5]
+
+        # The corners in the same order as geometry.race_track, each one swept clockwise over pi/2.
+        signs = np.array([[1, 1], [1, -1], [-1, -1], [-1, 1]])
+        startAngles = np.array([0, np.pi / 2, np.pi, 3 * np.pi / 2])
+        arcCenters = np.repeat(center[:, np.newaxis, :], 4, axis=1)
+        arcCenters[:, :, 0] += 0.5 * width[:, np.newaxis] * signs[:, 0]
+        arcCenters[:, :, 1] += 0.5 * length[:, np.newaxis] * signs[:, 1]
+        arcRadii = np.repeat(radius, 4)
+        positions, moments = arcElements(arcCenters.reshape(-1, 3), arcRadii, np.tile(startAngles, len(turns)), np.pi / 2)
+
+        def onArc(angles):
+            offsets = np.stack((np.sin(angles), np.cos(angles), np.zeros_like(angles)), axis=-1)
+            return arcCenters + radius[:, np.newaxis, np.newaxis] * offsets
+
+        arcStarts = onArc(startAngles)
+        arcEnds = onArc(startAngles + np.pi / 2)
+        lineStarts = arcEnds.reshape(-1, 3)
+        lineEnds = np.roll(arcStarts, -1, axis=1).reshape(-1, 3)
+
+        # Each turn closes at the start of its first arc and steps to the start of the next turn.
+        stepStarts = arcStarts[:-1, 0]
+        stepEnds = arcStarts[1:, 0]
+
+        integ = elementField(points, positions, moments, max_memory=max_memory)
+        integ += segmentField(points, np.concatenate((lineStarts, stepStarts)),
+                              np.concatenate((lineEnds, stepEnds)), max_memory)
+        return integ
+
+
+class LazyRacetrack(Racetrack):
+    """LazyRacetrack class.
+    A Racetrack that keeps only the parameters of its winding pack. The turns are generated one at a
+    time, see geometry.racetrack_turns, and integrated as soon as they are generated, so the memory
+    needed does not go beyond a single turn however large the pack is. The field is the one of the
+    Racetrack with the same parameters, for every integration method.
+
+    The whole path is only built when coilPath is read, for instance to plot or export it. The octree
+    of the tolerance option needs the whole path and is not available."""
+
+    def __init__(self, center, inwidth: float, inlength: float, max_seg_len: float, int_radius: float, thickness: float,
+                 height: float = 0, *, crossSectionalArea: float = 1.0, resistivity: float = 1.7e-8,
+                 symmetric: bool = False):
+        if int_radius <= 0 or max_seg_len <= 0:
+            raise ValueError("Invalid parameters.")
+        if thickness < max_seg_len or (height != 0 and height < max_seg_len):
+            raise ValueError("The thickness and the height must hold at least one turn and one layer")
+        if crossSectionalArea is None:
+            raise ValueError('Insert a valid cross sectional area')
+
+        self.center = center
+        self.inwidth = inwidth
+        self.inlength = inlength
+        self.max_seg_len = max_seg_len
+        self.int_radius = int_radius
+        self.thickness = thickness
+        self.height = height
+        self._resistivity = resistivity
+        self._crossSectionalArea = crossSectionalArea
+        self._coilPath = None
+        self._pathFile = None
+        self._prepared = {}
+        self._unitFields = OrderedDict()
+        self._symmetryError = None
+        self._treeError = None
+        self._asymmetry = None
+        self._axisymmetricError = None
+        self._length, self._bounds = self.__measure()
+        self._resistance = self._length * self._resistivity / self._crossSectionalArea
+        self.symmetry = None
+        if symmetric:
+            self.mirrorPlanes()
+
+    @property
+    def coilPath(self):
+        '''
+            Builds the whole path, in the format [[x1,y1,z1],...], which takes the memory of every turn.
+            The array is read-only and is not kept by the coil.
+        '''
+        path = racetrack3d(self.center, self.inwidth, self.inlength, self.max_seg_len, self.int_radius,
+                           self.thickness, self.height)
+        path.flags.writeable = False
+        return path
+
+    def turns(self):
+        '''
+            Generates the path of each turn in the order they are wound, see geometry.racetrack_turns.
+
+            :returns generator: the turns, in the format [[x1,y1,z1],...].
+        '''
+        return racetrack_turns(self.center, self.inwidth, self.inlength, self.max_seg_len, self.int_radius,
+                               self.thickness, self.height)
+
+    def __measure(self):
+        '''
+            Walks through the turns once, adding up the length of the path and growing its bounding box.
+        '''
+        length, previous = 0.0, None
+        low, high = np.full(3, np.inf), np.full(3, -np.inf)
+        for turn in self.turns():
+            steps = turn[1:] - turn[:-1] if previous is None else np.diff(turn, axis=0, prepend=previous[np.newaxis])
+            length += np.sum(norm(steps, axis=1))
+            low, high = np.minimum(low, turn.min(axis=0)), np.maximum(high, turn.max(axis=0))
+            previous = turn[-1]
+        return length, (low, high)
+
+    def bounds(self):
+        '''
+            Returns the lowest and the highest corners of the bounding box of the path, measured once
+            when the coil was created.
+        '''
+        return self._bounds
+
+    def prepared(self, integration_method:str = 'Simpson'):
+        '''
+            A lazy coil has no prepared path, its turns are prepared one at a time while integrating.
+
+            :raises ValueError: always.
+        '''
+        raise ValueError("A LazyRacetrack prepares its turns one at a time, the whole prepared path and the "
+                         "tolerance option are only available for a Racetrack")
+
+    def _integral(self, points, integration_method, max_memory = DEFAULT_MAX_MEMORY, workers = None, executor = None,
+                  backend = 'auto'):
+        '''
+            Adds up the dimensionless fields of the turns, each one prepared and integrated as it is generated,
+            see biot_savart.preparedChunks. A single process pool is shared by every turn.
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        results = np.zeros((len(points), 3))
+        ownExecutor = executor is None and resolveWorkers(workers) > 1
+        if ownExecutor:
+            executor = ProcessPoolExecutor(max_workers=resolveWorkers(workers))
+        try:
+            for prepared in preparedChunks(self.turns(), integration_method):
+                results += parallelBiotSavart(prepared, points, integration_method, max_memory, workers=workers,
+                                              executor=executor, backend=backend)
+        finally:
+            if ownExecutor:
+                executor.shutdown(cancel_futures=True)
+        return results
+
+    def _pathKey(self):
+        '''
+            Returns the parameters of the winding pack, which identify its path.
+        '''
+        return (tuple(float(value) for value in self.center), float(self.inwidth), float(self.inlength),
+                float(self.max_seg_len), float(self.int_radius), float(self.thickness), float(self.height))
@@ -0,0 +1,158 @@
+"""Parallel Module.
+
+This module shards field evaluations across processes. The prepared segment
+data of the coil path, the evaluation points and the output buffer are placed
+in shared memory, so each worker only receives the names of the blocks and the
+slice of points it is responsible for, instead of a pickled copy of the arrays.
+
+Each point is integrated independently, so the results are deterministic and
+identical to the serial evaluation regardless of the number of workers.
+"""
+import os
+from concurrent.futures import Executor, ProcessPoolExecutor
+from multiprocessing.shared_memory import SharedMemory
+
+import numpy as np
+
+from .mathematics.biot_savart import PreparedPath, DEFAULT_MAX_MEMORY
+from .mathematics.compiled import resolveBackend, limitThreads
+
+# Number of shards submitted per worker, so that slow shards do not stall the pool.
+SHARDS_PER_WORKER = 4
+
+
+def resolveWorkers(workers):
+    '''
+        Converts the workers option into a number of processes.
+
+        :param workers int: the requested number of workers. None or 1 means serial execution
+        and any value lower than 1 means one worker per available core.
+
+        :returns int: the number of processes to be used.
+    '''
+    if workers is None:
+        return 1
+    workers = int(workers)
+    if workers < 1:
+        return os.cpu_count() or 1
+    return workers
+
+
+def _share(array: np.ndarray):
+    '''
+        Copies an array into a new shared memory block.
+
+        :returns tuple: the shared memory block and the spec (name, shape, dtype) used to attach to it.
+    '''
+    array = np.ascontiguousarray(array)
+    shm = SharedMemory(create=True, size=max(array.nbytes, 1))
+    np.ndarray(array.shape, dtype=array.dtype, buffer=shm.buf)[...] = array
+    return shm, (shm.name, array.shape, array.dtype.str)
+
+
+def _attach(spec):
+    '''
+        Attaches to a shared memory block created by the parent process.
+
+        :returns tuple: the shared memory block and an array view over it.
+    '''
+    name, shape, dtype = spec
+    # Workers share the resource tracker of the parent, which stays the only one unlinking the block.
+    shm = SharedMemory(name=name)
+    return shm, np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+
+def _evaluateShard(preparedSpec, pointsSpec, outputSpec, start, stop, max_memory, backend):
+    '''
+        Worker entry point: integrates points[start:stop] and writes them to the shared output.
+    '''
+    integration_method, arraySpecs, factor, epsilon = preparedSpec
+    if backend == 'numba':
+        # The pool already runs one process per core, each shard must stay on a single thread.
+        limitThreads(1)
+    specs = [spec for spec in arraySpecs if spec is not None] + [pointsSpec, outputSpec]
+    blocks, views = zip(*[_attach(spec) for spec in specs])
+    *arrays, points, output = views
+    if arraySpecs[2] is None:
+        arrays.append(None)
+    try:
+        prepared = PreparedPath(integration_method, *arrays, factor, epsilon)
+        output[start:stop] = prepared.integrate(points[start:stop], max_memory, backend)
+    finally:
+        # The views must be released before the blocks can be closed.
+        prepared = None
+        del views, arrays, points, output
+        for shm in blocks:
+            shm.close()
+
+
+def shardBounds(nPoints: int, nShards: int):
+    '''
+        Splits nPoints into contiguous and ordered shards.
+
+        :returns list: a list of (start, stop) tuples covering every point.
+    '''
+    nShards = max(1, min(nShards, nPoints))
+    edges = np.linspace(0, nPoints, nShards + 1).astype(int)
+    return [(int(a), int(b)) for a, b in zip(edges[:-1], edges[1:]) if b > a]
+
+
+def parallelBiotSavart(coilPath, points: np.ndarray, integration_method: str = 'Simpson',
+                       max_memory: int = DEFAULT_MAX_MEMORY, workers=None, executor: Executor = None,
+                       backend: str = 'auto'):
+    '''
+        Calculates the Biot-Savart integral of a coil path for an array of points using a pool of processes.
+
+        :param coilPath numpy.ndarray|PreparedPath: the ordered array of points of the path, in the format
+        [[x1,y1,z1],...], or the path already prepared for the integration method.
+        :param points numpy.ndarray: the points to check for the magnetic field, in the format [[x1,y1,z1],...].
+        :param integration_method str: (optional) either 'Riemann', 'Simpson' or 'Analytic', ignored
+        when the path is already prepared.
+        :param max_memory int: (optional) the memory budget in bytes for each block of points, per worker.
+        :param workers int: (optional) the number of processes, any value lower than 1 uses every core.
+        :param executor concurrent.futures.Executor: (optional) an existing executor to submit the shards to.
+        When given, workers only controls how many shards are created.
+        :param backend str: (optional) 'numpy', 'numba' or 'auto', see the Biot-Savart Module.
+
+        :returns numpy.ndarray: the integral part of the Biot-Savart law for each point, in the same order
+        as points.
+    '''
+    points = np.asarray(points, dtype=float).reshape(-1, 3)
+    backend = resolveBackend(backend)
+    prepared = coilPath if isinstance(coilPath, PreparedPath) else PreparedPath.fromPath(coilPath, integration_method)
+    nWorkers = resolveWorkers(workers)
+    if executor is None and nWorkers == 1:
+        return prepared.integrate(points, max_memory, backend)
+
+    shared, arraySpecs = [], []
+    for array in (prepared.sources, prepared.dl, prepared.weights):
+        if array is None:
+            arraySpecs.append(None)
+            continue
+        shm, spec = _share(array)
+        shared.append(shm)
+        arraySpecs.append(spec)
+    preparedSpec = (prepared.integration_method, arraySpecs, prepared.factor, prepared.epsilon)
+
+    pointsShm, pointsSpec = _share(points)
+    outputShm, outputSpec = _share(np.zeros((len(points), 3)))
+    shared += [pointsShm, outputShm]
+    ownExecutor = executor is None
+    if ownExecutor:
+        executor = ProcessPoolExecutor(max_workers=nWorkers)
+    try:
+        futures = [executor.submit(_evaluateShard, preparedSpec, pointsSpec, outputSpec, start, stop,
+                                   max_memory, backend)
+                   for start, stop in shardBounds(len(points), nWorkers * SHARDS_PER_WORKER)]
+        for future in futures:
+            future.result()
+        output = np.ndarray(outputSpec[1], dtype=outputSpec[2], buffer=outputShm.buf)
+        results = output.copy()
+        del output
+    finally:
+        if ownExecutor:
+            executor.shutdown(cancel_futures=True)
+        for shm in shared:
+            shm.close()
+            shm.unlink()
+    return results
@@ -3,9 +3,19 @@
 This module contains functions for calculations on multi-coil systems, like length
 and resistance of serie associated coils and magnetic field for only multiple coils 
 systems with same current using numerical methods (e.g., Biot-Savart Law).
+
+The CoilSystem class drives each coil with its own current and packs the segments
+of every coil into a single array, so the total field is calculated in one pass.
+Since the field is linear in the currents, a CoilSystem can also build the field
+of one Ampere in each coil at a fixed set of points once, as a ResponseMatrix,
+after which the field of any current vector, or the currents that best produce a
+target field, are a single matrix product or least-squares solve.
 """
-from numpy import sqrt, vstack, ndarray
-from .mathematics.constants import BX,BY,BZ
+import numpy as np
+from numpy import sqrt, vstack, ndarray, moveaxis, concatenate
+from .mathematics.constants import BX,BY,BZ, MU0_PRIME
+from .mathematics.biot_savart import packPaths, DEFAULT_MAX_MEMORY
+from .parallel import parallelBiotSavart
 def calculateMultipleCoilsLength(coilList):
     '''
         Calculates the sum of lengths from multiple coils.
@@ -39,7 +49,8 @@ def calculateMultipleCoilsResistance(coilList, invertRAxis:bool=False):
     return resistance
 
 def calculateMultipleCoils3D(coilList, pointsList: ndarray, I:float=1, invertRAxis:bool=False,
-                         invertPAxis:bool=False, calculateB:bool=True, verbose:bool=False):
+                         invertPAxis:bool=False, calculateB:bool=True, verbose:bool=False,
+                         *, workers:int=None, executor=None, tolerance:float=None, integration_method:str='Simpson'):
     '''
      Calculates the Biot-Savart law for multiple coil paths with the same current.
 
@@ -50,25 +61,327 @@ def calculateMultipleCoils3D(coilList, pointsList: ndarray, I:float=1, invertRAx
         :param invertPAxis bool: (optional) whether the pointsList is in the format of [[X1,Y1,Z1],...] rather than [[X], [Y], [Z]].
         :param calculateB bool: (optional) whether or not the calculation of the magnetic field modulus should take place.
         :param verbose bool: (optional) makes the function print the progress of the calculations, usefull for long lists of points.
+        :param workers int: (optional) the number of processes the points are sharded across, any value lower than 1 uses every core.
+        :param executor concurrent.futures.Executor: (optional) an existing executor to run the shards on.
+        :param tolerance float: (optional) uses the octree approximation of each coil with this relative accuracy,
+        the estimated error of each coil is left in its treeError attribute. Without it the coils are
+        calculated together in a single pass, see CoilSystem.
+        :param integration_method str: (optional) 'Riemann', 'Simpson' or 'Analytic'.
 
         :returns numpy.ndarray: a list of coordinates and the respective magnetic field values for each point caused by the coilList.
             The format is in the same shape as pointsList, beign either [[x1,y1,z1,bx1,by1,bz1*,b*],...] for [[X],[Y],[Z],[Bx],[By],[Bz]*,[B]*].
     '''
     nCoils = len(coilList)
 
-    if verbose:
-        print(f"\nCalculating coil 1 out of {nCoils:d}")
-
-    # Calculates the first coil separately for convenience.
-    returnal = coilList[0].biotSavart3d(pointsList, invertPAxis = invertPAxis)
-    for i in range(1, nCoils):
+    if tolerance is None:
         if verbose:
-            print(f"\nCalculating coil {i+1:d} out of {nCoils:d}")
-    returnal [BX:BZ+1] += coilList[i].biotSavart3d( pointsList, invertPAxis = invertPAxis)[BX:BZ+1]
+            print(f"\nCalculating the {nCoils:d} coils in a single pass")
+        returnal = CoilSystem(coilList, np.full(nCoils, I, dtype=float)).biotSavart3d(
+            pointsList, integration_method, invertPAxis, workers = workers, executor = executor)
+    else:
+        returnal = None
+        for i, coil in enumerate(coilList):
+            if verbose:
+                print(f"\nCalculating coil {i+1:d} out of {nCoils:d}")
+            result = coil.biotSavart3d(pointsList, integration_method, I, invertPAxis = invertPAxis,
+                                       workers = workers, executor = executor, tolerance = tolerance)
+            if returnal is None:
+                returnal = result
+            elif invertPAxis:
+                returnal[:, BX:BZ+1] += result[:, BX:BZ+1]
+            else:
+                returnal[BX:BZ+1] += result[BX:BZ+1]
 
     # Calculates the modulus of the magnetic field for the points
     if calculateB:
+        if invertPAxis:
+            returnal = moveaxis(returnal, 0, 1)
         Bfield = sqrt( returnal[BX]**2 + returnal[BY]**2 + returnal[BZ]**2 )
-    returnal = vstack((returnal, Bfield))
+        returnal = vstack((returnal, Bfield))
+        if invertPAxis:
+            returnal = moveaxis(returnal, 0, 1)
 
     return returnal
+
+
+class CoilSystem:
+    """CoilSystem class.
+    This class groups coils, each one driven by its own current. The segments of the coils are packed
+    into a single array, with the current of each segment in its weights, see biot_savart.packPaths, so
+    the total magnetic field is calculated in one pass over the points instead of one pass per coil.
+    Coils that gain from being calculated on their own, see biotSavart3d, are added to it one by one."""
+    def __init__(self, coils, currents = None):
+        '''
+            Initialize a instance from CoilSystem class.
+
+            :param coils list: the coils, instances of electromagnetism.models.coil.Coil.
+            :param currents list: (optional) the current going through each coil, in Amperes, the default
+            is one Ampere for every coil.
+
+            :raises ValueError: if there are no coils or the currents are not valid.
+        '''
+        self._coils = tuple(coils)
+        if not self._coils:
+            raise ValueError("A coil system needs at least one coil")
+        self.currents = np.ones(len(self._coils)) if currents is None else currents
+
+    @property
+    def coils(self):
+        '''
+            Returns the coils of the system.
+        '''
+        return self._coils
+
+    @property
+    def currents(self):
+        '''
+            Returns the current going through each coil, in Amperes. The array is read-only.
+        '''
+        return self._currents
+
+    @currents.setter
+    def currents(self, new_currents):
+        '''
+            Sets the current going through each coil. The packed segments are rebuilt on the next calculation.
+
+            :param new_currents list: one current for each coil, in Amperes.
+
+            :raises ValueError: if there is not one finite current for each coil.
+        '''
+        currents = np.array(new_currents, dtype=float).reshape(-1)
+        if len(currents) != len(self._coils) or not np.all(np.isfinite(currents)):
+            raise ValueError("There must be one finite current for each coil")
+        currents.flags.writeable = False
+        self._currents = currents
+        self._packed = {}
+
+    @property
+    def length(self):
+        '''
+            Returns the sum of the lengths of the coils.
+        '''
+        return calculateMultipleCoilsLength(self._coils)
+
+    def dissipationPotency(self):
+        '''
+            Calculates the potency dissipated by the coils with their currents, in Watts.
+        '''
+        return sum(coil.dissipationPotency(current) for coil, current in zip(self._coils, self._currents))
+
+    def packed(self, integration_method:str = 'Simpson', indices = None):
+        '''
+            Returns the segments of coils packed with their currents, built on the first call and reused
+            until the currents change or the path of one of the coils is replaced.
+
+            :param integration_method str: (optional) 'Riemann', 'Simpson' or 'Analytic'.
+            :param indices list: (optional) the indices of the coils to pack, the default is every coil.
+
+            :returns PreparedPath: the packed path.
+
+            :raises ValueError: if the integration method is unknown, or a coil cannot be prepared as a
+            whole, such as a LazyRacetrack.
+        '''
+        indices = tuple(range(len(self._coils))) if indices is None else tuple(int(index) for index in indices)
+        # The prepared data of a coil is replaced whenever its path is, which identifies the path.
+        prepared = tuple(self._coils[index].prepared(integration_method) for index in indices)
+        key = (integration_method, indices)
+        if key not in self._packed or any(old is not new for old, new in zip(self._packed[key][0], prepared)):
+            self._packed[key] = (prepared, packPaths(prepared, self._currents[list(indices)]))
+        return self._packed[key][1]
+
+    def __packable(self, coil, points, integration_method, backend, cache):
+        '''
+            Tells whether a coil is calculated in the packed pass: it can be prepared as a whole, has no
+            mirror planes, does not remember the field of the points and no cache is used.
+        '''
+        if cache is not None or coil.symmetry or coil.remembers(points, integration_method, backend=backend):
+            return False
+        try:
+            coil.prepared(integration_method)
+        except ValueError:
+            return False
+        return True
+
+    def biotSavart3d(self, pointsList:ndarray, integration_method = 'Simpson', invertPAxis:bool = False, *,
+                     max_memory:int = DEFAULT_MAX_MEMORY, workers:int = None, executor = None, backend:str = 'auto',
+                     cache = None):
+        '''
+            Calculates the total magnetic field of the coils, each one with its current. The coils are packed
+            and calculated in a single pass, except for the ones that cannot be prepared as a whole, such as
+            lazy coils, the ones with mirror planes and the ones that remember the field of the points, which
+            are calculated by their own unitField. With a cache every coil is calculated by its unitField.
+
+            :param pointsList numpy.ndarray: the array of points to check for the magnetic field.
+            :param integration_method str: (optional) any method accepted by Coil.biotSavart3d, the coils
+            that only have a 'Model' field are calculated one by one.
+            :param invertPAxis bool: (optional) same as in Coil.biotSavart3d.
+            :param max_memory int: (optional) same as in Coil.biotSavart3d.
+            :param workers int: (optional) same as in Coil.biotSavart3d.
+            :param executor concurrent.futures.Executor: (optional) same as in Coil.biotSavart3d.
+            :param backend str: (optional) same as in Coil.biotSavart3d.
+            :param cache electromagnetism.cache.FieldCache: (optional) same as in Coil.biotSavart3d.
+
+            :returns numpy.ndarray: the points and their magnetic fields, in Tesla, in the same format as Coil.biotSavart3d.
+        '''
+        if invertPAxis:
+            pointsList = moveaxis(pointsList, 0, 1)
+        points = np.asarray(pointsList, dtype=float).reshape(-1, 3)
+        packable = [self.__packable(coil, points, integration_method, backend, cache) for coil in self._coils]
+
+        results = np.zeros((len(points), 3))
+        if any(packable):
+            results += parallelBiotSavart(self.packed(integration_method, np.flatnonzero(packable)), points,
+                                          integration_method, max_memory, workers=workers, executor=executor,
+                                          backend=backend) * MU0_PRIME
+        for coil, current, alone in zip(self._coils, self._currents, np.logical_not(packable)):
+            if alone:
+                results += current * coil.unitField(points, integration_method, max_memory=max_memory,
+                                                    workers=workers, executor=executor, backend=backend,
+                                                    cache=cache)
+
+        # returnal ends up looking like [[X], [Y], [Z], [Bx], [By], [Bz]]
+        returnal = concatenate((moveaxis(points, 0, 1), moveaxis(results, 0, 1)))
+        if invertPAxis:
+            returnal = moveaxis(returnal, 0, 1)
+        return returnal
+
+    def responseMatrix(self, pointsList:ndarray, integration_method = 'Simpson', invertPAxis:bool = False, *,
+                       max_memory:int = DEFAULT_MAX_MEMORY, workers:int = None, executor = None,
+                       backend:str = 'auto', cache = None, out:ndarray = None):
+        '''
+            Calculates the magnetic field of one Ampere in each coil at a fixed set of points, one coil at a
+            time. Each coil is calculated by its own unitField, so its remembered fields, its mirror planes
+            and the persistent cache are used, and lazy coils keep their memory bound.
+
+            :param pointsList numpy.ndarray: the array of points to check for the magnetic field.
+            :param integration_method str: (optional) any method accepted by Coil.biotSavart3d.
+            :param invertPAxis bool: (optional) same as in Coil.biotSavart3d.
+            :param max_memory int: (optional) same as in Coil.biotSavart3d.
+            :param workers int: (optional) same as in Coil.biotSavart3d.
+            :param executor concurrent.futures.Executor: (optional) same as in Coil.biotSavart3d.
+            :param backend str: (optional) same as in Coil.biotSavart3d.
+            :param cache electromagnetism.cache.FieldCache: (optional) same as in Coil.biotSavart3d.
+            :param out numpy.ndarray: (optional) the array the matrix is written to, with the shape
+            (points, 3, coils), such as a memory map created with numpy.lib.format.open_memmap to keep a
+            matrix larger than the memory on disk.
+
+            :returns ResponseMatrix: the response of the points to the currents of the coils.
+
+            :raises ValueError: if out does not have the shape of the matrix.
+        '''
+        if invertPAxis:
+            pointsList = moveaxis(pointsList, 0, 1)
+        points = np.asarray(pointsList, dtype=float).reshape(-1, 3)
+        shape = (len(points), 3, len(self._coils))
+        if out is None:
+            out = np.empty(shape)
+        elif out.shape != shape:
+            raise ValueError(f"The matrix must have the shape {shape}, not {out.shape}")
+
+        for index, coil in enumerate(self._coils):
+            out[:, :, index] = coil.unitField(points, integration_method, max_memory=max_memory, workers=workers,
+                                              executor=executor, backend=backend, cache=cache)
+        return ResponseMatrix(points, out)
+
+
+class ResponseMatrix:
+    """ResponseMatrix class.
+    This class holds the magnetic field of one Ampere in each coil of a CoilSystem at a fixed set of
+    points, in the format (points, 3, coils). The field is linear in the currents, so the field of any
+    current vector, or of a whole waveform of them, is a single matrix product, and the currents that
+    best produce a target field are a single least-squares solve."""
+    def __init__(self, points:ndarray, matrix:ndarray):
+        '''
+            Wraps an already calculated matrix, see CoilSystem.responseMatrix.
+
+            :param points numpy.ndarray: the points, in the format [[x1,y1,z1],...].
+            :param matrix numpy.ndarray: the field of one Ampere in each coil, in Tesla per Ampere, with
+            the shape (points, 3, coils).
+
+            :raises ValueError: if the matrix does not match the points.
+        '''
+        points = np.asarray(points, dtype=float).reshape(-1, 3)
+        if matrix.ndim != 3 or matrix.shape[:2] != (len(points), 3):
+            raise ValueError("The matrix must have the shape (points, 3, coils)")
+        self._points = points
+        self._matrix = matrix
+
+    @property
+    def points(self):
+        '''
+            Returns the points, in the format [[x1,y1,z1],...].
+        '''
+        return self._points
+
+    @property
+    def matrix(self):
+        '''
+            Returns the field of one Ampere in each coil, with the shape (points, 3, coils).
+        '''
+        return self._matrix
+
+    @property
+    def nCoils(self):
+        '''
+            Returns the number of coils.
+        '''
+        return self._matrix.shape[2]
+
+    def field(self, currents):
+        '''
+            Calculates the magnetic field of the coils for a current vector, or for several of them.
+
+            :param currents list|numpy.ndarray: the current of each coil, in Amperes, or an array with the
+            shape (coils, samples), such as a waveform, each column being a current vector.
+
+            :returns numpy.ndarray: the magnetic field in Tesla, in the format [[Bx1,By1,Bz1],...], or with
+            the shape (points, 3, samples) for several current vectors.
+
+            :raises ValueError: if there is not one current for each coil.
+        '''
+        currents = np.asarray(currents, dtype=float)
+        if currents.ndim not in (1, 2) or currents.shape[0] != self.nCoils:
+            raise ValueError(f"The currents must have the shape ({self.nCoils},) or ({self.nCoils}, samples)")
+        return (self._matrix.reshape(-1, self.nCoils) @ currents).reshape((len(self._points), 3) + currents.shape[1:])
+
+    def fit(self, target:ndarray, weights:ndarray = None, regularization:float = 0):
+        '''
+            Finds the currents whose field is the closest to a target field, in the least-squares sense.
+
+            :param target numpy.ndarray: the target field at the points, in Tesla, in the format [[Bx1,By1,Bz1],...].
+            Components set to NaN are left out of the fit.
+            :param weights numpy.ndarray: (optional) the weight of each point, or of each component with
+            the shape of the target.
+            :param regularization float: (optional) penalizes the squared norm of the currents, times this
+            factor, which keeps ill-conditioned fits from demanding huge currents. It is compared with the
+            weighted squares of the matrix, in (Tesla per Ampere) squared, so it is usually a small number.
+
+            :returns tuple: the currents, in Amperes, and the RMS difference between their field and the
+            target over the components fitted, in Tesla.
+
+            :raises ValueError: if the target or the weights do not match the points, or the
+            regularization is negative.
+        '''
+        target = np.asarray(target, dtype=float)
+        if target.shape != (len(self._points), 3):
+            raise ValueError(f"The target must have the shape ({len(self._points)}, 3)")
+        if regularization < 0:
+            raise ValueError("The regularization must not be negative")
+        weights = np.ones_like(target) if weights is None else np.asarray(weights, dtype=float)
+        if weights.ndim == 1:
+            weights = weights[:, np.newaxis]
+        weights = np.broadcast_to(weights, target.shape)
+        if np.any(weights < 0):
+            raise ValueError("The weights must not be negative")
+
+        rows = np.isfinite(target).reshape(-1)
+        scale = np.sqrt(weights.reshape(-1)[rows])
+        system = self._matrix.reshape(-1, self.nCoils)[rows] * scale[:, np.newaxis]
+        values = target.reshape(-1)[rows] * scale
+        if regularization > 0:
+            system = np.concatenate((system, np.sqrt(regularization) * np.eye(self.nCoils)))
+            values = np.concatenate((values, np.zeros(self.nCoils)))
+        currents = np.linalg.lstsq(system, values, rcond=None)[0]
+
+        difference = (self._matrix.reshape(-1, self.nCoils)[rows] @ currents) - target.reshape(-1)[rows]
+        return currents, float(np.sqrt(np.mean(difference**2))) if len(difference) else 0.0